@@ -0,0 +1,70 @@
+"""
+自适应并发上限基准，在项目根目录下运行：python -m benchmarks.adaptive_limit
+
+模拟一个处理能力为 BENCH_CAPACITY 个并发的服务：超过后请求排队、延迟线性上升，超过 2 倍时开始报错。
+对比固定上限与自适应上限的有效吞吐（成功请求数/s）、p90 延迟与错误数。
+"""
+import asyncio
+import os
+import random
+import time
+
+from core.controller.adaptive_limit import AdaptiveConcurrency, AdaptiveSemaphore, adaptive_max
+
+
+async def bench(limit: int, adaptive: bool, capacity: int, base_ms: float, requests: int):
+    semaphore = AdaptiveSemaphore(limit)
+    controller = AdaptiveConcurrency(semaphore, adaptive_max(limit)) if adaptive else None
+    state = {"in_flight": 0, "errors": 0}
+    latencies = []
+
+    async def request():
+        async with semaphore:
+            state["in_flight"] += 1
+            start = time.perf_counter()
+            try:
+                load = state["in_flight"] / capacity
+                await asyncio.sleep(base_ms / 1000 * max(1.0, load) * random.uniform(0.8, 1.2))
+                error = load > 2 and random.random() < 0.5
+            finally:
+                state["in_flight"] -= 1
+            latency = (time.perf_counter() - start) * 1000
+            state["errors"] += error
+            latencies.append(latency)
+            if controller is not None:
+                controller.observe(latency, error)
+
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            await request()
+
+    if controller is not None:
+        controller.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(adaptive_max(limit) if adaptive else limit)))
+    elapsed = time.perf_counter() - start
+    final = (await controller.stop())["current"] if controller is not None else limit
+    latencies.sort()
+    return elapsed, latencies[int(len(latencies) * 0.9)], state["errors"], final
+
+
+def main():
+    capacity = int(os.getenv("BENCH_CAPACITY", 40))
+    base_ms = float(os.getenv("BENCH_BASE_MS", 20))
+    requests = int(os.getenv("BENCH_REQUESTS", 12000))
+    os.environ.setdefault("ADAPTIVE_INTERVAL", "0.2")
+    print(f"服务处理能力 {capacity} 个并发，基础延迟 {base_ms}ms，共 {requests} 个请求")
+    random.seed(1)
+    for limit, adaptive in ((10, False), (200, False), (10, True), (200, True)):
+        elapsed, p90, errors, final = asyncio.run(bench(limit, adaptive, capacity, base_ms, requests))
+        name = f"{'自适应' if adaptive else '固定'} 初始 {limit}"
+        print(f"{name}: 成功 {(requests - errors) / elapsed:,.0f} 请求/s，p90 {p90:.1f}ms，错误 {errors}，最终上限 {final}")
+
+
+if __name__ == '__main__':
+    main()
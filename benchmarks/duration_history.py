@@ -0,0 +1,34 @@
+"""
+按历史耗时排序的模拟，在项目根目录下运行：python -m benchmarks.duration_history
+
+按给定的历史耗时，比较原有顺序与 LPT 顺序在 N 个工作协程上的总耗时。
+"""
+import heapq
+import os
+import random
+from typing import List
+
+from core.executor.history import lpt_makespan
+
+
+def fifo_makespan(durations: List[float], machines: int) -> float:
+    loads = [0] * max(1, machines)
+    for duration in durations:
+        heapq.heappush(loads, heapq.heappop(loads) + duration)
+    return max(loads)
+
+
+def main():
+    random.seed(int(os.getenv("BENCH_SEED", 7)))
+    machines = int(os.getenv("BENCH_WORKERS", 8))
+    count = int(os.getenv("BENCH_CHILD_CASES", 64))
+    # 大部分子用例很短，少数很长，且长的排在后面
+    durations = sorted(random.lognormvariate(6, 1.2) for _ in range(count))
+    fifo, lpt = fifo_makespan(durations, machines), lpt_makespan(durations, machines)
+    print(f"{count} 个子用例，{machines} 个工作协程，总工作量 {sum(durations) / 1000:.1f}s，"
+          f"下界 {max(max(durations), sum(durations) / machines) / 1000:.1f}s")
+    print(f"原有顺序: {fifo / 1000:.1f}s，LPT: {lpt / 1000:.1f}s（缩短 {(1 - lpt / fifo) * 100:.0f}%）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+事件循环基准，在项目根目录下运行：python -m benchmarks.event_loop
+
+接口步骤经由本地 echo 服务做一次请求往返并解析响应，对比 asyncio 与 uvloop 的吞吐与循环延迟。
+"""
+import asyncio
+import os
+import time
+from collections import deque
+
+from benchmarks.executors import build_tree
+from core.controller.async_task_runner import TaskRunner
+from core.utils import json_codec
+from core.utils.event_loop import LoopLagMonitor, run, use
+
+
+def echo_request(connections):
+    async def request(executor):
+        reader, writer, lock = connections[id(executor) % len(connections)]
+        async with lock:
+            writer.write(b'{"status": 200, "data": [1, 2, 3]}\n')
+            await writer.drain()
+            line = await reader.readline()
+        json_codec.loads(line)
+
+    return request
+
+
+async def bench(cases, child_cases, steps, concurrency, connection_count):
+    handlers = []
+
+    async def _echo(reader, writer):
+        handlers.append(asyncio.current_task())
+        while line := await reader.readline():
+            writer.write(line)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(_echo, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    connections = []
+    for _ in range(connection_count):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        connections.append((reader, writer, asyncio.Lock()))
+    runner = TaskRunner(concurrency)
+    context = runner.context
+    root = build_tree(context, cases, child_cases, steps, request=echo_request(connections))
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    start = time.perf_counter()
+    await runner.run(context.run_sequentially(deque([root])))
+    elapsed = time.perf_counter() - start
+    stats = await monitor.stop()
+    for _, writer, _ in connections:
+        writer.close()
+        await writer.wait_closed()
+    # 客户端断开后服务端的处理协程自行退出
+    await asyncio.gather(*handlers)
+    server.close()
+    await server.wait_closed()
+    return elapsed, stats
+
+
+def main():
+    shape = (int(os.getenv("BENCH_CASES", 10)), int(os.getenv("BENCH_CHILD_CASES", 5)),
+             int(os.getenv("BENCH_STEPS", 400)))
+    concurrency = int(os.getenv("BENCH_CONCURRENCY", 200))
+    connection_count = int(os.getenv("BENCH_CONNECTIONS", 50))
+    leaves = shape[0] * shape[1] * shape[2]
+    print(f"并发 {concurrency}，{connection_count} 个连接，用例 x 子用例 x 步骤 = {shape}，共 {leaves} 个接口步骤")
+    for name in ("asyncio", "uvloop"):
+        if use(name) != name:
+            print(f"{name}: 未安装，跳过")
+            continue
+        elapsed, stats = run(bench(*shape, concurrency, connection_count))
+        print(f"{name}: {elapsed:.2f}s，{leaves / elapsed:,.0f} 步骤/s，"
+              f"循环延迟 p50 {stats['p50_ms']}ms / p99 {stats['p99_ms']}ms / max {stats['max_ms']}ms")
+
+
+if __name__ == '__main__':
+    main()
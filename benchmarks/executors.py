@@ -0,0 +1,51 @@
+"""基准共用的模拟执行器与任务树"""
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+
+class BenchExecutor:
+    """
+    模拟执行器：有子节点时为容器节点，并发执行子节点；
+    叶子节点提交一次后台记录写入，再调用 request 模拟一次请求（未提供时等待 io 秒）
+    """
+
+    def __init__(self, context, children=None, io: float = 0.0,
+                 request: Optional[Callable[["BenchExecutor"], Awaitable[Any]]] = None, hold: bool = False):
+        self.context = context
+        self.children = children or []
+        self.io = io
+        self.request = request
+        # hold=True 时模拟原先容器节点也占用任务级名额的行为
+        self.is_container = bool(self.children) and not hold
+
+    async def before_callback(self):
+        return None
+
+    async def run(self, *args):
+        if self.children:
+            return await self.context.run_concurrently(deque(self.children))
+        self.context.submit_background(asyncio.sleep(0))
+        if self.request is not None:
+            await self.request(self)
+        else:
+            await asyncio.sleep(self.io)
+        return True
+
+    async def after_callback(self, result=None, *args):
+        pass
+
+    async def skipped_callback(self, *args):
+        pass
+
+    async def error_callback(self, e, *args):
+        raise e
+
+
+def build_tree(context, cases: int, child_cases: int, steps: int, hold: bool = False, **leaf) -> BenchExecutor:
+    """任务 -> 用例 -> 子用例 -> 步骤，leaf 为叶子节点的参数"""
+    return BenchExecutor(context, [
+        BenchExecutor(context, [
+            BenchExecutor(context, [BenchExecutor(context, **leaf) for _ in range(steps)], hold=hold)
+            for _ in range(child_cases)], hold=hold)
+        for _ in range(cases)], hold=hold)
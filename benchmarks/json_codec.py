@@ -0,0 +1,58 @@
+"""
+JSON 编解码基准，在项目根目录下运行：python -m benchmarks.json_codec
+
+模拟一个接口步骤在记录与请求路径上的 JSON 负载，对比标准库 json 与 orjson。
+"""
+import json
+import os
+import time
+
+from core.record.utils import ProcessObject, PositionPathIntern
+from core.utils.json_codec import dumps, loads, use
+
+position_list = [{"type": "task", "index": 0, "label": "任务"},
+                 {"type": "case", "index": 3, "label": "登录用例"},
+                 {"type": "child_case", "index": 1, "label": None},
+                 {"type": "interface", "index": 7, "label": "获取用户信息"}]
+timing = {f"field_{i}": 1760000000000.0 + i for i in range(24)}
+response_details = {
+    "status": 200,
+    "headers": {"Content-Type": "application/json", "X-Request-Id": "a" * 32},
+    "body": json.dumps({"data": [{"id": i, "name": f"用户{i}", "tags": ["a", "b"]} for i in range(50)]},
+                       ensure_ascii=False),
+    "waste_time": 12.3
+}
+interface_tree = {"headers": {"Authorization": "Bearer {{token}}"},
+                  "body": {"items": [{"id": i, "value": "{{value}}"} for i in range(20)]}}
+
+
+def one_step():
+    intern = PositionPathIntern()
+    for _ in range(4):
+        process = ProcessObject(type="interface_success_finished", desc="接口请求成功", position_list=position_list)
+        process.to_json()
+        process.to_json(intern)
+    dumps(timing)
+    encoded = dumps(response_details)
+    loads(encoded)
+    loads(loads(encoded)["body"])
+    replaced = dumps(interface_tree, ensure_ascii=True).replace("{{token}}", "abc").replace("{{value}}", "1")
+    loads(replaced)
+    dumps({"done_step_count": 1})
+
+
+def main():
+    steps = int(os.getenv("BENCH_STEPS", 20000))
+    for codec in ("stdlib", "orjson"):
+        if use(codec) != codec:
+            print(f"{codec}: 未安装，跳过")
+            continue
+        start = time.perf_counter()
+        for _ in range(steps):
+            one_step()
+        elapsed = time.perf_counter() - start
+        print(f"{codec}: {steps / elapsed:,.0f} steps/s ({elapsed:.2f}s / {steps} steps)")
+
+
+if __name__ == '__main__':
+    main()
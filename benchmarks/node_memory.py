@@ -0,0 +1,48 @@
+"""
+节点内存基准，在项目根目录下运行：python -m benchmarks.node_memory
+
+一个多任务器下挂 BENCH_NODES 个接口步骤，统计每个节点（元数据、路径索引、执行器与树节点）占用的内存。
+"""
+import os
+import sys
+import tracemalloc
+from collections import deque
+
+from core.payload.step_exec import RunStepExecutor
+from core.payload.utils.tools import StaticPathIndex, PositionItem
+from core.task_object.execution_plan import CasePlan
+from core.task_object.galobal_mapping import MultiwayTreeNode
+from core.task_object.step_mapping import Interface, Multitasker
+
+
+def build_tree(count):
+    mapping = {"1": Multitasker(type='multitasker', id=1, label='多任务器', check='all', children=["2"]),
+               "2": Interface(type='interface', id=2, label='接口', check='all')}
+    plan = CasePlan(mapping)
+    root_spi = StaticPathIndex(task=1, case=1, case_index=1, child_case=1)
+    root = RunStepExecutor(mapping["1"], None, None, None, None, plan.get("1"), None, None, root_spi)
+    root_node = MultiwayTreeNode(None, root, deque())
+    for i in range(count):
+        metadata = Interface(type='interface', id=i, label='接口', check='all', parent=1)
+        spi = root_spi.extend(PositionItem(type='interface', index=i, label="").to_dict(), step=i, step_name='接口')
+        executor = RunStepExecutor(metadata, None, None, None, root_node, plan.get("2"), root, None, spi)
+        root_node.add_child(MultiwayTreeNode(root_node, executor, ()))
+    return root_node
+
+
+def main():
+    count = int(os.getenv("BENCH_NODES", 100000))
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tree = build_tree(count)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{count} 个节点，共 {(after - before) / 1024 / 1024:.1f} MiB，每个节点 {(after - before) / count:.0f} 字节")
+    sample = tree.children[0]
+    for name, obj in (("树节点", sample), ("执行器", sample.node), ("路径索引", sample.node.spi),
+                      ("元数据", sample.node.metadata), ("位置路径", sample.node.spi.position_list)):
+        print(f"  {name}: {sys.getsizeof(obj)} 字节{'（含 __dict__）' if hasattr(obj, '__dict__') else ''}")
+
+
+if __name__ == '__main__':
+    main()
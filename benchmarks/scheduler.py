@@ -0,0 +1,93 @@
+"""
+调度器基准，在项目根目录下运行：python -m benchmarks.scheduler
+
+    1. 每个节点一个 Task（task）与有界工作协程池（pool）的耗时、峰值 Task 数与峰值内存；
+    2. 嵌套并发时容器节点占用名额与分层名额的吞吐；
+    3. 宽节点预先创建全部子执行器与按需创建时的峰值内存。
+"""
+import asyncio
+import os
+import time
+import tracemalloc
+from collections import deque
+
+from benchmarks.executors import BenchExecutor, build_tree
+from core.controller.async_task_runner import TaskRunner, LazyExecutors
+
+
+async def bench(scheduler, concurrency, cases, child_cases, steps, io=0.0, hold=False, trace=True):
+    runner = TaskRunner(concurrency, scheduler)
+    root = build_tree(runner.context, cases, child_cases, steps, hold=hold, io=io)
+    peak_tasks = 0
+
+    async def sample():
+        nonlocal peak_tasks
+        while True:
+            peak_tasks = max(peak_tasks, len(asyncio.all_tasks()))
+            await asyncio.sleep(0.005)
+
+    sampler = asyncio.create_task(sample())
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await runner.run(runner.context.run_sequentially(deque([root])))
+    elapsed = time.perf_counter() - start
+    peak_memory = 0
+    if trace:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    sampler.cancel()
+    return elapsed, peak_tasks, peak_memory
+
+
+async def bench_wide(concurrency, rows, lazy, limit):
+    """一个多任务器按数据集驱动 rows 次"""
+    runner = TaskRunner(concurrency)
+    context = runner.context
+
+    def make(index):
+        leaf = BenchExecutor(context)
+        # 模拟每个子执行器携带的临时变量
+        leaf.temp_variables = {"row": index, "name": f"row-{index}"}
+        return leaf
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    children = LazyExecutors(make(index) for index in range(rows)) if lazy else \
+        deque([make(index) for index in range(rows)])
+    await runner.run(context.run_concurrently(children, limit))
+    elapsed = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak_memory
+
+
+def main():
+    concurrency = int(os.getenv("BENCH_CONCURRENCY", 200))
+    shape = (int(os.getenv("BENCH_CASES", 10)), int(os.getenv("BENCH_CHILD_CASES", 5)),
+             int(os.getenv("BENCH_STEPS", 2000)))
+    print(f"并发 {concurrency}，用例 x 子用例 x 步骤 = {shape}，共 {shape[0] * shape[1] * shape[2]} 个叶子节点")
+    for name in ("task", "pool"):
+        elapsed, peak_tasks, peak_memory = asyncio.run(bench(name, concurrency, *shape))
+        print(f"{name}: {elapsed:.2f}s，峰值 Task 数 {peak_tasks}，峰值内存 {peak_memory / 1024 / 1024:.1f} MiB")
+
+    # 树上共有 61 个容器节点，容器占用名额时并发低于 61 会直接死锁
+    io = float(os.getenv("BENCH_IO_MS", 20)) / 1000
+    nested_concurrency = int(os.getenv("BENCH_NESTED_CONCURRENCY", 80))
+    nested_shape = (10, 5, int(os.getenv("BENCH_NESTED_STEPS", 100)))
+    leaves = nested_shape[0] * nested_shape[1] * nested_shape[2]
+    print(f"嵌套并发 {nested_concurrency}，叶子节点请求 {io * 1000:.0f}ms，共 {leaves} 个叶子节点")
+    for hold in (True, False):
+        elapsed, _, _ = asyncio.run(bench("pool", nested_concurrency, *nested_shape, io=io, hold=hold, trace=False))
+        print(f"{'容器占用名额' if hold else '分层名额'}: {elapsed:.2f}s，{leaves / elapsed:,.0f} 叶子节点/s")
+
+    wide_limit = int(os.getenv("BENCH_WIDE_LIMIT", 50))
+    for rows in (10000, int(os.getenv("BENCH_WIDE_ROWS", 50000))):
+        for lazy in (False, True):
+            elapsed, peak_memory = asyncio.run(bench_wide(concurrency, rows, lazy, wide_limit))
+            print(f"宽节点 {rows} 个子节点，{'按需创建' if lazy else '预先创建'}: {elapsed:.2f}s，"
+                  f"峰值内存 {peak_memory / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
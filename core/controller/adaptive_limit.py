@@ -0,0 +1,189 @@
+"""
+按接口的实际延迟与错误率在运行时调整任务级并发上限（AIMD）。
+
+MAX_CONCURRENCY 是静态的：设得太小，响应快的服务用不满；设得太大，慢的服务被压垮，延迟数据也失真。
+开启 ADAPTIVE_CONCURRENCY 后，任务级名额换成可以调整大小的 AdaptiveSemaphore，初始为 MAX_CONCURRENCY，
+由 AdaptiveConcurrency 每隔一个窗口根据 HttpClient 钩子上报的接口耗时与错误调整：
+
+    - 窗口内错误率超过 ADAPTIVE_ERROR_RATE，或 p90 延迟超过基线延迟的 ADAPTIVE_LATENCY_TOLERANCE 倍：乘以 ADAPTIVE_DECREASE；
+    - 否则名额曾被占满时加 ADAPTIVE_INCREASE，没有占满时保持不变（加了也用不上）。
+
+基线延迟取各窗口 p50 的最小值，并缓慢向当前 p50 靠拢，避免一次偶然的低延迟让上限一直下降。
+每次调整记录到 record_info 的 concurrency 字段（分片执行时为 concurrency_shard_<分片>）。
+
+环境变量（括号内为默认值）：
+    ADAPTIVE_CONCURRENCY            是否开启（0）
+    ADAPTIVE_MIN_CONCURRENCY        下限（1）
+    ADAPTIVE_MAX_CONCURRENCY        上限（MAX_CONCURRENCY 的 4 倍）
+    ADAPTIVE_INTERVAL               窗口秒数（1）
+    ADAPTIVE_MIN_SAMPLES            窗口内至少多少个请求才调整（10）
+    ADAPTIVE_ERROR_RATE             错误率阈值（0.05），异常、5xx 与 429 响应计为错误
+    ADAPTIVE_LATENCY_TOLERANCE      p90 相对基线延迟的容忍倍数（2）
+    ADAPTIVE_INCREASE               加性增加的步长（1）
+    ADAPTIVE_DECREASE               乘性减少的系数（0.7）
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.payload.utils.tools import get_current_ms
+
+
+def adaptive_enabled() -> bool:
+    return os.getenv("ADAPTIVE_CONCURRENCY", "").lower() in ("1", "true", "yes")
+
+
+def adaptive_max(max_concurrency: int) -> int:
+    return int(os.getenv("ADAPTIVE_MAX_CONCURRENCY", 0)) or max_concurrency * 4
+
+
+class AdaptiveSemaphore(asyncio.Semaphore):
+    """
+    可以调整大小的信号量。调小时空闲名额立即收回，不够收回的部分记为欠额，由之后归还的名额抵扣，
+    正在执行的节点不会被打断。
+    """
+
+    def __init__(self, value: int):
+        super().__init__(value)
+        self.limit = value
+        self._debt = 0
+
+    def release(self):
+        if self._debt:
+            self._debt -= 1
+            return
+        super().release()
+
+    def set_limit(self, limit: int):
+        delta, self.limit = limit - self.limit, limit
+        if delta > 0:
+            repaid = min(self._debt, delta)
+            self._debt -= repaid
+            for _ in range(delta - repaid):
+                super().release()
+        elif delta < 0:
+            taken = min(self._value, -delta)
+            self._value -= taken
+            self._debt += -delta - taken
+
+    @property
+    def in_use(self) -> int:
+        return self.limit - self._value + self._debt
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 并发控制器，挂在 AsyncContext.concurrency 上（未开启时为 None）。
+    接口步骤把它放进请求的 trace 上下文，HttpClient 的请求结束、请求异常钩子调用 observe 上报。
+    """
+
+    def __init__(self, semaphore: AdaptiveSemaphore, maximum: int,
+                 report: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None):
+        self.semaphore = semaphore
+        self.initial = semaphore.limit
+        self.minimum = max(1, int(os.getenv("ADAPTIVE_MIN_CONCURRENCY", 1)))
+        self.maximum = max(self.initial, maximum)
+        self.interval = float(os.getenv("ADAPTIVE_INTERVAL", 1))
+        self.min_samples = int(os.getenv("ADAPTIVE_MIN_SAMPLES", 10))
+        self.error_rate = float(os.getenv("ADAPTIVE_ERROR_RATE", 0.05))
+        self.tolerance = float(os.getenv("ADAPTIVE_LATENCY_TOLERANCE", 2))
+        self.increase = int(os.getenv("ADAPTIVE_INCREASE", 1))
+        self.decrease = float(os.getenv("ADAPTIVE_DECREASE", 0.7))
+        self.report = report
+        self.baseline_ms: Optional[float] = None
+        # 调整记录，最多保留最近 500 次
+        self.history = deque(maxlen=500)
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._saturated = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def limit(self) -> int:
+        return self.semaphore.limit
+
+    def observe(self, latency_ms: float, error: bool = False):
+        """上报一次请求：成功请求的耗时计入延迟分位数，错误只计入错误率"""
+        if error:
+            self._errors += 1
+        else:
+            self._latencies.append(latency_ms)
+        if self.semaphore.locked():
+            self._saturated = True
+
+    def start(self):
+        if self._task is None:
+            self._add_history("start")
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> Dict[str, Any]:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        stats = self.stats()
+        await self._report(stats)
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "initial": self.initial,
+            "min": self.minimum,
+            "max": self.maximum,
+            "current": self.limit,
+            "baseline_ms": round(self.baseline_ms, 3) if self.baseline_ms is not None else None,
+            "history": list(self.history),
+        }
+
+    def adjust(self) -> bool:
+        """根据当前窗口调整一次上限，返回是否有变化；样本不足时窗口继续累积"""
+        samples = len(self._latencies) + self._errors
+        if samples < self.min_samples:
+            return False
+        latencies = sorted(self._latencies)
+        error_rate = self._errors / samples
+        p50 = latencies[len(latencies) // 2] if latencies else None
+        p90 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))] if latencies else None
+        if p50 is not None:
+            self.baseline_ms = p50 if self.baseline_ms is None else \
+                min(p50, self.baseline_ms + (p50 - self.baseline_ms) * 0.1)
+        limit, reason = self.limit, None
+        if error_rate > self.error_rate:
+            limit, reason = int(limit * self.decrease), "errors"
+        elif p90 is not None and p90 > self.baseline_ms * self.tolerance:
+            limit, reason = int(limit * self.decrease), "latency"
+        elif self._saturated:
+            limit, reason = limit + self.increase, "increase"
+        limit = max(self.minimum, min(self.maximum, limit))
+        window = {"samples": samples, "error_rate": round(error_rate, 4),
+                  "p50_ms": round(p50, 3) if p50 is not None else None,
+                  "p90_ms": round(p90, 3) if p90 is not None else None}
+        self._latencies, self._errors, self._saturated = [], 0, False
+        if limit == self.limit:
+            return False
+        self.semaphore.set_limit(limit)
+        self._add_history(reason, **window)
+        return True
+
+    def _add_history(self, reason: str, **window):
+        self.history.append({"at": get_current_ms(), "limit": self.limit, "reason": reason, **window})
+
+    async def _report(self, stats: Dict[str, Any]):
+        if self.report is None:
+            return
+        try:
+            await self.report(stats)
+        except Exception as e:
+            # 只用于观测，写入失败不影响任务执行
+            print(f"并发上限写入失败：{e}")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.adjust():
+                await self._report(self.stats())
+
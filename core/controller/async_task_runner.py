@@ -1,8 +1,12 @@
 import asyncio
+import contextlib
+import os
+import traceback
 from collections import deque
 from dataclasses import dataclass
-from typing import Coroutine, Any, Optional, Tuple
+from typing import Coroutine, Any, Optional, Tuple, List, Union, Iterable, AsyncIterable, AsyncIterator
 
+from core.controller.adaptive_limit import AdaptiveSemaphore, AdaptiveConcurrency, adaptive_enabled, adaptive_max
 from core.enums.executor import RunningModeEnum
 from core.executor.core import RunnerExecutor
 from core.utils.tools import SkippedStepResult
@@ -15,13 +19,315 @@ class _TaskInfo:
     metadata: Any = None
 
 
+class TaskTracker:
+    """
+    动态创建的 Task 的计数器：Task 结束时立即释放引用，只保留计数与第一个异常，
+    等待全部完成通过计数归零的事件实现，不再持有一个只增不减的 Task 列表。
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.finished = 0
+        self.exception: Optional[BaseException] = None
+        # 事件循环只持有 Task 的弱引用，运行中的 Task 需要在这里保持强引用
+        self._running = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def outstanding(self) -> int:
+        return self.started - self.finished
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.started += 1
+        self._running.add(task)
+        self._idle.clear()
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        self.finished += 1
+        self._running.discard(task)
+        if not task.cancelled():
+            exception = task.exception()
+            if exception is not None and self.exception is None:
+                # 取出异常，避免 "Task exception was never retrieved"，在 wait 时抛出
+                self.exception = exception
+        if self.outstanding == 0:
+            self._idle.set()
+
+    async def wait(self):
+        """等待所有已创建的 Task 完成，期间新创建的 Task 也会等待；有 Task 异常结束时抛出第一个异常"""
+        while self.outstanding:
+            await self._idle.wait()
+        if self.exception is not None:
+            exception, self.exception = self.exception, None
+            raise exception
+
+
+class LazyExecutors:
+    """
+    按需创建的一组执行器：包装一个生成执行器的（异步）迭代器，执行到时才逐个创建，
+    同时存在（已创建、未结束）的执行器不超过 window 个（默认为组的并发上限），峰值内存与驱动次数无关。
+    与 deque 一样交给 run_sequentially / run_concurrently / run_loop_strategy 执行，结果不再逐个收集。
+    """
+    __slots__ = ("source", "window")
+
+    def __init__(self, source: Union[Iterable, AsyncIterable], window: Optional[int] = None):
+        self.source = source
+        self.window = window
+
+    async def __aiter__(self) -> AsyncIterator[RunnerExecutor]:
+        if hasattr(self.source, "__anext__"):
+            async for executor in self.source:
+                yield executor
+        else:
+            for executor in self.source:
+                yield executor
+
+
+class _TaskGroup:
+    """一次 run_concurrently 提交的一组执行器，等待方与工作协程共同消费，limit 为组内同时执行的上限"""
+
+    def __init__(self, subtasks: deque, limit: Optional[int] = None):
+        self.pending = deque(enumerate(subtasks))
+        subtasks.clear()
+        self.results: Optional[List[Any]] = [None] * len(self.pending)
+        self.remaining = len(self.pending)
+        self.limit = limit
+        self.active = 0
+        # 所有执行器都已进入 pending；按需创建的组在生成完之前为 False
+        self.exhausted = True
+        # 是否在调度器的就绪队列中
+        self.queued = False
+        self.exception: Optional[BaseException] = None
+        self.done = asyncio.Event()
+        self.slot_freed = asyncio.Event()
+        if self.remaining == 0:
+            self.done.set()
+
+    def pop(self) -> Optional[Tuple[int, RunnerExecutor]]:
+        if not self.pending or (self.limit and self.active >= self.limit):
+            return None
+        return self.pending.popleft()
+
+    def set_result(self, index: Optional[int], result: Any):
+        if self.results is not None:
+            self.results[index] = result
+
+    def finish_one(self):
+        self.active -= 1
+        self.remaining -= 1
+        self.slot_freed.set()
+        if self.remaining == 0 and self.exhausted:
+            self.done.set()
+
+
+class _LazyTaskGroup(_TaskGroup):
+    """按需创建的一组执行器：由生成协程边执行边补充 pending，已创建、未结束的执行器不超过 window 个"""
+
+    def __init__(self, limit: Optional[int], window: int):
+        super().__init__(deque(), limit)
+        self.results = None
+        self.exhausted = False
+        self.window = max(1, window)
+        self.space = asyncio.Event()
+        self.done.clear()
+
+    def finish_one(self):
+        super().finish_one()
+        self.space.set()
+
+
+class WorkerPoolScheduler:
+    """
+    有界的工作协程池：run_concurrently 只把执行器放进就绪队列，由最多 workers 个工作协程取出执行，
+    不再为每个节点创建一个 asyncio.Task，内存与调度开销只与并发数相关，与任务树的大小无关。
+
+    等待一组任务的调用方（通常是正在执行的父节点）不会空等，而是从自己的组里取出尚未开始的执行器直接执行，
+    因此即使所有工作协程都在等待子节点，任务树也能继续推进。
+    与 asyncio.gather 一致：组内任一执行器抛出异常时，等待方立即收到该异常，其余执行器继续执行。
+    """
+
+    def __init__(self, context: 'AsyncContext', workers: int):
+        self.context = context
+        self.workers = max(1, workers)
+        self.ready: deque[_TaskGroup] = deque()
+        self.running = 0
+
+    def submit(self, subtasks: deque, limit: Optional[int] = None) -> _TaskGroup:
+        group = _TaskGroup(subtasks, limit)
+        if group.remaining:
+            self._enqueue(group)
+            # 等待方自己也会执行组内的任务，只需为其余的任务唤起工作协程
+            self._spawn(min(group.remaining, limit or group.remaining) - 1)
+        return group
+
+    def submit_lazy(self, subtasks: LazyExecutors, limit: Optional[int], window: int) -> _TaskGroup:
+        group = _LazyTaskGroup(limit, window)
+        self.context.tracker.spawn(self._feed(group, subtasks))
+        return group
+
+    def _enqueue(self, group: _TaskGroup):
+        if not group.queued:
+            group.queued = True
+            self.ready.append(group)
+
+    async def _feed(self, group: _LazyTaskGroup, subtasks: LazyExecutors):
+        """逐个创建执行器放进组里，已创建、未结束的执行器达到 window 个时等待有执行器结束"""
+        try:
+            async for executor in subtasks:
+                group.pending.append((None, executor))
+                group.remaining += 1
+                self._enqueue(group)
+                group.slot_freed.set()
+                if group.active + len(group.pending) > 1:
+                    self._spawn(1)
+                while group.remaining >= group.window and group.exception is None:
+                    group.space.clear()
+                    await group.space.wait()
+                if group.exception is not None:
+                    break
+        except Exception as e:
+            # 创建执行器失败（如驱动脚本异常）与组内执行器异常一样由等待方抛出
+            if group.exception is None:
+                group.exception = e
+        finally:
+            group.exhausted = True
+            group.slot_freed.set()
+            if group.remaining == 0 or group.exception is not None:
+                group.done.set()
+
+    def _spawn(self, count: int):
+        # 工作协程按需启动，队列为空时退出，空闲时不占用任何 Task
+        for _ in range(min(count, self.workers - self.running)):
+            self.running += 1
+            self.context.tracker.spawn(self._worker())
+
+    def _next(self) -> Optional[Tuple[_TaskGroup, int, RunnerExecutor]]:
+        # 丢弃已被取空的组
+        while self.ready and not self.ready[0].pending:
+            # 按需创建的组补充执行器后会重新入队
+            self.ready.popleft().queued = False
+        for group in self.ready:
+            # 达到并发上限的组跳过，由它的等待方在有空位时继续执行
+            item = group.pop()
+            if item is not None:
+                return group, item[0], item[1]
+        return None
+
+    async def _worker(self):
+        try:
+            while True:
+                item = self._next()
+                if item is None:
+                    return
+                try:
+                    await self._run_item(*item)
+                except Exception:
+                    # 异常已记录到组上，由等待方抛出
+                    pass
+        finally:
+            self.running -= 1
+
+    async def _run_item(self, group: _TaskGroup, index: Optional[int], executor: RunnerExecutor):
+        group.active += 1
+        try:
+            group.set_result(index, await self.context._run_task(executor))
+        except Exception as e:
+            if group.exception is None:
+                group.exception = e
+                group.done.set()
+            raise
+        finally:
+            group.finish_one()
+
+    async def join(self, group: _TaskGroup) -> Optional[List[Any]]:
+        """等待一组任务完成，等待期间由调用方执行组内尚未开始的执行器"""
+        while group.exception is None and (group.pending or not group.exhausted):
+            item = group.pop()
+            if item is None:
+                # 组内并发已满，或按需创建的执行器还没有生成，等待组内有执行器结束或补充
+                group.slot_freed.clear()
+                await group.slot_freed.wait()
+                continue
+            try:
+                await self._run_item(group, *item)
+            except Exception:
+                break
+        if group.pending:
+            # 有执行器异常时等待方立即返回，与 gather 一致，组内其余的执行器交给工作协程继续执行
+            self._enqueue(group)
+            self._spawn(min(len(group.pending), group.limit or len(group.pending)))
+        await group.done.wait()
+        if group.exception is not None:
+            raise group.exception
+        return group.results
+
+
+class BackgroundWriter:
+    """
+    记录写入队列：send_step 等不等待结果的写入放进队列，由最多 workers 个写入协程依次执行，
+    不再为每次写入创建两个 Task。TaskRunner 结束前会等待队列写完。
+    """
+
+    def __init__(self, tracker: TaskTracker, workers: int):
+        self.tracker = tracker
+        self.workers = max(1, workers)
+        self.queue: deque[Coroutine] = deque()
+        self.running = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def submit(self, coro: Coroutine):
+        self.queue.append(coro)
+        self.idle.clear()
+        if self.running < self.workers:
+            self.running += 1
+            self.tracker.spawn(self._worker())
+
+    async def _worker(self):
+        try:
+            while self.queue:
+                coro = self.queue.popleft()
+                try:
+                    await coro
+                except Exception as e:
+                    traceback.print_exc()
+                    print(f"记录写入失败：{e}")
+        finally:
+            self.running -= 1
+            if self.running == 0 and not self.queue:
+                self.idle.set()
+
+    async def flush(self):
+        await self.idle.wait()
+
+
 class AsyncContext:
-    def __init__(self, max_concurrency: Optional[int] = None):
+    def __init__(self, max_concurrency: Optional[int] = None, scheduler: Optional[str] = None):
         """
-        :param max_concurrency: 最大并发任务数
+        :param max_concurrency: 整个任务同时执行的叶子节点（接口、脚本等）上限，用例、子用例、多任务器等容器节点不占用
+        :param scheduler: pool（默认，有界工作协程池）| task（每个节点一个 Task），默认读取环境变量 TASK_SCHEDULER
         """
-        self.tasks = []
+        self.tracker = TaskTracker()
         self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        # ADAPTIVE_CONCURRENCY 开启时名额可以在运行时调整，由 AdaptiveConcurrency 按接口延迟与错误率控制
+        self.concurrency: Optional[AdaptiveConcurrency] = None
+        if max_concurrency and adaptive_enabled():
+            self.semaphore = AdaptiveSemaphore(max_concurrency)
+            self.concurrency = AdaptiveConcurrency(self.semaphore, adaptive_max(max_concurrency))
+        self._unlimited = contextlib.nullcontext()
+        self.scheduler_name = scheduler or os.getenv("TASK_SCHEDULER", "pool")
+        # 工作协程数需要容纳调大后的上限
+        workers = int(os.getenv("SCHEDULER_WORKERS", 0)) or \
+            (self.concurrency.maximum if self.concurrency is not None else max_concurrency) or 100
+        self.scheduler = WorkerPoolScheduler(self, workers) if self.scheduler_name == "pool" else None
+        # 按需创建的执行器的窗口：CHILD_EXECUTOR_WINDOW > 组的并发上限 > 工作协程数
+        self.lazy_window = int(os.getenv("CHILD_EXECUTOR_WINDOW", 0)) or None
+        self.workers = workers
+        self.writer = BackgroundWriter(self.tracker, int(os.getenv("RECORD_WRITE_WORKERS", 32)))
 
     async def _run_task(
             self,
@@ -35,7 +341,8 @@ class AsyncContext:
         else:
             try:
                 before_result = before_result if isinstance(before_result, Tuple) else (before_result,)
-                async with self.semaphore:
+                # 容器节点等待子节点期间不占用名额，否则父节点占满名额后子节点永远排不上，深层并发树会饿死或死锁
+                async with self.leaf_slot(task):
                     result = await task.run(*before_result)
                 if isinstance(result, SkippedStepResult):
                     await task.skipped_callback(result, *before_result)
@@ -45,17 +352,46 @@ class AsyncContext:
             except Exception as e:
                 await task.error_callback(e, *before_result)
 
+    def leaf_slot(self, task: RunnerExecutor):
+        if self.semaphore is None or getattr(task, "is_container", False):
+            return self._unlimited
+        return self.semaphore
+
     def run_concurrently(
             self,
-            subtasks: deque[RunnerExecutor]
+            subtasks: Union[deque[RunnerExecutor], LazyExecutors],
+            limit: Optional[int] = None
+    ):
+        """
+        并发地启动一组任务，返回可等待对象，结果为各任务结果组成的列表（按需创建的一组执行器不收集结果）
+        :param limit: 组内同时执行的上限（如一个用例下同时执行的子用例数），叶子节点仍受任务级上限约束
+        """
+        if isinstance(subtasks, LazyExecutors):
+            window = subtasks.window or self.lazy_window or limit or self.workers
+            if self.scheduler is None:
+                return self._run_lazily_by_task(subtasks, limit, window)
+            return self.scheduler.join(self.scheduler.submit_lazy(subtasks, limit, window))
+        if self.scheduler is None:
+            return self._run_concurrently_by_task(subtasks, limit)
+        return self.scheduler.join(self.scheduler.submit(subtasks, limit))
+
+    def _run_concurrently_by_task(
+            self,
+            subtasks: deque[RunnerExecutor],
+            limit: Optional[int] = None
     ) -> asyncio.Task:
-        """并发地启动一组任务"""
+        """原有实现：每个任务一个 Task，保留用于对比与回退"""
         task_group = []
+        group_semaphore = asyncio.Semaphore(limit) if limit else None
+
+        async def run_limited(executor):
+            async with group_semaphore:
+                return await self._run_task(executor)
+
         while subtasks:
             task_executor = subtasks.popleft()
-            task_obj = asyncio.create_task(
-                self._run_task(task_executor))
-            self.tasks.append(task_obj)
+            coro = run_limited(task_executor) if group_semaphore else self._run_task(task_executor)
+            task_obj = self.tracker.spawn(coro)
             task_group.append(task_obj)
 
         async def wait_group():
@@ -63,21 +399,71 @@ class AsyncContext:
 
         return asyncio.create_task(wait_group())
 
+    async def _run_lazily_by_task(self, subtasks: LazyExecutors, limit: Optional[int], window: int):
+        """原有实现下的按需创建：每个执行器一个 Task，已创建、未结束的 Task 不超过 window 个"""
+        window_semaphore = asyncio.Semaphore(max(1, window))
+        group_semaphore = asyncio.Semaphore(limit) if limit else None
+        running = set()
+        errors: List[BaseException] = []
+
+        async def run_one(executor):
+            try:
+                if group_semaphore is None:
+                    return await self._run_task(executor)
+                async with group_semaphore:
+                    return await self._run_task(executor)
+            finally:
+                window_semaphore.release()
+
+        def on_done(task_obj: asyncio.Task):
+            running.discard(task_obj)
+            if not task_obj.cancelled() and task_obj.exception() is not None and not errors:
+                errors.append(task_obj.exception())
+
+        executors = subtasks.__aiter__()
+        while True:
+            # 先占用窗口再创建下一个执行器，已创建、未结束的执行器不超过 window 个
+            await window_semaphore.acquire()
+            if errors:
+                window_semaphore.release()
+                break
+            try:
+                task_executor = await executors.__anext__()
+            except StopAsyncIteration:
+                window_semaphore.release()
+                break
+            task_obj = self.tracker.spawn(run_one(task_executor))
+            running.add(task_obj)
+            task_obj.add_done_callback(on_done)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        if errors:
+            raise errors[0]
+
     async def run_sequentially(
             self,
-            subtasks: deque[RunnerExecutor]
+            subtasks: Union[deque[RunnerExecutor], LazyExecutors]
     ):
         """按顺序逐个执行一组任务"""
+        if isinstance(subtasks, LazyExecutors):
+            async for executor in subtasks:
+                await self._run_task(executor)
+            return
         while subtasks:
             await self._run_task(subtasks.popleft())
 
+    def submit_background(self, coro: Coroutine):
+        """提交一个不需要等待结果的协程（记录写入）"""
+        self.writer.submit(coro)
+
 
 class TaskRunner:
-    def __init__(self, max_concurrency: Optional[int] = None):
+    def __init__(self, max_concurrency: Optional[int] = None, scheduler: Optional[str] = None):
         """
         :param max_concurrency: 最大并发任务数
+        :param scheduler: 调度方式，见 AsyncContext
         """
-        self.context = AsyncContext(max_concurrency)
+        self.context = AsyncContext(max_concurrency, scheduler)
         self.max_concurrency = max_concurrency
 
     async def run(self, *tasks: Coroutine, mode: RunningModeEnum = RunningModeEnum.CONCURRENTLY):
@@ -104,12 +490,19 @@ class TaskRunner:
         await self.wait_for_dynamic_tasks()
 
     async def wait_for_dynamic_tasks(self):
-        """等待所有动态添加的任务完成"""
-        if self.context.tasks:
-            await asyncio.gather(*self.context.tasks)
+        """等待所有动态添加的任务完成，并等待后台的记录写入全部完成"""
+        await self.context.tracker.wait()
+        await self.context.writer.flush()
+
+    def get_outstanding_tasks(self) -> int:
+        """获取已创建但尚未结束的动态任务数"""
+        return self.context.tracker.outstanding
 
     def get_running_tasks(self) -> int:
         """获取当前正在运行的任务数"""
         if not self.max_concurrency:
             return 1
+        if isinstance(self.context.semaphore, AdaptiveSemaphore):
+            return self.context.semaphore.in_use
         return self.max_concurrency - self.context.semaphore._value
+
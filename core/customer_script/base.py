@@ -68,22 +68,8 @@ class ContextDocument:
             self.__dict__[forbidden_function] = ForbiddenFunction(forbidden_function)
 
     def get_main_case_index_callback(self):
-        index = -1
-
-        def search_index(_node):
-            if _node.parent is None:
-                return None
-            else:
-                metadata = _node.node.metadata
-                if metadata.type == "child_case":
-                    nonlocal index
-                    index = metadata.index_in_global_list
-                    return None
-                else:
-                    return search_index(_node.parent)
-
-        search_index(self.at.node)
-        return index
+        child_case_node = self.at.node.scope.child_case
+        return child_case_node.node.metadata.index_in_global_list if child_case_node is not None else -1
 
     def get_position_callback(self):
 
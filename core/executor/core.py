@@ -60,7 +60,7 @@ class StepExecutor(Executor):
 
     async def send_step(self, process: ProcessObject):
         process.set_position_list(self.node.node.spi.position_list)
-        await self.node.node.add_step(process.to_json())
+        await self.node.node.add_step(process.to_json(self.node.node.record.position_paths))
 
     async def send_system_notice_step(self, s: str):
         await self.send_step(ProcessObject(desc=s))
@@ -115,6 +115,14 @@ class StepExecutor(Executor):
 
 
 class RunnerExecutor:
+    """
+    运行节点的基类。一个任务会创建大量节点，子类都要用 __slots__ 声明字段，不再为每个节点分配 __dict__；
+    节点上不放任何单独分配的同步原语，记录写入的并发由任务级的后台写入队列控制。
+    """
+    __slots__ = ("metadata", "global_option", "task_runner", "dynamic_mapping", "record", "spi", "status", "start",
+                 "end", "result", "is_end_before_run", "has_child_error", "has_child_skipped")
+    # 容器节点只负责驱动子节点，执行期间不占用任务级的并发名额
+    is_container = False
 
     def __init__(self, metadata: Any, global_option, task_runner, dynamic_mapping, record, spi):
         self.metadata: Any = metadata
@@ -130,7 +138,6 @@ class RunnerExecutor:
         self.is_end_before_run = False
         self.has_child_error = False
         self.has_child_skipped = False
-        self.redis_semaphore = asyncio.Semaphore(100)
 
     def check_and_change_status(self, current_node: MultiwayTreeNode, check_self=True):
         # 这个状态目前只会用于父级、超父级的状态判断
@@ -146,22 +153,19 @@ class RunnerExecutor:
             return
         if not isinstance(current_node.node.metadata, TaskInfo):
             # 检查任务状态
-            task_index = f"{self.spi.task}_task"
-            task_node: MultiwayTreeNode = self.dynamic_mapping.get(task_index)
+            task_node: MultiwayTreeNode = current_node.parent.scope.task
             if task_node.node.status in skipped_status_tuple:
                 self.status = NodeStatusEnum.SKIPPED
                 return
         if not isinstance(current_node.node.metadata, (Case, TaskInfo)):
             # 检查用例状态
-            case_index = f"{self.spi.task}_{self.spi.case_index}_case"
-            case_node: MultiwayTreeNode = self.dynamic_mapping.get(case_index)
+            case_node: MultiwayTreeNode = current_node.parent.scope.main_case
             if case_node.node.status in skipped_status_tuple:
                 self.status = NodeStatusEnum.SKIPPED
                 return
         if not isinstance(current_node.node.metadata, (ChildCase, Case, TaskInfo)):
             # 检查子用例状态
-            child_case_index = f"{self.spi.task}_{self.spi.case_index}_{self.spi.child_case}_child_case"
-            child_case_node: MultiwayTreeNode = self.dynamic_mapping.get(child_case_index)
+            child_case_node: MultiwayTreeNode = current_node.parent.scope.child_case
             if child_case_node.node.status in skipped_status_tuple:
                 self.status = NodeStatusEnum.SKIPPED
                 return
@@ -191,12 +195,8 @@ class RunnerExecutor:
         process = ScriptPrintProcessObject(sep.join(_args))
         process.set_position_list(self.spi.position_list)
 
-        async def _inner_print(data):
-            async with self.redis_semaphore:
-                await self.add_step_or_update(data)
-
-        print_content = process.to_json()
-        self.run_concurrently(_inner_print(print_content))
+        print_content = process.to_json(self.record.position_paths)
+        self.run_concurrently(self.add_step_or_update(print_content))
 
     @classmethod
     def run_concurrently_waiting(cls, task) -> Any:
@@ -207,17 +207,9 @@ class RunnerExecutor:
 
         return result_list[0]
 
-    @classmethod
-    def run_concurrently(cls, task):
-        """并发地启动一组任务"""
-        task_group = []
-        task_obj = asyncio.create_task(task)
-        task_group.append(task_obj)
-
-        async def wait_group():
-            return await asyncio.gather(*task_group)
-
-        return asyncio.create_task(wait_group())
+    def run_concurrently(self, task):
+        """提交一个不等待结果的记录写入，由任务的后台写入队列执行，任务结束前会等待写完"""
+        self.task_runner.context.submit_background(task)
 
     def step_key(self, t: RecordMessageTypeEnum = RecordMessageTypeEnum.STATUS):
         main_key = self.record.redis_index
@@ -277,7 +269,7 @@ class RunnerExecutor:
         send_list = []
         for item in process:
             item.set_position_list(self.spi.position_list)
-            send_list.append(item.to_json())
+            send_list.append(item.to_json(self.record.position_paths))
         self.run_concurrently(self.add_step(*send_list))
 
     async def set_child_case_step_status(self, **kwargs):
@@ -288,23 +280,39 @@ class RunnerExecutor:
         send_list = []
         for item in process:
             item.set_position_list(self.spi.position_list)
-            send_list.append(item.to_json())
+            send_list.append(item.to_json(self.record.position_paths))
         self.run_concurrently(self.add_parent_step(*send_list))
 
     def send_child_case(self, *process: ProcessObject):
         send_list = []
         for item in process:
             item.set_position_list(self.spi.position_list)
-            send_list.append(item.to_json())
+            send_list.append(item.to_json(self.record.position_paths))
         self.run_concurrently(self.add_child_case(*send_list))
 
     def send_summary(self, *process: ProcessObject):
         send_list = []
         for item in process:
             item.set_position_list(self.spi.position_list)
-            send_list.append(item.to_json())
+            send_list.append(item.to_json(self.record.position_paths))
         self.run_concurrently(self.add_summary(*send_list))
 
+    def send_records(self, process: ProcessObject, step=True, parent_step=True, child_case=True, summary=True):
+        """同一个事件写入步骤、父步骤、子用例、汇总多个列表时，合并为一次 pipeline 写入"""
+        process.set_position_list(self.spi.position_list)
+        content = process.to_json(self.record.position_paths)
+        keys = []
+        if step:
+            keys.append(self.step_key(RecordMessageTypeEnum.PROCESS))
+        if parent_step and self.step_parent_key():
+            keys.append(self.step_parent_key(RecordMessageTypeEnum.PROCESS))
+        if child_case:
+            keys.append(self.child_case_key())
+        if summary:
+            keys.append(self.summary_key())
+        if keys:
+            self.run_concurrently(self.record.batch_push_to_keys({key: [content] for key in keys}))
+
     async def add_step(self, *args):
         key = self.step_key(RecordMessageTypeEnum.PROCESS)
         await self.record.batch_push_to_key(key, *args)
@@ -0,0 +1,216 @@
+"""
+按历史耗时安排子用例的开始顺序，缩短任务的总耗时（makespan）。
+
+每个记录结束时，从记录的 child_case_list 中读取各子用例的 start、end，按任务汇总到
+duration_history:{task_id}（field 为 "<用例 id>:<子用例序号>"，值为指数平均后的耗时毫秒数）。
+下一次执行同一个任务时，并发执行的用例、子用例按预期耗时从长到短开始（LPT），
+避免耗时最长的子用例排在最后开始、单独拖长整个任务；顺序执行的节点保持原有顺序。
+
+任务结束时把预测与实际的总耗时写入 record_info 的 makespan 字段。
+
+环境变量：
+    DURATION_HISTORY            是否启用，默认 1
+    DURATION_HISTORY_ALPHA      新一次耗时的权重，默认 0.5
+    DURATION_HISTORY_TTL        历史保留的秒数，默认 30 天，每次写入时刷新
+"""
+import heapq
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.enums.executor import NodeStatusEnum, RunningModeEnum
+from core.global_client.async_redis import get_async_client
+from core.payload.utils.tools import get_current_ms
+
+
+def lpt_makespan(durations: Iterable[float], machines: int) -> float:
+    """按从长到短把耗时依次分给当前最空闲的执行者，返回最晚的结束时间"""
+    durations = sorted(durations, reverse=True)
+    if not durations:
+        return 0
+    machines = max(1, min(machines, len(durations)))
+    loads = [0] * machines
+    for duration in durations:
+        heapq.heappush(loads, heapq.heappop(loads) + duration)
+    return max(loads)
+
+
+class DurationHistory:
+    """
+    一个任务的子用例历史耗时（挂在 GlobalOption.history 上，未启用时为 None）。
+
+    没有历史的子用例按同一用例内已知耗时的平均值估计，整个任务都没有历史时按 0 估计，
+    此时排序保持原有顺序，也不给出预测值。
+    """
+
+    # 正常结束的子用例耗时才计入历史，跳过、出错的子用例耗时没有参考意义
+    RECORDED_STATUS = {NodeStatusEnum.END.value, NodeStatusEnum.ERROR_CHILD.value,
+                       NodeStatusEnum.SKIPPED_CHILD.value}
+
+    def __init__(self, task_id, durations: Optional[Dict[str, float]] = None):
+        self.task_id = task_id
+        self.durations: Dict[str, float] = durations or {}
+        self.alpha = float(os.getenv("DURATION_HISTORY_ALPHA", 0.5))
+        self.ttl = int(os.getenv("DURATION_HISTORY_TTL", 30 * 24 * 3600))
+        # 任务开始执行的时间与预测的总耗时，任务结束时写入 record_info
+        self.started_at: Optional[int] = None
+        self.predicted_ms: Optional[float] = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("DURATION_HISTORY", "1").lower() not in ("0", "false", "no")
+
+    @staticmethod
+    def key(task_id) -> str:
+        return f"duration_history:{task_id}"
+
+    @staticmethod
+    def field(case_id, index) -> str:
+        return f"{case_id}:{index}"
+
+    @classmethod
+    async def load(cls, task_id) -> Optional["DurationHistory"]:
+        if not cls.enabled():
+            return None
+        try:
+            raw = await get_async_client()[0].hgetall(cls.key(task_id))
+        except Exception as e:
+            # 历史只影响开始顺序，读取失败时按原有顺序执行
+            print(f"读取任务 {task_id} 的历史耗时失败：{e}")
+            raw = {}
+        return cls(task_id, {field: float(value) for field, value in raw.items()})
+
+    # ---------- 预测 ----------
+
+    @property
+    def known(self) -> bool:
+        return bool(self.durations)
+
+    def _fallback(self, child_cases: List[Any]) -> float:
+        known = [self.durations[field] for field in
+                 (self.field(child_case.case_id, child_case.index) for child_case in child_cases)
+                 if field in self.durations]
+        if known:
+            return sum(known) / len(known)
+        return sum(self.durations.values()) / len(self.durations) if self.durations else 0
+
+    def predict_child_cases(self, child_cases: List[Any]) -> List[float]:
+        fallback = self._fallback(child_cases)
+        return [self.durations.get(self.field(child_case.case_id, child_case.index), fallback)
+                for child_case in child_cases]
+
+    def predict_case(self, case, child_cases: List[Any], workers: int, limit: Optional[int] = None) -> float:
+        """用例的预期耗时：顺序执行时为子用例耗时之和，并发执行时按 LPT 分给 min(并发上限, 工作协程数) 个执行者"""
+        durations = self.predict_child_cases(child_cases or [])
+        if case.loop_strategy != RunningModeEnum.CONCURRENTLY.value:
+            return sum(durations)
+        return lpt_makespan(durations, min(limit or workers, workers))
+
+    def predict_task(self, task_info, case_list: List[Any], child_case_mapping: Dict[Any, List[Any]], workers: int,
+                     limit: Optional[int] = None) -> Optional[float]:
+        """
+        任务的预期总耗时，没有任何历史时返回 None。
+        用例并发执行时各用例共享工作协程，取最长的用例与全部子用例耗时平摊到工作协程上两者的较大值。
+        """
+        if not self.known:
+            return None
+        case_spans = [self.predict_case(case, child_case_mapping.get(case.id), workers, limit) for case in case_list]
+        if task_info.loop_strategy != RunningModeEnum.CONCURRENTLY.value:
+            return sum(case_spans)
+        total = sum(sum(self.predict_child_cases(child_case_mapping.get(case.id) or [])) for case in case_list)
+        return max(max(case_spans, default=0), total / max(workers, 1))
+
+    # ---------- 排序 ----------
+
+    def order_child_cases(self, child_cases: List[Any]) -> List[Any]:
+        """子用例按预期耗时从长到短排列，耗时相同时保持原有顺序"""
+        if not self.known or not child_cases:
+            return child_cases
+        durations = self.predict_child_cases(child_cases)
+        order = sorted(range(len(child_cases)), key=lambda index: -durations[index])
+        return [child_cases[index] for index in order]
+
+    def order_units(self, units: List[List[Any]]) -> List[List[Any]]:
+        """成组执行的子用例按组的预期总耗时从长到短排列，耗时相同时保持原有顺序"""
+        if not self.known or not units:
+            return units
+        child_cases = [child_case for unit in units for child_case in unit]
+        predicted = dict(zip((id(child_case) for child_case in child_cases), self.predict_child_cases(child_cases)))
+        durations = [sum(predicted[id(child_case)] for child_case in unit) for unit in units]
+        order = sorted(range(len(units)), key=lambda index: -durations[index])
+        return [units[index] for index in order]
+
+    def order_cases(self, case_list: List[Any], child_case_mapping: Dict[Any, List[Any]], workers: int,
+                    limit: Optional[int] = None) -> List[Any]:
+        if not self.known or not case_list:
+            return case_list
+        spans = [self.predict_case(case, child_case_mapping.get(case.id), workers, limit) for case in case_list]
+        order = sorted(range(len(case_list)), key=lambda index: -spans[index])
+        return [case_list[index] for index in order]
+
+    def partition(self, child_cases: List[Any], parts: int, sequential_ids: Iterable[Any] = ()) -> List[List[Any]]:
+        """
+        把子用例按 LPT 分成 parts 组，每次分给预期总耗时最小的一组，组内按全局序号排列。
+        sequential_ids 中的用例顺序执行，它的全部子用例作为一个整体分给同一组
+        """
+        sequential_ids = set(sequential_ids)
+        units: Dict[Any, List[Any]] = {}
+        durations: Dict[Any, float] = {}
+        for child_case, duration in zip(child_cases, self.predict_child_cases(child_cases)):
+            key = ("case", child_case.case_id) if child_case.case_id in sequential_ids else \
+                ("child_case", child_case.index_in_global_list)
+            units.setdefault(key, []).append(child_case)
+            durations[key] = durations.get(key, 0) + duration
+        groups: List[List[Any]] = [[] for _ in range(parts)]
+        # 预期负载相同（如耗时都按 0 估计）时分给子用例较少的一组，不会全部落在第一组
+        loads = [(0, 0, index) for index in range(parts)]
+        order = sorted(units, key=lambda key: (-durations[key], min(item.index_in_global_list for item in units[key])))
+        for key in order:
+            load, count, group = heapq.heappop(loads)
+            groups[group].extend(units[key])
+            heapq.heappush(loads, (load + durations[key], count + len(units[key]), group))
+        return [sorted(group, key=lambda item: item.index_in_global_list) for group in groups]
+
+    # ---------- 记录 ----------
+
+    def start(self, predicted_ms: Optional[float] = None):
+        self.started_at = get_current_ms()
+        self.predicted_ms = predicted_ms
+
+    async def finish(self, task_record):
+        """任务结束：写入预测与实际的总耗时，并把本次各子用例的耗时并入历史"""
+        try:
+            child_cases = [json.loads(item) for item in await task_record.redis.get_list_slice(
+                f"{task_record.redis_index}:child_case_record:child_case_list")]
+            measured = {}
+            for item in child_cases:
+                start, end = item.get("start"), item.get("end")
+                if item.get("status") in self.RECORDED_STATUS and isinstance(start, int) and isinstance(end, int):
+                    measured[self.field(item.get("case_id"), item.get("index"))] = end - start
+            if self.started_at is not None:
+                from core.record.child_record.record import RecordInfoRecord
+                await RecordInfoRecord(task_record).change_info(makespan={
+                    "predicted_ms": round(self.predicted_ms) if self.predicted_ms is not None else None,
+                    "actual_ms": get_current_ms() - self.started_at,
+                    "history_hits": sum(1 for field in measured if field in self.durations),
+                    "child_cases": len(child_cases),
+                })
+            await self._merge(measured)
+        except Exception as e:
+            # 历史只用于排序与观测，写入失败不影响任务的结束状态
+            print(f"写入任务 {self.task_id} 的历史耗时失败：{e}")
+
+    async def _merge(self, measured: Dict[str, int]):
+        if not measured:
+            return
+        merged = {}
+        for field, duration in measured.items():
+            previous = self.durations.get(field)
+            merged[field] = duration if previous is None else self.alpha * duration + (1 - self.alpha) * previous
+        client = get_async_client()[0]
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hset(self.key(self.task_id), mapping={field: round(value, 1) for field, value in merged.items()})
+            pipe.expire(self.key(self.task_id), self.ttl)
+            await pipe.execute()
+        self.durations.update(merged)
+
@@ -12,12 +12,16 @@ import aiohttp
 
 from core.enums.executor import ExecType
 from core.executor.core import Executor
+from core.executor.history import DurationHistory
+from core.executor.shard import shard_count, ShardedTaskExecutor
 from core.global_client.async_redis import close_async_pool
 from core.payload.core import PayloadExecutor
 from core.payload.node_executor.interface_utils.http_client import HttpClient
+from core.record.backup_store import RecordBackupStore
 from core.record.task_record import TaskRecord
 from core.signals.django_sync import DjangoSyncSignal
 from core.task_object.generate_object import generate, GlobalOption
+from remote.redis.coordinator import distributed_enabled, DistributedTaskExecutor
 
 
 class MainExecutor(Executor):
@@ -34,7 +38,16 @@ class MainExecutor(Executor):
             async with HttpClient().get_session() as session:
                 global_options.set_session(session)
                 await PreActionExecutor().run(global_options)
-                await TaskExecutor().run(global_options, task_record)
+                global_options.history = await DurationHistory.load(global_options.task_info.id)
+                shards = shard_count(global_options)
+                if distributed_enabled():
+                    # 子用例发布到租约队列，由各个工作节点领取执行
+                    await DistributedTaskExecutor().run(global_options, task_record, exec_dict, record)
+                elif shards > 1:
+                    # 子用例分给多个进程执行，当前进程只负责任务级的记录
+                    await ShardedTaskExecutor(shards).run(global_options, task_record, exec_dict, record)
+                else:
+                    await TaskExecutor().run(global_options, task_record)
         except Exception as e:
             traceback.print_exc()
         await PostActionExecutor().run(global_options, task_record)
@@ -131,37 +144,12 @@ class PostActionExecutor(Executor):
 
     @classmethod
     async def sync_record_file_from_ast(cls, file_list_no_suffix, directory, record_key: str):
-        file_prefix = record_key.split(":record:")[0].replace(":", "_")
-        if not os.path.isdir(directory):
+        """
+        按 Django 返回的保留列表清理当前任务的历史备份。
+        备份按任务分片存放，这里只会读取当前任务所在分片的清单；
+        按大小、时间的整体淘汰由服务进程中的 RecordBackupRetention 在后台增量执行。
+        """
+        if file_list_no_suffix is None:
             return
-
-        keep_set = {name.replace(':', '_') + '.json' for name in json.loads(file_list_no_suffix)}
-        loop = asyncio.get_running_loop()
-
-        def find_files_to_delete():
-            files_to_delete = []
-            try:
-                for filename in os.listdir(directory):
-                    if filename.startswith(file_prefix) and filename.endswith('.json') and filename not in keep_set:
-                        files_to_delete.append(os.path.join(directory, filename))
-            except OSError as e:
-                print(f"Error accessing directory {directory}: {e}")
-            return files_to_delete
-
-        files_to_delete = await loop.run_in_executor(None, find_files_to_delete)
-        if not files_to_delete:
-            return
-        delete_tasks = [
-            loop.run_in_executor(None, partial(os.remove, filepath))
-            for filepath in files_to_delete
-        ]
-
-        results = await asyncio.gather(*delete_tasks, return_exceptions=True)
-        if len(results) == 0:
-            print("Nothing to delete")
-
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                print(f"Failed to delete {files_to_delete[i]}: {result}")
-            else:
-                print(f"Successfully deleted: {files_to_delete[i]}")
+        keep_keys = json.loads(file_list_no_suffix)
+        await asyncio.to_thread(RecordBackupStore(directory).prune_group, record_key, keep_keys)
@@ -0,0 +1,374 @@
+"""
+单个任务的多进程分片执行：主进程负责任务级的记录与收尾，子用例按历史耗时（没有历史时按全局序号轮流）分给 TASK_SHARDS 个工作进程，
+每个工作进程有自己的事件循环、HTTP 会话与记录写入队列，跨进程的任务级状态统一通过记录所在的 Redis 协调。
+
+分片之间的变量与终止只是最终一致（每 TASK_SHARD_SYNC_INTERVAL 秒同步一次），不能保证跨分片的先后顺序：
+    - 顺序执行的用例，全部子用例作为一个整体分给同一个分片，在分片内按原有顺序执行；
+    - 顺序执行的任务，用例之间同样有先后依赖，不分片，在当前进程内执行；
+    - 只有并发执行的用例的子用例会分散到不同分片，它们之间本来就没有先后保证。
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import traceback
+from typing import Dict, List, Optional, Any, Set
+
+from redis.exceptions import RedisError
+
+from core.enums.executor import NodeStatusEnum, StepTypeEnum, RunningModeEnum
+from core.global_client.async_redis import get_async_client
+from core.lua_script.lua_script_manager import LuaScriptRegistry
+from core.payload.utils.tools import get_current_ms, concurrency_limit
+from core.record.utils import configure_event_seq, ShardEventSequence
+from core.utils import event_loop
+
+
+def sequential_case_ids(global_options) -> Set[Any]:
+    """顺序执行的用例，它们的子用例不能拆到不同分片"""
+    return {case.id for case in global_options.case_list.data
+            if case.loop_strategy != RunningModeEnum.CONCURRENTLY.value}
+
+
+def shard_units(child_case_list: List[Any], sequential_ids: Set[Any]) -> List[List[Any]]:
+    """
+    分片的最小单位：顺序执行的用例的全部子用例为一个单位，并发执行的用例每个子用例为一个单位。
+    按单位中最小的全局序号排列，单位内按全局序号排列
+    """
+    units: Dict[Any, List[Any]] = {}
+    for child_case in sorted(child_case_list, key=lambda item: item.index_in_global_list):
+        key = ("case", child_case.case_id) if child_case.case_id in sequential_ids else \
+            ("child_case", child_case.index_in_global_list)
+        units.setdefault(key, []).append(child_case)
+    return list(units.values())
+
+
+def shard_count(global_options) -> int:
+    """
+    TASK_SHARDS：一个任务的子用例分给多少个工作进程，未配置或不超过 1 时在当前进程内执行。
+    顺序执行的任务不分片，分片数也不超过可以拆分的单位数（见 shard_units）
+    """
+    shards = int(os.getenv("TASK_SHARDS", 1) or 1)
+    if shards <= 1:
+        return 1
+    if global_options.task_info.loop_strategy != RunningModeEnum.CONCURRENTLY.value:
+        print("任务顺序执行，用例之间有先后依赖，不分片执行")
+        return 1
+    units = shard_units(global_options.child_case_list.list, sequential_case_ids(global_options))
+    return max(1, min(shards, len(units), ShardEventSequence.MAX_SLOTS - 1))
+
+
+def partition_child_cases(child_case_list: List[Any], shards: int, shard_index: int,
+                          sequential_ids: Set[Any] = frozenset()) -> List[Any]:
+    """
+    按全局序号轮流分配，并发执行的用例的子用例分散到各进程，避免某个用例过大时负载不均；
+    顺序执行的用例整体分给一个进程
+    """
+    units = shard_units(child_case_list, sequential_ids)[shard_index::shards]
+    return sorted((child_case for unit in units for child_case in unit), key=lambda item: item.index_in_global_list)
+
+
+class TaskShard:
+    """
+    工作进程内的分片协调通道（挂在 GlobalOption.shard 上，非分片执行时为 None）。
+
+    Redis 中的协调数据（均在 {record}:shard: 前缀下，任务结束后由主进程删除）：
+        variables          共享变量，field 为 JSON 数组 ["global", key] 或 ["env", project_id, env, key]，值为 JSON
+        variables_version  共享变量的版本号，没有变化时不读取 variables
+        skipped            被错误策略终止的范围："task" 或 "case:<用例 id>"，所有分片都会跳过
+        case_started       各用例第一个开始的部分，由它写用例开始记录
+        case_parts         各用例的部分数：分片执行时为用例分布在几个分片上，分布式执行时为用例的子用例数
+        case_finished      各用例已结束的部分数，最后一个结束的部分写用例结束记录
+        case_finished_parts  已结束的部分，同一部分重复结束（租约过期后被重新执行）只计一次
+        errors             各分片的异常信息，主进程据此决定任务的结束状态
+
+    变量与终止在本进程内立即生效，其他分片在下一次同步（TASK_SHARD_SYNC_INTERVAL 秒，默认 0.2）后可见。
+    """
+
+    def __init__(self, redis_index: str, label: str):
+        self.redis_index = redis_index
+        # 分片序号（从 1 开始）或分布式执行的工作节点标识，用于日志、异常与循环延迟字段
+        self.label = label
+        # 用例开始、结束时登记的部分：分片执行时为分片序号，分布式执行时为当前执行的子用例
+        self.part = label
+        self.interval = float(os.getenv("TASK_SHARD_SYNC_INTERVAL", 0.2))
+        self.global_option = None
+        self.task_node = None
+        self.case_nodes: Dict[str, Any] = {}
+        self.pending_variables: Dict[str, str] = {}
+        self.pending_skips: Set[str] = set()
+        self.applied_skips: Set[str] = set()
+        self.variables_version: Optional[int] = None
+        self._sync_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key(redis_index: str, name: str) -> str:
+        return f"{redis_index}:shard:{name}"
+
+    @classmethod
+    def all_keys(cls, redis_index: str) -> List[str]:
+        return [cls.key(redis_index, name) for name in
+                ("variables", "variables_version", "skipped", "case_started", "case_parts", "case_finished",
+                 "case_finished_parts", "errors")]
+
+    @staticmethod
+    def client():
+        return get_async_client()[0]
+
+    # ---------- 本进程内的登记与发布 ----------
+
+    def bind_task(self, task_node):
+        self.task_node = task_node
+        if "task" in self.applied_skips:
+            task_node.node.status = NodeStatusEnum.SKIPPED
+
+    def bind_case(self, case_id, case_node):
+        self.case_nodes[str(case_id)] = case_node
+        if f"case:{case_id}" in self.applied_skips:
+            case_node.node.status = NodeStatusEnum.SKIPPED
+
+    def publish_variable(self, scope: List[Any], value: Any):
+        """共享一个变量的新值，scope 见类说明；无法序列化为 JSON 的值只在本进程内生效"""
+        try:
+            encoded = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            print(f"分片 {self.label}：变量 {scope[-1]} 的值无法序列化，不会同步到其他分片")
+            return
+        self.pending_variables[json.dumps(scope, ensure_ascii=False)] = encoded
+
+    def publish_skip(self, scope: str):
+        """通知其他分片跳过一个范围（"task" 或 "case:<用例 id>"），本进程已经自行设置了状态"""
+        self.applied_skips.add(scope)
+        self.pending_skips.add(scope)
+
+    # ---------- 与 Redis 同步 ----------
+
+    async def start(self, global_option):
+        self.global_option = global_option
+        self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def close(self):
+        if self.global_option is None:
+            return
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        # 最后一次把本进程的变更写出去
+        await self.sync_once()
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync_once()
+            except (RedisError, OSError) as e:
+                print(f"分片 {self.label} 同步失败：{e}")
+            await asyncio.sleep(self.interval)
+
+    async def sync_once(self):
+        variables_key = self.key(self.redis_index, "variables")
+        version_key = self.key(self.redis_index, "variables_version")
+        skipped_key = self.key(self.redis_index, "skipped")
+        pending_variables, self.pending_variables = self.pending_variables, {}
+        pending_skips, self.pending_skips = self.pending_skips, set()
+        try:
+            async with self.client().pipeline(transaction=True) as pipe:
+                if pending_variables:
+                    pipe.hset(variables_key, mapping=pending_variables)
+                    pipe.incr(version_key)
+                if pending_skips:
+                    pipe.sadd(skipped_key, *pending_skips)
+                pipe.get(version_key)
+                pipe.smembers(skipped_key)
+                results = await pipe.execute()
+        except BaseException:
+            # 没有写出去的变更放回去，下一次同步重试；等待期间产生的新值优先
+            pending_variables.update(self.pending_variables)
+            self.pending_variables = pending_variables
+            self.pending_skips |= pending_skips
+            raise
+        version, skipped = results[-2], results[-1]
+        for scope in set(skipped) - self.applied_skips:
+            self._apply_skip(scope)
+        if version is not None and int(version) != self.variables_version:
+            self.variables_version = int(version)
+            for field, value in (await self.client().hgetall(variables_key)).items():
+                # 本进程还没写出的新值优先
+                if field not in self.pending_variables:
+                    self._apply_variable(json.loads(field), json.loads(value))
+
+    def _apply_skip(self, scope: str):
+        self.applied_skips.add(scope)
+        if scope == "task":
+            node = self.task_node
+        else:
+            node = self.case_nodes.get(scope.split(":", 1)[1])
+        if node is not None:
+            node.node.status = NodeStatusEnum.SKIPPED
+
+    def _apply_variable(self, scope: List[Any], value: Any):
+        global_cache = self.global_option.global_cache
+        if scope[0] == "global":
+            global_cache.origin_global_variable_mapping[scope[1]] = value
+        elif scope[0] == "env":
+            _, project_id, env, key = scope
+            env_variable_mapping = (global_cache.origin_project_env_variable_mapping.get(str(project_id)) or {}).get(env)
+            if env_variable_mapping is not None:
+                env_variable_mapping[key] = value
+
+    # ---------- 用例开始、结束与异常 ----------
+
+    async def enter_case(self, case_id, part: Optional[str] = None) -> bool:
+        """返回当前部分是否是第一个开始执行该用例的部分，同一部分再次开始时返回 False"""
+        return bool(await self.client().hsetnx(self.key(self.redis_index, "case_started"), str(case_id),
+                                               part or self.part))
+
+    async def leave_case(self, case_id, part: Optional[str] = None) -> bool:
+        """返回当前部分是否是最后一个结束该用例的部分，每个用例只会有一次返回 True"""
+        keys = [self.key(self.redis_index, name) for name in ("case_finished_parts", "case_finished", "case_parts")]
+        return bool(await LuaScriptRegistry.get("case_leave")(self.client(), keys, [str(case_id), part or self.part]))
+
+    async def report_error(self, message: str):
+        await self.client().hset(self.key(self.redis_index, "errors"), self.label, message)
+
+
+async def init_coordination(redis_index: str, case_parts: Dict[str, int]):
+    """清理上一次执行遗留的协调数据，case_parts 为每个用例需要等待结束的部分数"""
+    async with TaskShard.client().pipeline(transaction=True) as pipe:
+        pipe.delete(*TaskShard.all_keys(redis_index))
+        if case_parts:
+            pipe.hset(TaskShard.key(redis_index, "case_parts"), mapping=case_parts)
+        await pipe.execute()
+
+
+def run_shard(exec_dict, record, file_mapping, shard_index: int, shards: int, seq_epoch: int,
+              child_case_indexes: List[int]):
+    """工作进程入口（spawn 启动，参数都需要可序列化），child_case_indexes 为分到本分片的子用例全局序号"""
+    import dotenv
+    dotenv.load_dotenv()
+    configure_event_seq(shard_index + 1, seq_epoch)
+    event_loop.run(_run_shard(exec_dict, record, file_mapping, shard_index, shards, child_case_indexes))
+
+
+async def _run_shard(exec_dict, record, file_mapping, shard_index: int, shards: int, child_case_indexes: List[int]):
+    # 工作进程内才导入，避免与 runner 循环导入
+    from core.enums.executor import ExecType
+    from core.executor.history import DurationHistory
+    from core.executor.runner import MainExecutor
+    from core.global_client.async_redis import close_async_pool
+    from core.payload.core import PayloadExecutor
+    from core.payload.node_executor.interface_utils.http_client import HttpClient
+    from core.record.task_record import TaskRecord
+    from core.task_object.generate_object import generate
+
+    global_options = generate(exec_dict, record, MainExecutor())
+    global_options.main_executor.exec_type = ExecType(global_options.task_info.rpc_method)
+    # 文件已由主进程缓存好，直接使用主进程的路径
+    global_options.global_cache.origin_file_mapping = file_mapping
+    assigned = set(child_case_indexes)
+    global_options.child_case_list.list = [child_case for child_case in global_options.child_case_list.list
+                                           if child_case.index_in_global_list in assigned]
+    # 分片内并发执行的用例、子用例同样按历史耗时排序
+    global_options.history = await DurationHistory.load(global_options.task_info.id)
+    shard = TaskShard(global_options.record.record_backup_index, str(shard_index + 1))
+    global_options.shard = shard
+    task_record = TaskRecord(global_options)
+    print(f"分片 {shard_index + 1}/{shards}（PID {os.getpid()}）：{len(global_options.child_case_list.list)} 个子用例")
+    try:
+        async with HttpClient().get_session() as session:
+            global_options.set_session(session)
+            await shard.start(global_options)
+            try:
+                await PayloadExecutor(global_options, task_record, index=f"{shard_index + 1:02d}").run()
+            finally:
+                await shard.close()
+    except Exception as e:
+        traceback.print_exc()
+        await shard.report_error(f"分片 {shard_index + 1} 执行失败：{e}")
+    finally:
+        await global_options.database_controller.close()
+        await global_options.temp_ast_file_manager.close()
+        await close_async_pool()
+
+
+class ShardedTaskExecutor:
+    """主进程：初始化记录与协调数据，启动各分片并等待结束，再按各分片的结果写任务的结束状态"""
+
+    def __init__(self, shards: int):
+        self.shards = shards
+
+    async def run(self, global_options, task_record, exec_dict, record):
+        # 延迟导入，避免与 payload 循环导入
+        from core.payload.task_exec import RunTaskExecutor
+        from core.record.child_record.summary import SummaryRecord
+
+        seq_epoch = get_current_ms()
+        configure_event_seq(0, seq_epoch)
+        partitions = self._partitions(global_options)
+        await task_record.cache_info()
+        await init_coordination(task_record.redis_index, self._case_parts(partitions))
+        await SummaryRecord(task_record).push_message([f"任务开始（{self.shards} 个进程分片执行）"])
+        if global_options.history is not None:
+            global_options.history.start(self._predict(global_options, partitions))
+
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=run_shard,
+                                     args=(exec_dict, record, global_options.global_cache.origin_file_mapping,
+                                           index, self.shards, seq_epoch,
+                                           [child_case.index_in_global_list for child_case in partition]),
+                                     name=f"task-shard-{index + 1}", daemon=True)
+                     for index, partition in enumerate(partitions)]
+        for process in processes:
+            process.start()
+        await asyncio.gather(*(asyncio.to_thread(process.join) for process in processes))
+
+        client = TaskShard.client()
+        errors = await client.hgetall(TaskShard.key(task_record.redis_index, "errors"))
+        for index, process in enumerate(processes):
+            if process.exitcode != 0 and str(index + 1) not in errors:
+                errors[str(index + 1)] = f"分片 {index + 1} 异常退出，退出码 {process.exitcode}"
+        await client.delete(*TaskShard.all_keys(task_record.redis_index))
+        if errors:
+            await RunTaskExecutor.end_task(task_record, "；".join(errors[key] for key in sorted(errors)))
+        else:
+            await RunTaskExecutor.end_task(task_record)
+
+    def _partitions(self, global_options) -> List[List[Any]]:
+        """
+        有历史耗时时按 LPT 把子用例分给预期负载最小的分片，否则按全局序号轮流分配；
+        两种方式下顺序执行的用例都整体分给一个分片
+        """
+        history = global_options.history
+        sequential_ids = sequential_case_ids(global_options)
+        if history is not None and history.known:
+            return history.partition(global_options.child_case_list.list, self.shards, sequential_ids)
+        return [partition_child_cases(global_options.child_case_list.list, self.shards, index, sequential_ids)
+                for index in range(self.shards)]
+
+    @classmethod
+    def _predict(cls, global_options, partitions: List[List[Any]]) -> Optional[float]:
+        """各分片同时开始，预期总耗时为最慢的分片"""
+        from core.payload.task_exec import RunTaskExecutor
+
+        history, predictions = global_options.history, []
+        # 与分片内 AsyncContext 的工作协程数一致
+        workers = int(os.getenv("SCHEDULER_WORKERS", 0)) or int(os.getenv("MAX_CONCURRENCY") or 0) or 100
+        for partition in partitions:
+            mapping = RunTaskExecutor.mapping_child_case_list(partition)
+            predictions.append(history.predict_task(
+                global_options.task_info, [case for case in global_options.case_list.data if case.id in mapping],
+                mapping, workers, concurrency_limit(StepTypeEnum.CASE)))
+        return None if None in predictions else max(predictions, default=0)
+
+    @classmethod
+    def _case_parts(cls, partitions: List[List[Any]]) -> Dict[str, int]:
+        """每个用例的子用例分布在几个分片上"""
+        case_parts: Dict[str, int] = {}
+        for partition in partitions:
+            case_ids = {child_case.case_id for child_case in partition}
+            for case_id in case_ids:
+                case_parts[str(case_id)] = case_parts.get(str(case_id), 0) + 1
+        return case_parts
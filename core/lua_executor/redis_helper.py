@@ -1,7 +1,8 @@
 import json
 from typing import Union, Any
 
-from core.lua_script.lua_script_manager import LuaScriptManager
+from core.lua_script.lua_script_manager import LuaScriptRegistry
+from core.utils import json_codec
 
 
 
@@ -9,8 +10,9 @@ class LuaScriptExecutor:
     def __init__(self, redis_client, script_name: str):
         self.redis = redis_client
         self.script_name = script_name
-        from server.start import BASE_DIR
-        self.script_sha1 = LuaScriptManager.get_script_sha1(BASE_DIR, script_name)
+        # 进程级注册表中预先绑定的脚本，首次使用时才读取文件，NOSCRIPT 时自动重新加载
+        self.script = LuaScriptRegistry.get(script_name)
+        self.script_sha1 = self.script.sha1
 
     async def execute_async(self, key: str, params: dict, *other_args, key_count=1, ) -> Any:
         """异步执行 Lua 脚本 (直接使用SHA1)"""
@@ -20,11 +22,9 @@ class LuaScriptExecutor:
             raise e
 
     async def _execute_via_sha_async(self, sha: str, key, params: dict, *other_args, key_count=1) -> Any:
-        """使用 SHA 执行脚本（异步）"""
-        if len(other_args) > 0:
-            return await self.redis.evalsha(sha, key_count, key, json.dumps(params), *other_args)
-        else:
-            return await self.redis.evalsha(sha, key_count, key, json.dumps(params))
+        """使用 SHA 执行脚本（异步），与 EVALSHA 一致：前 key_count 个参数作为 KEYS，其余作为 ARGV"""
+        all_args = [key, json_codec.dumps(params), *other_args]
+        return await self.script(self.redis, all_args[:key_count], all_args[key_count:])
 
     def _prepare_args(self, args: tuple, kwargs: dict) -> list:
         """准备传递给 Redis 的参数"""
@@ -42,7 +42,7 @@ class LuaScriptExecutor:
         if isinstance(result, bytes):
             try:
                 # 尝试解码为 JSON
-                return json.loads(result.decode('utf-8'))
+                return json_codec.loads(result.decode('utf-8'))
             except UnicodeDecodeError:
                 # 如果是二进制数据，直接返回字节
                 return result
@@ -1,35 +1,108 @@
 import hashlib
 import os
+import threading
 import traceback
-from typing import Dict
+from typing import Dict, List, Any
+
+from redis.exceptions import NoScriptError
 
 from core.global_client.sync_redis import get_sync_client, close_sync_pool
 
-# 全局脚本缓存
-LUA_SCRIPTS_CACHE: Dict[str, Dict[str, str]] = {}
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "script")
 
 
-class LuaScriptManager:
+def resolve_script_dir(BASE_DIR: str = None, script_dir: str = None) -> str:
+    """脚本目录：显式传入 > 环境变量 LUA_SCRIPTS_DIR（相对项目根目录） > 模块自带的 script 目录"""
+    if script_dir:
+        return script_dir
+    lua_dir = os.getenv("LUA_SCRIPTS_DIR")
+    if lua_dir:
+        return lua_dir if os.path.isabs(lua_dir) else os.path.join(BASE_DIR or PROJECT_DIR, lua_dir)
+    return DEFAULT_SCRIPT_DIR
+
+
+class LuaScript:
+    """
+    预先绑定好的 Lua 脚本，可在任意 redis 客户端上调用。
+    始终使用 EVALSHA，Redis 重启或 SCRIPT FLUSH 后遇到 NOSCRIPT 时自动 SCRIPT LOAD 并重试一次。
+    """
+
+    def __init__(self, name: str, content: str):
+        self.name = name
+        self.content = content
+        self.sha1 = hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    async def __call__(self, client, keys: List[str], args: List[Any]) -> Any:
+        try:
+            return await client.evalsha(self.sha1, len(keys), *keys, *args)
+        except NoScriptError:
+            await client.script_load(self.content)
+            return await client.evalsha(self.sha1, len(keys), *keys, *args)
+
+    def call_sync(self, client, keys: List[str], args: List[Any]) -> Any:
+        try:
+            return client.evalsha(self.sha1, len(keys), *keys, *args)
+        except NoScriptError:
+            client.script_load(self.content)
+            return client.evalsha(self.sha1, len(keys), *keys, *args)
+
+
+class LuaScriptRegistry:
+    """进程级的脚本注册表：首次使用时才读取脚本文件，导入和启动阶段不访问 Redis"""
+    _scripts: Dict[str, LuaScript] = {}
+    _lock = threading.Lock()
+    _script_dir: str = None
+
     @classmethod
-    def initialize(cls, BASE_DIR, script_dir: str = None):
-        """初始化并加载所有Lua脚本"""
-        if not script_dir:
-            lua_dir = os.getenv("LUA_SCRIPTS_DIR")
-            script_dir = BASE_DIR + '/' + lua_dir
+    def configure(cls, script_dir: str):
+        with cls._lock:
+            cls._script_dir = script_dir
+            cls._scripts = {}
 
-        if not os.path.exists(script_dir):
-            raise FileNotFoundError(f"Lua scripts directory not found: {script_dir}")
+    @classmethod
+    def script_dir(cls) -> str:
+        return cls._script_dir or resolve_script_dir()
 
-        # 清空缓存
-        global LUA_SCRIPTS_CACHE
-        LUA_SCRIPTS_CACHE = {}
+    @classmethod
+    def get(cls, script_name: str) -> LuaScript:
+        script = cls._scripts.get(script_name)
+        if script is not None:
+            return script
+        with cls._lock:
+            script = cls._scripts.get(script_name)
+            if script is None:
+                file_path = os.path.join(cls.script_dir(), f"{script_name}.lua")
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        script = LuaScript(script_name, f.read())
+                except FileNotFoundError:
+                    raise ValueError(f"Lua script '{script_name}' not found at {file_path}")
+                cls._scripts[script_name] = script
+        return script
 
-        # 加载所有脚本
+    @classmethod
+    def all(cls) -> Dict[str, LuaScript]:
+        script_dir = cls.script_dir()
+        if not os.path.exists(script_dir):
+            raise FileNotFoundError(f"Lua scripts directory not found: {script_dir}")
         for filename in os.listdir(script_dir):
             if filename.endswith('.lua'):
-                script_name = os.path.splitext(filename)[0]
-                cls.load_script(BASE_DIR, script_name, script_dir)
-        # 加载到redis缓存
+                cls.get(os.path.splitext(filename)[0])
+        return dict(cls._scripts)
+
+
+class LuaScriptManager:
+    """
+    兼容原有接口。脚本由 LuaScriptRegistry 懒加载，EVALSHA 遇到 NOSCRIPT 会自动重新加载，
+    因此服务启动时不再需要调用 initialize；保留它用于需要显式预热的场景。
+    """
+
+    @classmethod
+    def initialize(cls, BASE_DIR, script_dir: str = None):
+        """加载所有Lua脚本并预热到 Redis"""
+        LuaScriptRegistry.configure(resolve_script_dir(BASE_DIR, script_dir))
+        LuaScriptRegistry.all()
         cls.preload_to_redis()
         close_sync_pool()
 
@@ -50,17 +123,15 @@ class LuaScriptManager:
     @classmethod
     def preload_to_redis(cls):
         redis_client, _ = get_sync_client()
-
-        global LUA_SCRIPTS_CACHE
-        for script_name, script_data in LUA_SCRIPTS_CACHE.items():
+        for script_name, script in LuaScriptRegistry.all().items():
             try:
                 # 使用SCRIPT LOAD确保脚本在Redis中可用
-                loaded_sha = redis_client.script_load(script_data['content'])
+                loaded_sha = redis_client.script_load(script.content)
 
                 # 验证SHA1是否匹配
-                if loaded_sha != script_data['sha1']:
+                if loaded_sha != script.sha1:
                     print(f"Script {script_name} SHA1 mismatch: "
-                          f"expected {script_data['sha1']}, got {loaded_sha}")
+                          f"expected {script.sha1}, got {loaded_sha}")
             except Exception as e:
                 traceback.print_exc()
                 print(f"Failed to preload script {script_name} to Redis: {str(e)}")
@@ -68,38 +139,14 @@ class LuaScriptManager:
     @classmethod
     def load_script(cls, BASE_DIR, script_name: str, script_dir: str = None):
         """加载单个脚本到缓存"""
-        if not script_dir:
-            lua_dir = os.getenv("LUA_SCRIPTS_DIR")
-            script_dir = BASE_DIR + '/' + lua_dir
-
-        file_path = os.path.join(script_dir, f"{script_name}.lua")
-
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                sha1 = hashlib.sha1(content.encode('utf-8')).hexdigest()
-
-                global LUA_SCRIPTS_CACHE
-                LUA_SCRIPTS_CACHE[script_name] = {
-                    'content': content,
-                    'sha1': sha1
-                }
-                return sha1
-        except FileNotFoundError:
-            raise ValueError(f"Lua script '{script_name}' not found at {file_path}")
+        return LuaScriptRegistry.get(script_name).sha1
 
     @classmethod
     def get_script_sha1(cls, BASE_DIR, script_name: str) -> str:
         """获取脚本的SHA1值"""
-        global LUA_SCRIPTS_CACHE
-        if script_name not in LUA_SCRIPTS_CACHE:
-            cls.load_script(BASE_DIR, script_name)
-        return LUA_SCRIPTS_CACHE[script_name]['sha1']
+        return LuaScriptRegistry.get(script_name).sha1
 
     @classmethod
     def get_script_content(cls, BASE_DIR, script_name: str) -> str:
         """获取脚本内容"""
-        global LUA_SCRIPTS_CACHE
-        if script_name not in LUA_SCRIPTS_CACHE:
-            cls.load_script(BASE_DIR, script_name)
-        return LUA_SCRIPTS_CACHE[script_name]['content']
+        return LuaScriptRegistry.get(script_name).content
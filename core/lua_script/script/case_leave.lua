@@ -0,0 +1,19 @@
+-- File: case_leave.lua
+-- 分片、分布式执行：登记用例的一个部分执行结束，同一部分重复登记（租约过期后重新执行）不重复计数
+
+-- KEYS[1]: case_finished_parts  已结束的部分（集合，元素为 "<用例 id>|<部分>"）
+-- KEYS[2]: case_finished        各用例已结束的部分数（哈希）
+-- KEYS[3]: case_parts           各用例的部分总数（哈希）
+-- ARGV[1]: 用例 id
+-- ARGV[2]: 部分标识（分片序号或子用例的全局序号）
+-- 返回: 1 表示这是该用例最后一个结束的部分（只会返回一次），否则为 0
+
+if redis.call('SADD', KEYS[1], ARGV[1] .. '|' .. ARGV[2]) == 0 then
+  return 0
+end
+local finished = redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+local expected = tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0')
+if finished == expected then
+  return 1
+end
+return 0
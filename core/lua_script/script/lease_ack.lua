@@ -0,0 +1,16 @@
+-- File: lease_ack.lua
+-- 确认完成：只有当前领取者可以确认，租约已经被回收（会重新投递）时返回 -1，否则返回已完成的元素个数
+
+-- KEYS[1]: leases
+-- KEYS[2]: owners
+-- KEYS[3]: done
+-- ARGV[1]: 元素
+-- ARGV[2]: 领取者标识
+
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+  return -1
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[1])
+return redis.call('SCARD', KEYS[3])
@@ -0,0 +1,42 @@
+-- File: lease_claim.lua
+-- 租约队列：先把已过期的租约放回队首（超过最多投递次数的直接记为完成并写入异常），再领取一个元素
+
+-- KEYS[1]: pending     待领取的元素（列表）
+-- KEYS[2]: leases      已领取的元素（有序集合，分数为租约到期的毫秒时间戳）
+-- KEYS[3]: owners      元素 -> 领取者（哈希）
+-- KEYS[4]: expired     元素 -> 租约过期次数（哈希）
+-- KEYS[5]: done        已完成的元素（集合）
+-- KEYS[6]: errors      异常信息（哈希）
+-- KEYS[7]: abandoned   放弃执行的元素（列表），由发布者取出后做收尾（如写入用例的结束记录）
+-- ARGV[1]: 租约时长（毫秒）
+-- ARGV[2]: 领取者标识，为空时只回收过期租约
+-- ARGV[3]: 最多投递次数
+
+-- 使用 Redis 服务器的时间，避免各工作节点的时钟偏差
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, item in ipairs(expired) do
+  redis.call('ZREM', KEYS[2], item)
+  redis.call('HDEL', KEYS[3], item)
+  if redis.call('HINCRBY', KEYS[4], item, 1) >= tonumber(ARGV[3]) then
+    redis.call('SADD', KEYS[5], item)
+    redis.call('RPUSH', KEYS[7], item)
+    redis.call('HSET', KEYS[6], 'child_case:' .. item, '子用例 ' .. item .. ' 的执行节点多次失联，已放弃执行')
+  else
+    redis.call('LPUSH', KEYS[1], item)
+  end
+end
+
+if ARGV[2] == '' then
+  return nil
+end
+
+local item = redis.call('LPOP', KEYS[1])
+if not item then
+  return nil
+end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[1]), item)
+redis.call('HSET', KEYS[3], item, ARGV[2])
+return item
@@ -0,0 +1,16 @@
+-- File: lease_extend.lua
+-- 租约续期：只有当前领取者可以续期，租约已经被回收时返回 0
+
+-- KEYS[1]: leases
+-- KEYS[2]: owners
+-- ARGV[1]: 元素
+-- ARGV[2]: 领取者标识
+-- ARGV[3]: 租约时长（毫秒）
+
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+  return 0
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[3]), ARGV[1])
+return 1
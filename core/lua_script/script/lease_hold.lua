@@ -0,0 +1,17 @@
+-- File: lease_hold.lua
+-- 持有租约：当前持有者续期，无人持有时获得租约，其他人持有时返回 0
+
+-- KEYS[1]: 租约 key
+-- ARGV[1]: 持有者标识
+-- ARGV[2]: 租约时长（毫秒）
+
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+  redis.call('PEXPIRE', KEYS[1], ARGV[2])
+  return 1
+end
+if holder then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
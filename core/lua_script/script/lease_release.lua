@@ -0,0 +1,16 @@
+-- File: lease_release.lua
+-- 归还租约：领取者无法执行该元素时放回队首，不计入投递次数；租约已经被回收时返回 0
+
+-- KEYS[1]: pending
+-- KEYS[2]: leases
+-- KEYS[3]: owners
+-- ARGV[1]: 元素
+-- ARGV[2]: 领取者标识
+
+if redis.call('HGET', KEYS[3], ARGV[1]) ~= ARGV[2] then
+  return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('LPUSH', KEYS[1], ARGV[1])
+return 1
@@ -23,8 +23,10 @@ if last_item_str then
     end
 
     -- 3. Perform the logical comparison
-    if last_item_obj and new_item_obj and
-        type(last_item_obj) == 'table' and last_item_obj['type'] == 'action_script_print' and
+    -- v1 events carry 'type'; compact v2 events carry the numeric code 't' of the same print type
+    if last_item_obj and new_item_obj and type(last_item_obj) == 'table' and
+        (last_item_obj['type'] == 'action_script_print' or
+            (last_item_obj['t'] ~= nil and last_item_obj['t'] == new_item_obj['t'])) and
         last_item_obj['desc'] == new_item_obj['desc']
     then
         -- Conditions met: Increment 'times' and update the item
@@ -44,3 +46,8 @@ if not updated then
     -- Set/update the expiration time
     redis.call('EXPIRE', KEYS[1], 604800)
 end
+
+-- 5. Bump the change version of the list so pollers can detect both appends and in-place updates
+local version_key = KEYS[1] .. ':version'
+redis.call('INCR', version_key)
+redis.call('EXPIRE', version_key, 604800)
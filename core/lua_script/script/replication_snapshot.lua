@@ -0,0 +1,31 @@
+-- File: replication_snapshot.lua
+-- 记录复制：原子地读取复制日志的最新位置与若干 key 的当前值，快照包含该位置之前的全部写入
+
+-- KEYS[1]: 复制日志（Stream）
+-- KEYS[2..n]: 需要读取快照的 key
+-- 返回: { 日志最新条目的 id, {类型, 剩余秒数, 值}, ... }，类型为 none 时 key 不存在
+
+local result = {}
+local last = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)
+if last[1] then
+  result[1] = last[1][1]
+else
+  result[1] = '0-0'
+end
+
+for i = 2, #KEYS do
+  local key = KEYS[i]
+  local key_type = redis.call('TYPE', key)['ok']
+  local value = {}
+  if key_type == 'string' then
+    value = { redis.call('GET', key) }
+  elseif key_type == 'list' then
+    value = redis.call('LRANGE', key, 0, -1)
+  elseif key_type == 'hash' then
+    value = redis.call('HGETALL', key)
+  else
+    key_type = 'none'
+  end
+  result[i] = { key_type, redis.call('TTL', key), value }
+end
+return result
@@ -42,5 +42,13 @@ local new_json_str = cjson.encode(main_obj)
 -- 6. 通过 LSET 将新的 JSON 字符串写回到原来的下标位置
 redis.call('LSET', KEYS[1], index, new_json_str)
 
--- 7. 返回新值，方便客户端确认
+-- 7. 自增列表的变更版本号，过期时间与列表保持一致
+local version_key = KEYS[1] .. ':version'
+redis.call('INCR', version_key)
+local ttl = redis.call('TTL', KEYS[1])
+if ttl > 0 then
+    redis.call('EXPIRE', version_key, ttl)
+end
+
+-- 8. 返回新值，方便客户端确认
 return new_json_str
@@ -1,11 +1,10 @@
-import copy
-from collections import deque
 from typing import List
 
-from core.controller.async_task_runner import TaskRunner
+from core.controller.async_task_runner import TaskRunner, LazyExecutors
+from core.enums.executor import StepTypeEnum, RunningModeEnum
 from core.executor.core import RunnerExecutor
 from core.payload.child_case_exec import RunChildCaseExecutor
-from core.payload.utils.tools import run_loop_strategy, StaticPathIndex, PositionItem
+from core.payload.utils.tools import run_loop_strategy, StaticPathIndex, PositionItem, concurrency_limit
 from core.record.child_record.summary import SummaryRecord
 from core.task_object.case_list import Case
 from core.task_object.child_case_list import ChildCaseList, ChildCase
@@ -14,44 +13,62 @@ from core.task_object.generate_object import GlobalOption
 
 
 class RunCaseExecutor(RunnerExecutor):
+    __slots__ = ("child_case_list", "parent_node")
+    is_container = True
 
     def __init__(self, case_info: Case, global_option: GlobalOption, child_case_list: List[ChildCase],
-                 task_runner: TaskRunner, dynamic_mapping, parent_node_index, record, spi):
+                 task_runner: TaskRunner, dynamic_mapping, parent_node: MultiwayTreeNode, record, spi):
         super().__init__(case_info, global_option, task_runner, dynamic_mapping, record, spi)
         self.child_case_list = child_case_list
-        self.parent_node_index = parent_node_index
+        self.parent_node = parent_node
 
     async def before_callback(self, *args, **kwargs):
-        await SummaryRecord(self.record).push_message([f"开始执行用例:[{self.metadata.name}]"])
-        index = f"{self.parent_node_index}_{self.metadata.index}"
+        shard = self.global_option.shard
+        # 分片执行时同一用例的子用例分布在多个进程，只由第一个开始的分片写开始记录
+        if shard is None or await shard.enter_case(self.metadata.id):
+            await SummaryRecord(self.record).push_message([f"开始执行用例:[{self.metadata.name}]"])
 
         def get_statis_path(child_case):
             static = StaticPathIndex(record_index=self.spi.record_index,
                                      task=self.spi.task, case=self.spi.case,
                                      child_case=child_case.index_in_global_list,
                                      case_name=self.spi.case_name, case_index=self.spi.case_index)
-            static.position_list = copy.deepcopy(self.spi.position_list)
+            static.position_list = self.spi.position_list
             static.add_position(PositionItem(type='child_case', index=child_case.index_in_global_list,
                                              label=f"").to_dict())
             return static
-        child_case_executors = deque([RunChildCaseExecutor(child_case, self.global_option,
-                                                           self.global_option.step_mapping.mapping[str(self.metadata.index)],
-                                                           self.task_runner, self.dynamic_mapping, index, self.record,
-                                                           get_statis_path(child_case)) for
-                                      child_case in self.child_case_list])
-        case_node = MultiwayTreeNode(parent=self.dynamic_mapping[f"{self.parent_node_index}_task"], node=self,
-                                     children=child_case_executors)
-        self.dynamic_mapping[f"{index}_case"] = case_node
+        case_node = MultiwayTreeNode(parent=self.parent_node, node=self)
+        if shard is not None:
+            shard.bind_case(self.metadata.id, case_node)
+        case_plan = self.global_option.plan.case(str(self.metadata.index))
+        history = self.global_option.history
+        if history is not None and self.metadata.loop_strategy == RunningModeEnum.CONCURRENTLY.value:
+            # 并发执行的子用例按历史耗时从长到短开始，最长的子用例不会因为排在最后而拖长用例
+            self.child_case_list = history.order_child_cases(self.child_case_list)
+        # 子用例执行器在执行到时才创建，同时存在的不超过用例的并发上限
+        child_case_executors = LazyExecutors(
+            RunChildCaseExecutor(child_case, self.global_option, case_plan, self.task_runner, self.dynamic_mapping,
+                                 case_node, self.record, get_statis_path(child_case)) for
+            child_case in self.child_case_list)
+        case_node.set_child(child_case_executors)
         return child_case_executors
 
     async def run(self, child_case_executors, *args, **kwargs):
-        await run_loop_strategy(self.metadata, self.task_runner.context, child_case_executors)
+        await run_loop_strategy(self.metadata, self.task_runner.context, child_case_executors,
+                                concurrency_limit(StepTypeEnum.CASE))
 
     async def after_callback(self, result=None, *args, **kwargs):
-        await SummaryRecord(self.record).push_message([f"用例:[{self.metadata.name}]，执行结束"])
+        if await self._last_part():
+            await SummaryRecord(self.record).push_message([f"用例:[{self.metadata.name}]，执行结束"])
 
     async def error_callback(self, e: None, *args, **kwargs):
-        await SummaryRecord(self.record).push_message([f"用例:[{self.metadata.name}]，出现错误，执行结束"])
+        if await self._last_part():
+            await SummaryRecord(self.record).push_message([f"用例:[{self.metadata.name}]，出现错误，执行结束"])
 
     async def skipped_callback(self, *args, **kwargs):
-        pass
+        await self._last_part()
+
+    async def _last_part(self) -> bool:
+        """分片执行时只由最后一个结束的分片写结束记录"""
+        shard = self.global_option.shard
+        return shard is None or await shard.leave_case(self.metadata.id)
@@ -6,10 +6,12 @@ from core.controller.async_task_runner import TaskRunner
 from core.executor.core import Executor
 from core.payload.task_exec import RunTaskExecutor
 from core.payload.utils.tools import StaticPathIndex, PositionItem
+from core.record.child_record.record import RecordInfoRecord
 from core.record.task_record import TaskRecord
 from core.task_object.case_list import CaseList
 from core.task_object.galobal_mapping import MultiwayTreeNode
 from core.task_object.generate_object import GlobalOption
+from core.utils.event_loop import LoopLagMonitor
 
 
 class PayloadExecutor(Executor):
@@ -23,10 +25,28 @@ class PayloadExecutor(Executor):
 
     async def run(self):
         self.task_runner = TaskRunner(int(os.getenv("MAX_CONCURRENCY")))
-        await self.task_runner.run(self._run())
+        # 循环延迟写入 record_info，分片执行时每个分片写自己的字段
+        shard = self.global_option.shard
+        field = "loop_lag" if shard is None else f"loop_lag_shard_{shard.label}"
+        loop_lag = LoopLagMonitor(lambda stats: RecordInfoRecord(self.record).change_info(**{field: stats}))
+        loop_lag.start()
+        # 自适应并发上限的调整记录同样写入 record_info
+        concurrency = self.task_runner.context.concurrency
+        if concurrency is not None:
+            field = "concurrency" if shard is None else f"concurrency_shard_{shard.label}"
+            concurrency.report = lambda stats: RecordInfoRecord(self.record).change_info(**{field: stats})
+            concurrency.start()
+        try:
+            await self.task_runner.run(self._run())
+        finally:
+            await loop_lag.stop()
+            if concurrency is not None:
+                await concurrency.stop()
 
     async def _run(self):
-        await self.record.cache_info()
+        # 分片执行时记录已由主进程初始化
+        if self.global_option.shard is None:
+            await self.record.cache_info()
         # 获取所有用例
         print("PayloadExecutor...")
         print("用例列表")
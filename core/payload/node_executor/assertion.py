@@ -1,4 +1,3 @@
-import json
 import re
 import traceback
 
@@ -13,6 +12,7 @@ from core.record.utils import AssertionExceptionProcessObject, AssertionSuccessP
     AssertionFailedProcessObject, ExceptionProcessObject, CoreExecReturn
 from core.task_object.galobal_mapping import MultiwayTreeNode
 from core.task_object.step_mapping import Assertion
+from core.utils import json_codec
 
 
 class AssertionRunController(StepExecutor):
@@ -43,7 +43,7 @@ class AssertionRunController(StepExecutor):
                 elif assertion_info.interface_body_range == 'pattern':
                     assert_desc += '提取方式：[Jsonpath匹配]，'
                     try:
-                        body = json.loads(body)
+                        body = json_codec.loads(body)
                     except Exception as e:
                         raise await self.throw(e, backup_desc='断言错误：Jsonpath提取方式无法解析响应体',
                                                backup_class=AssertionExceptionProcessObject)
@@ -75,7 +75,7 @@ class AssertionRunController(StepExecutor):
                 assert_desc += f"断言区域：[响应头]，"
                 headers = response['headers']
                 if not isinstance(headers, dict):
-                    headers = json.loads(headers)
+                    headers = json_codec.loads(headers)
                 header_key = self.replace(assertion_info.interface_header_key)
                 assert_desc += f'header键：[{header_key}]，'
                 compare_key = headers.get(header_key, None)
@@ -123,7 +123,7 @@ class AssertionRunController(StepExecutor):
                 "result": 'success',
                 'desc': assert_desc
             }
-            process_object = AssertionSuccessProcessObject(json.dumps(data, ensure_ascii=False))
+            process_object = AssertionSuccessProcessObject(json_codec.dumps(data))
             await self.send_step(process_object)
             return CoreExecReturn([process_object], [process_object], [process_object], None)
         else:
@@ -147,7 +147,7 @@ class AssertionRunController(StepExecutor):
                                        backup_class=AssertionExceptionProcessObject)
             last_interface_response_index = f"{last_interface.interface_detail_index}:response"
             result = await self.node.node.record.get_value(last_interface_response_index)
-            return json.loads(result)
+            return json_codec.loads(result)
         except RuntimeError as e:
             raise e
         except Exception as e:
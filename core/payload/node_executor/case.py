@@ -1,7 +1,7 @@
 from core.customer_script.base import AsyncExecutorVariable, ContextDocument
 from core.customer_script.execute import DynamicCodeExecutor
 from core.executor.core import Executor, StepExecutor
-from core.payload.utils.tools import search_env, process_script_value
+from core.payload.utils.tools import search_env, process_script_value, drive_source
 from core.record.utils import ExceptionProcessObject, CaseProcessObject
 from core.task_object.galobal_mapping import MultiwayTreeNode
 from core.task_object.step_mapping import Case, ChildStepCase
@@ -56,13 +56,13 @@ class CaseRunController(StepExecutor):
                 loop_data = process_script_value(result)
             except Exception as e:
                 raise await self.throw(e, backup_desc='系统错误：通过自定义脚本获取用例驱动次数失败')
-        data_source = [{} for _ in range(loop_data)] if isinstance(loop_data, int) else loop_data
+        drive_count, data_source = drive_source(loop_data)
         DRIVE_STRATEGY_DESC = {
             'times': '固定次数',
             'dataset': '数据集',
             'script': '自定义脚本'
         }.get(drive_strategy)
-        case_drive_desc = f"用例[{self.node.node.metadata.label}]通过 {DRIVE_STRATEGY_DESC} 驱动步骤，驱动次数:{len(data_source)}"
+        case_drive_desc = f"用例[{self.node.node.metadata.label}]通过 {DRIVE_STRATEGY_DESC} 驱动步骤，驱动次数:{drive_count}"
         await self.send_step(CaseProcessObject(desc=case_drive_desc))
         child_status, parent = self.get_case_or_multitasker_child_status_and_parent(case_info)
         for index, data in enumerate(data_source):
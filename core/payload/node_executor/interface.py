@@ -1,5 +1,4 @@
 import copy
-import json
 import traceback
 import uuid
 from urllib.parse import parse_qsl
@@ -18,6 +17,7 @@ from core.record.utils import ExceptionProcessObject, StepDetail, InterfaceSucce
     InterfaceExceptionProcessObject, InterfaceErrorFinishProcessObject, \
     CoreExecReturn, InterfaceWarningProcessObject
 from core.task_object.galobal_mapping import MultiwayTreeNode
+from core.utils import json_codec
 from core.utils.py_variable_parser import ExchangeToller, ChangeModeEnum
 
 
@@ -43,6 +43,7 @@ class InterfaceRunController(StepExecutor):
             # 获取cache接口信息
             interface_info = copy.deepcopy(pm.get_interface_info())
             # 获取服务URL前缀
+            server_info = pm.get_server_info(interface_info)
             prefix = pm.get_server_prefix(interface_info)
         except Exception as e:
             traceback.print_exc()
@@ -72,7 +73,7 @@ class InterfaceRunController(StepExecutor):
                 url = ExchangeToller(pre_url, variable_mapping, ChangeModeEnum.CHANGE_EVERY_TIME).replace()
             headers = core_interface_info.get('headers', '{}')
             headers = ExchangeToller(headers, variable_mapping, ChangeModeEnum.CHANGE_EVERY_TIME).replace()
-            headers = json.loads(headers) if isinstance(headers, str) else headers
+            headers = json_codec.loads(headers) if isinstance(headers, str) else headers
             params = core_interface_info.get('params', '')
             params = ExchangeToller(params, variable_mapping, ChangeModeEnum.CHANGE_EVERY_TIME).replace()
             params_dict = self.get_params_dict(params)
@@ -82,9 +83,15 @@ class InterfaceRunController(StepExecutor):
             raise await self.throw(e, backup_desc='系统错误：请求提取参数异常')
         try:
             self.start_time = get_current_ms()
+            # 按服务限流：覆盖了 URL 时按实际请求的服务区分
+            global_option = self.node.node.global_option
+            limiter = global_option.host_limiters.get(url) if self.has_cover_url else \
+                global_option.host_limiters.get(prefix, server_info)
             # 发送请求
-            await HttpSender(method, url, body, params_dict, headers, self.node.node.global_option.http_session,
-                             self.finish_callback, self.exception_callback)()
+            context = self.node.node.task_runner.context
+            await HttpSender(method, url, body, params_dict, headers, global_option.http_session,
+                             self.finish_callback, self.exception_callback,
+                             limiter, context.semaphore, context.concurrency)()
         except Exception as e:
             traceback.print_exc()
             await self.throw(e, backup_desc='系统错误', backup_class=InterfaceExceptionProcessObject)
@@ -113,13 +120,13 @@ class InterfaceRunController(StepExecutor):
                 process_object = InterfaceWarningProcessObject(desc=f"警告：异常响应码解析失败，已自动转为：500")
                 await self.send_step(process_object)
                 raise_code = 500
-            response_code = int(json.loads(response_details)['status'])
+            response_code = int(json_codec.loads(response_details)['status'])
             if response_code == raise_code:
                 self.has_raise = True
                 data = {
                     "request": self.request_details,
                     "response": self.response_details,
-                    "error": json.dumps({
+                    "error": json_codec.dumps({
                         "type": "CustomerError",
                         "info": "用户自定义错误",
                         "waste_time": get_current_ms() - self.start_time,
@@ -234,11 +241,11 @@ class InterfaceRunController(StepExecutor):
             else:
                 return ''
 
-        return json.dumps({
+        return json_codec.dumps({
             "method": method,
             "url": str(url),
             "headers": headers,
             "query_params": url_params_multi_dict_to_string(params),
             "body": body_info,
             "time": get_current_ms()
-        }, ensure_ascii=False)
+        })
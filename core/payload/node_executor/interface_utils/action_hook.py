@@ -1,5 +1,4 @@
 import asyncio
-import json
 import re
 import traceback
 from json import JSONDecodeError
@@ -14,6 +13,7 @@ from core.executor.core import Executor, StepExecutor
 from core.payload.utils.tools import search_env
 from core.payload.variables_controller.variable import VariableToller
 from core.record.utils import ExceptionProcessObject
+from core.utils import json_codec
 from core.utils.py_variable_parser import ExchangeToller, ChangeModeEnum
 
 SLEEP_HOOK_MAX_TIME = 60
@@ -70,7 +70,7 @@ class ExtractHook(StepExecutor):
                 await self.warning_notify(f"警告：响应内容获取失败，无法进行参数提取：{variable_name}，已停止提取")
                 return
             else:
-                response = json.loads(response_details)
+                response = json_codec.loads(response_details)
             source = action_data.source
             extract_range = action_data.extract_range
             regexp = action_data.regexp
@@ -89,7 +89,7 @@ class ExtractHook(StepExecutor):
             if source == ExtractSourceType.RESPONSE_HEADER.value:
                 headers = response["headers"]
                 if not isinstance(headers, dict):
-                    headers = json.loads(headers)
+                    headers = json_codec.loads(headers)
                 extract_tag = header_name
                 header_value = headers.get(header_name, None)
                 if header_value is None:
@@ -108,7 +108,7 @@ class ExtractHook(StepExecutor):
 
                 headers = response["headers"]
                 if not isinstance(headers, dict):
-                    headers = json.loads(headers)
+                    headers = json_codec.loads(headers)
                 cookie_str = None
                 for key, value in headers.items():
                     if key.lower() == 'set-cookie' or key.lower() == 'cookie':
@@ -143,7 +143,7 @@ class ExtractHook(StepExecutor):
                     expr = parse(_expression)
                     if isinstance(body, dict) is False:
                         try:
-                            body = json.loads(body)
+                            body = json_codec.loads(body)
                         except JSONDecodeError:
                             raise RuntimeError("响应体不是json")
                     matches = expr.find(body)
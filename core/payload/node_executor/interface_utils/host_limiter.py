@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import os
+import time
+from typing import Dict, Optional, Any
+from urllib.parse import urlsplit
+
+from core.payload.utils.tools import get_current_ms
+from core.utils import json_codec
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个；等待方按先后顺序取令牌"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = max(1.0, burst or rate)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def empty(self) -> bool:
+        self._refill()
+        return self._lock.locked() or self.tokens < 1
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostLimiter:
+    """
+    单个服务（按服务前缀区分）的请求限制：同时在途的请求数 max_in_flight 与每秒请求数 rate（令牌桶），
+    任一项为 0 表示不限制
+    """
+
+    def __init__(self, key: str, max_in_flight: int = 0, rate: float = 0, burst: Optional[float] = None):
+        self.key = key
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self.bucket = TokenBucket(rate, burst) if rate else None
+
+    @property
+    def unlimited(self) -> bool:
+        return self.in_flight is None and self.bucket is None
+
+    def busy(self) -> bool:
+        """当前请求是否需要排队"""
+        return (self.in_flight is not None and self.in_flight.locked()) or \
+            (self.bucket is not None and self.bucket.empty())
+
+    @contextlib.asynccontextmanager
+    async def slot(self, timing=None, permit: Optional[asyncio.Semaphore] = None):
+        """
+        占用一个请求名额，排队时间记录到 timing（RequestTiming）。
+        :param permit: 调用方持有的任务级并发名额，排队期间暂时归还，避免被限流的服务占满名额、拖慢其他服务的请求
+        """
+        if self.unlimited:
+            yield
+            return
+        throttle_start_at = get_current_ms()
+        released = permit is not None and self.busy()
+        if released:
+            permit.release()
+        holding = False
+        try:
+            if self.in_flight is not None:
+                await self.in_flight.acquire()
+                holding = True
+            if self.bucket is not None:
+                await self.bucket.acquire()
+        except BaseException:
+            if holding:
+                self.in_flight.release()
+                holding = False
+            raise
+        finally:
+            if released:
+                try:
+                    await self._reacquire(permit)
+                except BaseException:
+                    if holding:
+                        self.in_flight.release()
+                    raise
+        if timing is not None:
+            throttle_end_at = get_current_ms()
+            timing.throttle_start_at = throttle_start_at
+            timing.throttle_end_at = throttle_end_at
+            timing.throttle_time = (throttle_end_at - throttle_start_at) / 1000
+        try:
+            yield
+        finally:
+            if self.in_flight is not None:
+                self.in_flight.release()
+
+    @staticmethod
+    async def _reacquire(permit: asyncio.Semaphore):
+        """
+        重新占用排队前归还的名额。调用方退出时会归还这个名额，所以期间被取消也要等占用成功后再抛出取消，
+        否则名额会被多归还一次
+        """
+        acquire = asyncio.ensure_future(permit.acquire())
+        cancelled = False
+        while not acquire.done():
+            try:
+                await asyncio.shield(acquire)
+            except asyncio.CancelledError:
+                cancelled = True
+        if cancelled:
+            raise asyncio.CancelledError
+
+
+class HostLimiterRegistry:
+    """
+    每个任务一份的服务限制表，按服务前缀（scheme://host[:port]）区分，同一服务在不同用例、多任务器间共享限制。
+
+    配置优先级：
+        1. 项目环境中服务信息上的 max_in_flight / rate_limit / rate_burst 字段；
+        2. 环境变量 INTERFACE_HOST_LIMITS（JSON，键为服务前缀，值为 {"max_in_flight": 10, "rate": 50, "burst": 50}）；
+        3. 环境变量 INTERFACE_HOST_MAX_IN_FLIGHT / INTERFACE_HOST_RATE 作为所有服务的默认值，默认不限制。
+    """
+
+    def __init__(self):
+        self.limiters: Dict[str, HostLimiter] = {}
+        host_limits = json_codec.loads(os.getenv("INTERFACE_HOST_LIMITS") or "{}")
+        self.host_limits: Dict[str, Dict[str, Any]] = {self.host_key(key): value for key, value in host_limits.items()}
+        self.default_max_in_flight = int(os.getenv("INTERFACE_HOST_MAX_IN_FLIGHT", 0))
+        self.default_rate = float(os.getenv("INTERFACE_HOST_RATE", 0))
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        parts = urlsplit(url.strip())
+        if not parts.netloc:
+            return url.strip().rstrip('/')
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def get(self, url: str, server_info: Optional[Dict[str, Any]] = None) -> HostLimiter:
+        key = self.host_key(url)
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            limiter = self.limiters[key] = self._create(key, server_info or {})
+        return limiter
+
+    def _create(self, key: str, server_info: Dict[str, Any]) -> HostLimiter:
+        config = self.host_limits.get(key, {})
+        max_in_flight = server_info.get("max_in_flight") or config.get("max_in_flight") or self.default_max_in_flight
+        rate = server_info.get("rate_limit") or config.get("rate") or self.default_rate
+        burst = server_info.get("rate_burst") or config.get("burst")
+        return HostLimiter(key, int(max_in_flight or 0), float(rate or 0), float(burst) if burst else None)
@@ -1,10 +1,10 @@
-import json
 from typing import Union
 
 import aiohttp
 import socket
 
 from core.payload.utils.tools import get_current_ms
+from core.utils import json_codec
 
 try:
     SO_REUSEPORT = socket.SO_REUSEPORT
@@ -23,7 +23,7 @@ class ProcessLogging:
         self.loggings.append(log)
 
     def to_json(self):
-        return json.dumps(self.__dict__, ensure_ascii=False)
+        return json_codec.dumps(self.__dict__)
 
 
 class RequestTiming:
@@ -52,9 +52,13 @@ class RequestTiming:
         self.dns_start: Union[float, None] = None
         self.dns_end: Union[float, None] = None
         self.dns_end_at: Union[float, None] = None
+        # 服务限流排队（见 HostLimiter）
+        self.throttle_start_at: Union[float, None] = None
+        self.throttle_end_at: Union[float, None] = None
+        self.throttle_time: Union[float, None] = None
 
     def to_json(self):
-        return json.dumps(self.__dict__, ensure_ascii=False)
+        return json_codec.dumps(self.__dict__)
 
 
 class OptimizedTCPConnector(aiohttp.TCPConnector):
@@ -188,10 +192,15 @@ class HttpClient:
         timing.total_time = total_time
         timing.network_time = network_time
         timing.response_time_at = end_time
+        observer = ctx.get("observer")
+        if observer is not None:
+            # 服务端错误与限流响应计为错误，用于自适应并发控制
+            status = params.response.status
+            observer.observe(end_time - timing.request_start, status >= 500 or status == 429)
         # 获取响应详细信息
         process: ProcessLogging = ctx["process"]
         process.append(f"[{ctx['index']}]总耗时: {total_time:.4f}s | 网络耗时: {network_time:.4f}s")
-        await ctx["finish_callback"](json.dumps(response_details, ensure_ascii=False), timing, process)
+        await ctx["finish_callback"](json_codec.dumps(response_details), timing, process)
 
     # 5. 请求异常
     async def on_request_exception(self, session, trace_config_ctx, params):
@@ -210,7 +219,10 @@ class HttpClient:
 
         timing.error_time = elapsed
         timing.error_time_at = error_time_at
-        await ctx["exception_callback"](json.dumps(error_details, ensure_ascii=False), timing, ctx["process"])
+        observer = ctx.get("observer")
+        if observer is not None:
+            observer.observe(elapsed, True)
+        await ctx["exception_callback"](json_codec.dumps(error_details), timing, ctx["process"])
 
     # 6. 请求重定向
     async def on_request_redirect(self, session, trace_config_ctx, params):
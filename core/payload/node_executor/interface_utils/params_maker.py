@@ -10,6 +10,7 @@ from core.enums.executor import InterfaceDataTypeEnum, BodyCurrentType
 from core.payload.variables_controller.variable import Variable
 from core.record.utils import ExceptionProcessObject
 from core.task_object.galobal_mapping import MultiwayTreeNode
+from core.utils import json_codec
 from core.utils.py_variable_parser import ChangeModeEnum, ExchangeToller
 
 
@@ -46,6 +47,13 @@ class ParamsMaker:
         raise RuntimeError(f"系统错误：获取请求体失败[1]：\n{traceback.format_exc()}")
 
     def get_server_prefix(self, interface_info):
+        prefix = self.get_server_info(interface_info).get("prefix", None)
+        if prefix is None:
+            raise RuntimeError(ExceptionProcessObject("系统错误：获取服务信息前缀失败"))
+        return prefix
+
+    def get_server_info(self, interface_info):
+        """获取接口所属服务在当前项目环境下的信息（前缀、限流配置等）"""
         project_id, env = Variable._gpe(self.node)
         env_mapping = self.node.node.global_option.global_cache.origin_project_env_server_mapping.get(str(project_id),
                                                                                                       None)
@@ -60,10 +68,7 @@ class ParamsMaker:
         server_info = server_mapping.get(server, None)
         if server_info is None:
             raise RuntimeError(ExceptionProcessObject("系统错误：获取接口服务信息失败"))
-        prefix = server_info.get("prefix", None)
-        if prefix is None:
-            raise RuntimeError(ExceptionProcessObject("系统错误：获取服务信息前缀失败"))
-        return prefix
+        return server_info
 
     def get_interface_info(self):
         interface_info = self.node.node.global_option.global_cache.origin_interface_mapping.get(
@@ -104,9 +109,10 @@ class ParamsMaker:
         if data_tree is None:
             return None
         # 阶段2: 全局变量替换
-        json_str = json.dumps(data_tree)
+        # 变量替换基于 ASCII 转义后的文本，保持与原先一致
+        json_str = json_codec.dumps(data_tree, ensure_ascii=True)
         replaced_str = replace_vars_func(json_str)
-        replaced_data = json.loads(replaced_str)
+        replaced_data = json_codec.loads(replaced_str)
 
         # 阶段3: 类型转换
         return cls._convert_data_types(replaced_data, type_tree)
@@ -1,10 +1,15 @@
+import asyncio
+from typing import Optional
+
+from core.payload.node_executor.interface_utils.host_limiter import HostLimiter
 from core.payload.node_executor.interface_utils.http_client import RequestTiming, ProcessLogging
 from core.payload.utils.tools import get_current_ms
 
 
 class HttpSender:
 
-    def __init__(self, method, url, body, params, headers, session, finish_callback, exception_callback):
+    def __init__(self, method, url, body, params, headers, session, finish_callback, exception_callback,
+                 limiter: Optional[HostLimiter] = None, permit: Optional[asyncio.Semaphore] = None, observer=None):
         self.method = method
         self.url = url
         self.body = body
@@ -13,17 +18,31 @@ class HttpSender:
         self.session = session
         self.finish_callback = finish_callback
         self.exception_callback = exception_callback
+        self.limiter = limiter
+        self.permit = permit
+        # 自适应并发控制器（AdaptiveConcurrency），由 HttpClient 的钩子上报请求耗时与错误
+        self.observer = observer
 
     async def __call__(self):
         reqeust_timing = RequestTiming(get_current_ms())
         process = ProcessLogging()
         self.http_interface = None
+        if self.limiter is None:
+            await self._request(reqeust_timing, process)
+            return
+        async with self.limiter.slot(reqeust_timing, self.permit):
+            if reqeust_timing.throttle_time:
+                process.append(f"[0] 服务限流排队: {self.limiter.key} | 耗时: {reqeust_timing.throttle_time:.4f}s")
+            await self._request(reqeust_timing, process)
+
+    async def _request(self, reqeust_timing, process):
         async with self.session.request(self.method, self.url, params=self.params, headers=self.headers, data=self.body,
                                         trace_request_ctx={"index": '0',
                                                            "timing": reqeust_timing,
                                                            "process": process,
                                                            "finish_callback": self.finish_callback,
-                                                           "exception_callback": self.exception_callback}):
+                                                           "exception_callback": self.exception_callback,
+                                                           "observer": self.observer}):
             pass
 
 
@@ -1,33 +1,38 @@
-import copy
 from collections import deque
-from typing import Union, Self, Tuple, Dict, Callable, Any
+from typing import Union, Self, Tuple, Dict, Callable, Any, AsyncIterator
 
-from core.controller.async_task_runner import TaskRunner
+from core.controller.async_task_runner import TaskRunner, LazyExecutors
 from core.enums.executor import NodeStatusEnum, NodeResultEnum, StepTypeEnum
 from core.executor.core import RunnerExecutor
 from core.payload.node_executor.case import CaseRunController
 from core.payload.node_executor.dispatch import ExecutorCaller
 from core.payload.node_executor.multitasker import MultitaskerRunController
 from core.payload.utils.error_strategy import ErrorStrategyController
-from core.payload.utils.tools import run_loop_strategy, StaticPathIndex, PositionItem, get_current_ms
+from core.payload.utils.tools import run_loop_strategy, PositionItem, get_current_ms, concurrency_limit
 from core.record.child_record.step import StepRecordRunner
 from core.record.utils import ExceptionProcessObject, ProcessObject
+from core.task_object.execution_plan import PlanStep
 from core.task_object.galobal_mapping import MultiwayTreeNode
 from core.task_object.generate_object import GlobalOption
-from core.task_object.step_mapping import Case, Empty, RealNode
+from core.task_object.step_mapping import Empty, RealNode
+
+# 只驱动子步骤的步骤类型，执行期间不占用任务级的并发名额
+CONTAINER_STEP_TYPES = ('group', 'case', 'multitasker', 'if', 'child_multitasker', 'child_step_case')
 
 
 class RunStepExecutor(RunnerExecutor):
+    __slots__ = ("child_steps", "parent_node", "plan_step", "parent", "in_case")
 
     def __init__(self, step: Any,
                  global_option: GlobalOption, task_runner: TaskRunner, dynamic_mapping: Dict[str, MultiwayTreeNode],
-                 parent_node_index,
-                 origin_step_mapping, parent, record, origin_step_index, spi, in_case=False):
+                 parent_node: MultiwayTreeNode, plan_step: PlanStep, parent, record, spi, in_case=False):
         super().__init__(step, global_option, task_runner, dynamic_mapping, record, spi)
-        self.child_steps = []
-        self.parent_node_index = parent_node_index
-        self.origin_step_mapping = origin_step_mapping
-        self.origin_step_index = origin_step_index
+        # 子执行器在 before_callback 中才创建，之前共用一个空元组，不为每个节点分配列表
+        self.child_steps = ()
+        # 父级（子用例或上级步骤）的树节点，祖先查找都沿父节点引用进行
+        self.parent_node = parent_node
+        # 编译后的静态步骤；多任务器、用例步骤展开出的虚拟节点沿用多任务器、用例步骤本身的
+        self.plan_step = plan_step
         self.parent = parent
         self.in_case = in_case
 
@@ -41,13 +46,19 @@ class RunStepExecutor(RunnerExecutor):
         else:
             print(f"\033[34m before_callback步骤：{self.metadata.type}：判断是否执行core：{self.metadata.label}\033[0m")
             print(f"{self.metadata.label}spi:{self.spi.to_dict()}")
-            self.check_and_change_status(current_node)
+            if self.metadata is self.plan_step.metadata and self.plan_step.disabled:
+                # 自身或上级被禁用，编译时已确定跳过
+                self.status = NodeStatusEnum.SKIPPED
+            else:
+                self.check_and_change_status(current_node)
             return current_node
 
     async def run(self, current_node: MultiwayTreeNode):
         core_exec = lambda: ExecutorCaller(self.metadata.type)(current_node, self.in_case).run()
         result = await StepRecordRunner(self, core_exec).run()
         await self.run_child(self.child_steps)
+        # 子步骤已全部执行完，不再持有它们
+        self.child_steps = ()
         return result
 
     async def after_callback(self, result=None, current_node: MultiwayTreeNode = None, *args, **kwargs):
@@ -87,13 +98,11 @@ class RunStepExecutor(RunnerExecutor):
         ErrorStrategyController(current_node).exec()
 
     async def send_all_record(self, process_object):
-        # TODO:性能优化，一次通信写入
-        if self.metadata.type not in (StepTypeEnum.CHILD_MULTITASKER, StepTypeEnum.EMPTY):
-            self.send_step(process_object)
-        if self.metadata.type not in StepTypeEnum.EMPTY:
-            self.send_parent_step(process_object)
-            self.send_child_case(process_object)
-            self.send_summary(process_object)
+        # 事件带有序号，四个列表合并为一次 pipeline 写入
+        not_empty = self.metadata.type not in StepTypeEnum.EMPTY
+        self.send_records(process_object,
+                          step=self.metadata.type not in (StepTypeEnum.CHILD_MULTITASKER, StepTypeEnum.EMPTY),
+                          parent_step=not_empty, child_case=not_empty, summary=not_empty)
 
     async def skipped_callback(self, result=None, current_node: MultiwayTreeNode = None, *args, **kwargs):
         self.status = NodeStatusEnum.SKIPPED
@@ -123,11 +132,11 @@ class RunStepExecutor(RunnerExecutor):
 
     def search_step(self, current_node: MultiwayTreeNode):
         if self.in_case:
-            # 如果是case中的步骤，直接找到Case节点
-            return self.search_node(current_node, lambda node: isinstance(node.node.metadata, Case))
+            # 如果是case中的步骤，直接找到Case节点（不含自身）
+            return current_node.parent.scope.case if current_node.parent is not None else None
         else:
             # 如果不是case中的步骤，找到最近的真实节点
-            return self.search_node(current_node, lambda node: True)
+            return current_node.parent
 
     def search_node(self, current_node: MultiwayTreeNode,
                     judge_callback: Callable[[MultiwayTreeNode], bool]) -> Union[MultiwayTreeNode, None]:
@@ -139,84 +148,81 @@ class RunStepExecutor(RunnerExecutor):
         else:
             return self.search_node(parent_node, judge_callback)
 
+    @property
+    def is_container(self) -> bool:
+        return self.metadata.type in CONTAINER_STEP_TYPES
+
     async def run_child(self, step_executors):
-        if self.metadata.type in ['group', 'case', 'multitasker', 'if', 'child_multitasker', 'child_step_case']:
+        if self.metadata.type in CONTAINER_STEP_TYPES:
             if self.metadata.type in ['case', 'multitasker']:
-                await run_loop_strategy(self.metadata, self.task_runner.context, step_executors)
+                await run_loop_strategy(self.metadata, self.task_runner.context, step_executors,
+                                        concurrency_limit(self.metadata.type))
             else:
                 await self.task_runner.context.run_sequentially(step_executors)
 
-    async def make_dynamic_node(self) -> Tuple[deque[Self], MultiwayTreeNode]:
+    async def make_dynamic_node(self) -> Tuple[Union[deque[Self], LazyExecutors], MultiwayTreeNode]:
         """
         动态MultiwayTreeNode对象，并为该对象添加子RunStepExecutor
-        Returns: child_steps: deque[RunStepExecutor], step_node: MultiwayTreeNode
+        步骤节点不登记到 dynamic_mapping，只被子节点的父引用和执行过程引用，执行结束后随之释放
+        Returns: child_steps: deque[RunStepExecutor] | LazyExecutors, step_node: MultiwayTreeNode
         """
-        index = f"{self.parent_node_index}_{self.metadata.id}"
-        parent_index_str = f"{self.parent_node_index}_child_case" if self.parent.metadata.type == 'child_case' else f"{self.parent_node_index}_step"
-        step_node = MultiwayTreeNode(parent=self.dynamic_mapping[parent_index_str], node=self)
-        child_steps = await self.make_child_executor(index, step_node)
+        step_node = MultiwayTreeNode(parent=self.parent_node, node=self)
+        child_steps = await self.make_child_executor(step_node)
         step_node.set_child(child_steps)
-        self.dynamic_mapping[f"{index}_step"] = step_node
         return child_steps, step_node
 
-    async def make_child_executor(self, index, step_node: MultiwayTreeNode = None) -> deque[Self]:
+    async def make_child_executor(self, step_node: MultiwayTreeNode) -> Union[deque[Self], LazyExecutors]:
+        if not self.is_container:
+            # 叶子步骤没有子节点，共用空元组，不再为每个节点分配一个空 deque
+            return ()
         step_executors = deque([])
-        spi = None
-        if self.in_case:
-            spi = self.spi.copy()
-        if self.metadata.type in ['group', 'child_step_case', 'if', 'child_multitasker']:
-            if self.metadata.type in ['child_multitasker']:
-                parent_step = self.spi.parent_step
-                parent_step_name = self.spi.parent_step_name
-            else:
-                parent_step = self.metadata.id
-                parent_step_name = self.metadata.label
-            for step_index in self.metadata.children:
-                step_object = self.origin_step_mapping.get(step_index)
-                if spi:
-                    _spi = self.spi.copy()
-                else:
-                    _spi = StaticPathIndex(record_index=self.spi.record_index, task=self.spi.task,
-                                           case=self.spi.case,
-                                           case_index=self.spi.case_index,
-                                           case_name=self.spi.case_name,
-                                           child_case=self.spi.child_case,
-                                           step=step_object.id,
-                                           step_name=step_object.label,
-                                           parent_step=parent_step,
-                                           parent_step_name=parent_step_name,
-                                           position_list=copy.deepcopy(self.spi.position_list))
-                _spi.add_position(
-                    PositionItem(type=step_object.type, index=step_object.id, label=step_object.label).to_dict())
-                step_executor = RunStepExecutor(step_object, self.global_option, self.task_runner,
-                                                self.dynamic_mapping, index, self.origin_step_mapping, self,
-                                                self.record, step_index, _spi, in_case=self.in_case)
+        # 被禁用的多任务器、用例步骤不再计算驱动次数（不会执行数据集、驱动脚本），子步骤按静态结构各跳过一次
+        static_children = self.metadata.type in ['group', 'child_step_case', 'if', 'child_multitasker'] or (
+                self.metadata.type in ['multitasker', 'case'] and self.plan_step.disabled)
+        if static_children:
+            for plan_step in self.plan_step.children:
+                _spi = self.spi.extend(plan_step.position) if plan_step.in_case else \
+                    self.spi.extend(plan_step.position, **plan_step.path_fields)
+                step_executor = RunStepExecutor(plan_step.metadata, self.global_option, self.task_runner,
+                                                self.dynamic_mapping, step_node, plan_step, self,
+                                                self.record, _spi, in_case=plan_step.in_case)
                 step_executors.append(step_executor)
         elif self.metadata.type == 'multitasker':
-            async for step_object in MultitaskerRunController(step_node).make_child_node():
-                if spi:
-                    _spi = self.spi.copy()
-                else:
-                    _spi = StaticPathIndex(record_index=self.spi.record_index, task=self.spi.task,
-                                           case=self.spi.case,
-                                           case_index=self.spi.case_index,
-                                           child_case=self.spi.child_case,
-                                           step=step_object.id,
-                                           step_name=step_object.label,
-                                           parent_step=self.metadata.id,
-                                           parent_step_name=self.metadata.label,
-                                           position_list=copy.deepcopy(self.spi.position_list))
-                _spi.add_position(PositionItem(type=step_object.type, index=step_object.id, label=f"").to_dict())
-                step_executor = RunStepExecutor(step_object, self.global_option, self.task_runner,
-                                                self.dynamic_mapping, index, self.origin_step_mapping, self,
-                                                self.record, self.origin_step_index, _spi, in_case=self.in_case)
-                step_executors.append(step_executor)
+            return await self.lazy_child_executor(MultitaskerRunController(step_node).make_child_node(), step_node)
         elif self.metadata.type == 'case':
-            async for step_object in CaseRunController(step_node).make_child_node():
-                _spi = self.spi.copy()
-                _spi.add_position(PositionItem(type=step_object.type, index=step_object.id, label=f"").to_dict())
-                step_executor = RunStepExecutor(step_object, self.global_option, self.task_runner,
-                                                self.dynamic_mapping, index, self.origin_step_mapping, self,
-                                                self.record, self.origin_step_index, _spi, in_case=True)
-                step_executors.append(step_executor)
+            return await self.lazy_child_executor(CaseRunController(step_node).make_child_node(), step_node)
         return step_executors
+
+    async def lazy_child_executor(self, step_objects: AsyncIterator[Any],
+                                  step_node: MultiwayTreeNode) -> Union[deque[Self], LazyExecutors]:
+        """
+        多任务器、用例步骤按驱动次数展开的子执行器在执行时才逐个创建，同时存在的不超过节点的并发上限。
+        先取出第一个，驱动数据的计算、驱动记录与其中的错误仍发生在 before_callback 中
+        """
+        try:
+            first = await anext(step_objects)
+        except StopAsyncIteration:
+            return deque([])
+
+        async def executors():
+            yield self.make_driven_executor(first, step_node)
+            async for step_object in step_objects:
+                yield self.make_driven_executor(step_object, step_node)
+
+        return LazyExecutors(executors())
+
+    def make_driven_executor(self, step_object: Any, step_node: MultiwayTreeNode) -> Self:
+        position = PositionItem(type=step_object.type, index=step_object.id, label=f"").to_dict()
+        if self.metadata.type == 'case':
+            # 用例步骤展开的子用例及其下的步骤都在用例内
+            return RunStepExecutor(step_object, self.global_option, self.task_runner, self.dynamic_mapping,
+                                   step_node, self.plan_step, self, self.record, self.spi.extend(position),
+                                   in_case=True)
+        if self.in_case:
+            _spi = self.spi.extend(position)
+        else:
+            _spi = self.spi.extend(position, step=step_object.id, step_name=step_object.label,
+                                   parent_step=self.metadata.id, parent_step_name=self.metadata.label)
+        return RunStepExecutor(step_object, self.global_option, self.task_runner, self.dynamic_mapping, step_node,
+                               self.plan_step, self, self.record, _spi, in_case=self.in_case)
+
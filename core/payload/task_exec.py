@@ -1,13 +1,13 @@
-import copy
 import json
 from collections import deque, defaultdict
 from typing import List, Any, Dict
 
 from core.controller.async_task_runner import TaskRunner
-from core.enums.executor import StatusEnum
+from core.enums.executor import StatusEnum, RunningModeEnum, StepTypeEnum
 from core.executor.core import RunnerExecutor
 from core.payload.case_exec import RunCaseExecutor
-from core.payload.utils.tools import run_loop_strategy, get_current_ms, StaticPathIndex, PositionItem
+from core.payload.utils.tools import run_loop_strategy, get_current_ms, StaticPathIndex, PositionItem, \
+    concurrency_limit
 from core.record.child_record.record import RecordInfoRecord
 from core.record.child_record.summary import SummaryRecord
 from core.record.child_record.task import TaskInfoRecord
@@ -19,6 +19,8 @@ from core.task_object.task_info import TaskInfo
 
 
 class RunTaskExecutor(RunnerExecutor):
+    __slots__ = ("case_list",)
+    is_container = True
 
     def __init__(self, task_info: TaskInfo, global_option: GlobalOption, case_list: CaseList,
                  task_runner: TaskRunner, dynamic_mapping, record, spi):
@@ -26,7 +28,9 @@ class RunTaskExecutor(RunnerExecutor):
         self.case_list = case_list
 
     async def before_callback(self, *args, **kwargs):
-        await SummaryRecord(self.record).push_message(["任务开始"])
+        # 分片执行时任务级的开始、结束记录由主进程写
+        if self.global_option.shard is None:
+            await SummaryRecord(self.record).push_message(["任务开始"])
         return True
 
     async def run(self, *args, **kwargs):
@@ -35,30 +39,62 @@ class RunTaskExecutor(RunnerExecutor):
         def get_statis_path(case):
             static = StaticPathIndex(record_index=self.spi.record_index, task=self.spi.task, case=case.id,
                                      case_name=case.name, case_index=case.index)
-            static.position_list = copy.deepcopy(self.spi.position_list)
+            static.position_list = self.spi.position_list
             static.add_position(PositionItem(type='case', index=case.id, label=case.name).to_dict())
             return static
 
         child_case_list_mapping = self.mapping_child_case_list(self.global_option.child_case_list.list)
+        case_list = self.case_list.data
+        shard = self.global_option.shard
+        if shard is not None:
+            # 分片只执行分到自己的子用例所属的用例
+            case_list = [case for case in case_list if case.id in child_case_list_mapping]
+        history = self.global_option.history
+        if history is not None:
+            workers, limit = self.task_runner.context.workers, concurrency_limit(StepTypeEnum.CASE)
+            if self.metadata.loop_strategy == RunningModeEnum.CONCURRENTLY.value:
+                # 并发执行的用例按历史耗时从长到短开始
+                case_list = history.order_cases(case_list, child_case_list_mapping, workers, limit)
+            if shard is None:
+                history.start(history.predict_task(self.metadata, case_list, child_case_list_mapping, workers, limit))
+        # 动态表里只登记任务根节点，下级节点通过父节点引用查找祖先，执行结束后即可释放
+        task_node = MultiwayTreeNode(parent=None, node=self)
+        if shard is not None:
+            shard.bind_task(task_node)
         case_executors = deque([
             RunCaseExecutor(case, self.global_option, child_case_list_mapping.get(case.id), self.task_runner,
-                            self.dynamic_mapping, index, self.record,
+                            self.dynamic_mapping, task_node, self.record,
                             get_statis_path(case)) for
             case
-            in self.case_list.data])
-        task_node = MultiwayTreeNode(parent=None, node=self, children=case_executors)
+            in case_list])
+        task_node.set_child(case_executors)
         self.dynamic_mapping[f"{index}_task"] = task_node
         await run_loop_strategy(self.metadata, self.task_runner.context, case_executors)
 
     async def after_callback(self, result=None, *args, **kwargs):
-        await SummaryRecord(self.record).push_message(["任务结束"])
-        await TaskInfoRecord(self.record).change_info(status=StatusEnum.END.value)
-        await RecordInfoRecord(self.record).change_info(status=StatusEnum.END.value, end_at=get_current_ms())
+        if self.global_option.shard is None:
+            await self.end_task(self.record)
 
     async def error_callback(self, e: None, *args, **kwargs):
-        await SummaryRecord(self.record).push_message(["任务错误结束"])
-        await TaskInfoRecord(self.record).change_info(status=StatusEnum.ERROR_END.value, error_info=str(e))
-        await RecordInfoRecord(self.record).change_info(status=StatusEnum.ERROR_END.value, end_at=get_current_ms())
+        if self.global_option.shard is None:
+            await self.end_task(self.record, str(e))
+        else:
+            await self.global_option.shard.report_error(str(e))
+
+    @classmethod
+    async def end_task(cls, record, error_info=None):
+        """写任务的结束记录，error_info 不为空时为错误结束（分片执行时由主进程调用）"""
+        history = record.global_option.history
+        if history is not None:
+            await history.finish(record)
+        if error_info is None:
+            await SummaryRecord(record).push_message(["任务结束"])
+            await TaskInfoRecord(record).change_info(status=StatusEnum.END.value)
+            await RecordInfoRecord(record).change_info(status=StatusEnum.END.value, end_at=get_current_ms())
+        else:
+            await SummaryRecord(record).push_message(["任务错误结束"])
+            await TaskInfoRecord(record).change_info(status=StatusEnum.ERROR_END.value, error_info=error_info)
+            await RecordInfoRecord(record).change_info(status=StatusEnum.ERROR_END.value, end_at=get_current_ms())
 
     async def skipped_callback(self, *args, **kwargs):
         pass
@@ -1,9 +1,7 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
 
-from core.task_object.child_case_list import ChildCase
-from core.task_object.step_mapping import Case, ChildMultitasker, ChildStepCase
-from core.task_object.case_list import Case as GlobalCase
+from core.task_object.step_mapping import ChildMultitasker
 from core.enums.executor import ErrorStrategyMixinEnum, NodeStatusEnum
 
 if TYPE_CHECKING:
@@ -27,30 +25,33 @@ class ErrorStrategyController:
         if error_strategy == ErrorStrategyMixinEnum.TASK:
             task_node = self.get_task_node(self.node)
             task_node.node.status = NodeStatusEnum.SKIPPED
+            self.publish_skip("task")
         elif error_strategy == ErrorStrategyMixinEnum.CURRENT_STEP:
             pass
         elif error_strategy == ErrorStrategyMixinEnum.CASE:
             if not self.in_case:
                 main_case_node: MultiwayTreeNode = self.get_mian_case_node(self.node)
                 main_case_node.node.status = NodeStatusEnum.SKIPPED
+                self.publish_skip(f"case:{main_case_node.node.metadata.id}")
             else:
                 # 发现是结束用例，但是现在需要判断是结束内部用例中的用例，还是结束当前主用例当中的用例
                 # 通过拿到内部用例的Case metadata节点，获取它是由子用例自己决定还是其他
                 # 如果是由子用例自己决定，那么可以断言，这个结束用例就是把Case直接结束
                 # 如果是其他的，也就是说结束case这个动作一定是针对当前主用例的
-                case_node = self.exec_runner.search_node(self.node, lambda node: isinstance(node.node.metadata, Case))
+                case_node = self.node.parent.scope.case
                 if case_node.node.metadata.error_strategy == ErrorStrategyMixinEnum.REF_CASE_INNER:
                     case_node.node.status = NodeStatusEnum.SKIPPED
                 else:
                     main_case_node: MultiwayTreeNode = self.get_mian_case_node(self.node)
                     main_case_node.node.status = NodeStatusEnum.SKIPPED
+                    self.publish_skip(f"case:{main_case_node.node.metadata.id}")
         elif error_strategy == ErrorStrategyMixinEnum.CURRENT_CASE:
             if not self.in_case:
                 main_child_case_node: MultiwayTreeNode = self.get_main_child_case_node(self.node)
                 main_child_case_node.node.status = NodeStatusEnum.SKIPPED
             else:
                 # 发现是结束当前子用例，依然是需要知道是结束子用例中的当前用例，还是结束主用例中的子用例
-                case_node = self.exec_runner.search_node(self.node, lambda node: isinstance(node.node.metadata, Case))
+                case_node = self.node.parent.scope.case
                 if case_node.node.metadata.error_strategy == ErrorStrategyMixinEnum.REF_CASE_INNER:
                     # 重新通过parent找到ChildStepCase，然后跳过它
                     inner_child_case_node = self.get_inner_child_case_node(self.node)
@@ -74,6 +75,12 @@ class ErrorStrategyController:
             inner_case_node: MultiwayTreeNode = self.get_inner_case_node(self.node)
             inner_case_node.node.status = NodeStatusEnum.SKIPPED
 
+    def publish_skip(self, scope: str):
+        """分片执行时，结束任务、结束主用例需要通知其他分片"""
+        shard = self.exec_runner.global_option.shard
+        if shard is not None:
+            shard.publish_skip(scope)
+
     def get_real_error_strategy(self, node: MultiwayTreeNode = None, child_iter=None):
         parent_node = node.parent
         if isinstance(parent_node.node.metadata, ChildMultitasker):
@@ -89,47 +96,24 @@ class ErrorStrategyController:
         else:
             return parent_node, child_iter
 
-    def get_inner_case_node(self, node: MultiwayTreeNode):
-        parent_node = node.parent
-        if isinstance(node.node.metadata, Case):
-            return node
-        elif isinstance(parent_node.node.metadata, Case):
-            return parent_node
-        else:
-            return self.get_inner_case_node(parent_node)
+    # 以下查找都直接读取节点的祖先索引（NodeScope，含节点自身）
 
-    def get_inner_child_case_node(self, node: MultiwayTreeNode):
-        parent_node = node.parent
-        if isinstance(node.node.metadata, ChildStepCase):
-            return node
-        elif isinstance(parent_node.node.metadata, ChildStepCase):
-            return parent_node
-        else:
-            return self.get_inner_child_case_node(parent_node)
+    @classmethod
+    def get_inner_case_node(cls, node: MultiwayTreeNode):
+        return node.scope.case
 
-    def get_main_child_case_node(self, node: MultiwayTreeNode):
-        parent_node = node.parent
-        if isinstance(node.node.metadata, ChildCase):
-            return node
-        elif isinstance(parent_node.node.metadata, ChildCase):
-            return parent_node
-        else:
-            return self.get_main_child_case_node(parent_node)
+    @classmethod
+    def get_inner_child_case_node(cls, node: MultiwayTreeNode):
+        return node.scope.child_step_case
 
-    def get_mian_case_node(self, node: MultiwayTreeNode):
-        parent_node = node.parent
-        if isinstance(node.node.metadata, GlobalCase):
-            return node
-        elif isinstance(parent_node.node.metadata, GlobalCase):
-            return parent_node
-        else:
-            return self.get_mian_case_node(parent_node)
+    @classmethod
+    def get_main_child_case_node(cls, node: MultiwayTreeNode):
+        return node.scope.child_case
 
-    def get_task_node(self, node: MultiwayTreeNode):
-        parent_node = node.parent
-        if parent_node is None:
-            return node
-        elif parent_node.parent is None:
-            return parent_node
-        else:
-            return self.get_task_node(parent_node)
+    @classmethod
+    def get_mian_case_node(cls, node: MultiwayTreeNode):
+        return node.scope.main_case
+
+    @classmethod
+    def get_task_node(cls, node: MultiwayTreeNode):
+        return node.scope.task
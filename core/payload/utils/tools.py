@@ -1,30 +1,31 @@
 import copy
 import os
 import time
-from typing import Union
+from typing import Union, Optional, List, Tuple, Iterable
 
 from core.customer_script.dataset_object import DataSet
 from core.enums.executor import RunningModeEnum
 
 
-async def run_loop_strategy(loop_target=None, context=None, executors=None):
+async def run_loop_strategy(loop_target=None, context=None, executors=None, limit: Optional[int] = None):
     if loop_target.loop_strategy == RunningModeEnum.SEQUENTIALLY.value:
         return await context.run_sequentially(executors)
     elif loop_target.loop_strategy == RunningModeEnum.CONCURRENTLY.value:
-        return await context.run_concurrently(executors)
+        return await context.run_concurrently(executors, limit)
     return None
 
 
-def search_env(node, has_found_case_node=False):
-    if node.node.metadata.type == 'case' and has_found_case_node is False:
-        if node.node.metadata.env_strategy == 'self_case':
-            return node.node.metadata.env
-        else:
-            return search_env(node.parent, True)
-    elif node.node.metadata.type == 'main_case':
-        return node.node.metadata.env
-    else:
-        return search_env(node.parent, has_found_case_node)
+def concurrency_limit(node_type: str) -> Optional[int]:
+    """
+    并发驱动的节点下，同时执行的子节点上限：CASE_MAX_CONCURRENCY（用例）、MULTITASKER_MAX_CONCURRENCY（多任务器），
+    未配置或为 0 时不限制，只受任务级的 MAX_CONCURRENCY 约束
+    """
+    return int(os.getenv(f"{node_type.upper()}_MAX_CONCURRENCY", 0)) or None
+
+
+def search_env(node):
+    """最近的用例步骤使用自身环境时为它的环境，否则为主用例的环境，由节点的祖先索引直接得到"""
+    return node.scope.search_env()
 
 
 def process_script_value(value) -> Union[list, int]:
@@ -50,6 +51,13 @@ def process_script_value(value) -> Union[list, int]:
     return 1
 
 
+def drive_source(loop_data) -> Tuple[int, Iterable]:
+    """驱动次数与每次驱动的临时变量；固定次数时逐次生成空字典，不预先创建 loop_data 个"""
+    if isinstance(loop_data, int):
+        return loop_data, ({} for _ in range(loop_data))
+    return len(loop_data), loop_data
+
+
 class PositionItem:
 
     def __init__(self, type="", index: int = None, label: str = None):
@@ -61,7 +69,59 @@ class PositionItem:
         return self.__dict__
 
 
+class PositionPath:
+    """
+    不可变的位置路径：每个节点只保存自己的位置项和父路径，兄弟节点共享同一个父路径，派生子路径是 O(1) 的。
+    只有在序列化事件时才展开为列表，展开结果缓存在节点上；位置项创建后不再修改。
+    """
+    __slots__ = ("parent", "item", "depth", "_list", "interned")
+
+    def __init__(self, item: Optional[dict] = None, parent: Optional['PositionPath'] = None):
+        self.parent = parent
+        self.item = item
+        self.depth = 0 if item is None else (parent.depth if parent else 0) + 1
+        self._list: Optional[List[dict]] = None
+        # PositionPathIntern 计算出的 (路径 id, 编码后的 JSON)
+        self.interned = None
+
+    @classmethod
+    def from_list(cls, position_list: Optional[List[dict]]) -> 'PositionPath':
+        path = EMPTY_POSITION_PATH
+        for item in position_list or []:
+            path = path.append(item)
+        return path
+
+    def append(self, item: dict) -> 'PositionPath':
+        return PositionPath(item, self)
+
+    def to_list(self) -> List[dict]:
+        """展开为列表（只读，调用方不能修改）"""
+        if self._list is None:
+            if self.item is None:
+                self._list = []
+            else:
+                self._list = (self.parent.to_list() if self.parent else []) + [self.item]
+        return self._list
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __len__(self):
+        return self.depth
+
+    def __bool__(self):
+        return self.depth > 0
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+
+EMPTY_POSITION_PATH = PositionPath()
+
+
 class StaticPathIndex:
+    __slots__ = ("record_index", "task", "case", "case_index", "child_case", "step", "parent_step", "parent_step_name",
+                 "step_name", "case_name", "position_list")
 
     def __init__(self, record_index=None, task=None, case=None, child_case=None, parent_step=None, step=None,
                  parent_step_name=None, step_name=None, case_name=None, position_list=None, case_index=None):
@@ -75,13 +135,16 @@ class StaticPathIndex:
         self.parent_step_name = parent_step_name
         self.step_name = step_name
         self.case_name = case_name
-        self.position_list = position_list or []
+        self.position_list: PositionPath = position_list if isinstance(position_list, PositionPath) else \
+            PositionPath.from_list(position_list)
 
     def to_dict(self):
-        return self.__dict__
+        # 与原先的列表形式保持一致
+        return {name: self.position_list.to_list() if name == "position_list" else getattr(self, name)
+                for name in self.__slots__}
 
     def add_position(self, position: dict):
-        self.position_list.append(position)
+        self.position_list = self.position_list.append(position)
 
     def copy(self):
         spi = StaticPathIndex(record_index=self.record_index, task=self.task, case=self.case,
@@ -89,7 +152,16 @@ class StaticPathIndex:
                               child_case=self.child_case, parent_step=self.parent_step, step=self.step,
                               parent_step_name=self.parent_step_name, step_name=self.step_name,
                               case_name=self.case_name)
-        spi.position_list = copy.deepcopy(self.position_list)
+        # 路径不可变，直接共享
+        spi.position_list = self.position_list
+        return spi
+
+    def extend(self, position: dict, **fields):
+        """派生子节点的路径索引：追加一个位置项，并覆盖 fields 中给出的字段"""
+        spi = copy.copy(self)
+        spi.position_list = self.position_list.append(position)
+        for key, value in fields.items():
+            setattr(spi, key, value)
         return spi
 
 
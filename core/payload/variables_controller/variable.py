@@ -11,19 +11,11 @@ class VariableToller:
     def get_variable_mapping(cls, node: MultiwayTreeNode):
         cache_mapping = {}
 
-        # 使用迭代来替代递归，避免栈溢出和逻辑错误
-        current_node = node
-        # 获取临时变量
-        while current_node is not None:
-            if hasattr(current_node.node.metadata, 'temp_variables'):
-                temp_vars = current_node.node.metadata.temp_variables
-                for k, v in temp_vars.items():
-                    if k not in cache_mapping:
-                        cache_mapping[k] = v
-            if current_node.node.metadata.type == 'child_case':
-                current_node = None
-            else:
-                current_node = current_node.parent
+        # 获取临时变量：只访问携带 temp_variables 的祖先，到子用例为止
+        for scope_node in Variable._temp_scopes(node):
+            for k, v in scope_node.node.metadata.temp_variables.items():
+                if k not in cache_mapping:
+                    cache_mapping[k] = v
 
         # 获取环境变量
         merged_env_variable_mapping = cls.get_env_merged_variable(node)
@@ -73,71 +65,49 @@ class Variable:
         """
         获取当前运行的主用例的项目和环境
         """
-        if node.node.metadata.type == 'main_case':
-            env = node.node.metadata.env
-            if project_id is None:
-                project_id = node.node.metadata.project_id
-            return project_id, env
-        else:
-            return cls._get_root_case_project_env(node.parent, project_id)
+        metadata = node.scope.main_case.node.metadata
+        return project_id if project_id is not None else metadata.project_id, metadata.env
 
     @classmethod
     def _gpe(cls, node: MultiwayTreeNode, project_id=None):
         """
-        获取项目和环境
+        获取项目和环境：环境由节点的祖先索引在创建节点时推导好，接口步骤使用自身的项目
         """
-        if node.node.metadata.type == 'case':
-            if project_id is None:
-                project_id = node.node.metadata.project_id
-            if node.node.metadata.env_strategy == 'self_case':
-                env = node.node.metadata.env
-                return project_id, env
-            if node.node.metadata.env_strategy == 'current_case':
-                return cls._gpe(node.parent, project_id)
-            return None, None
-        elif node.node.metadata.type == 'main_case':
-            env = node.node.metadata.env
-            if project_id is None:
-                project_id = node.node.metadata.project_id
-            return project_id, env
-        elif node.node.metadata.type == 'interface':
+        if node.node.metadata.type == 'interface':
             project_id = node.node.metadata.project_id
-            return cls._gpe(node.parent, project_id)
-        else:
-            return cls._gpe(node.parent, project_id)
+        return node.scope.get_project_env(project_id)
+
+    @classmethod
+    def _temp_scopes(cls, node: MultiwayTreeNode):
+        """由近到远依次返回携带 temp_variables 的祖先节点（含自身），到子用例为止"""
+        scope_node = node.scope.temp_scope
+        while scope_node is not None:
+            yield scope_node
+            if scope_node.node.metadata.type == 'child_case' or scope_node.parent is None:
+                return
+            scope_node = scope_node.parent.scope.temp_scope
 
     def _stv(self, node: MultiwayTreeNode, key):
         """
         查询 temp_variables
         """
-        if node.node.metadata.type == 'child_case':
-            return node.node.metadata.temp_variables.get(key, self.EmptyObject())
-        if not hasattr(node.node.metadata, 'temp_variables'):
-            return self._stv(node.parent, key)
-        else:
-            _value = node.node.metadata.temp_variables.get(key, self.EmptyObject())
-            if isinstance(_value, self.EmptyObject):
-                return self._stv(node.parent, key)
-            else:
+        for scope_node in self._temp_scopes(node):
+            _value = scope_node.node.metadata.temp_variables.get(key, self.EmptyObject())
+            if not isinstance(_value, self.EmptyObject):
                 return _value
+        return self.EmptyObject()
 
     def _gtv_node(self, node: MultiwayTreeNode) -> MultiwayTreeNode:
         """
         获取上级存在temp_variables的节点
         """
-        if hasattr(node.node.metadata, 'temp_variables'):
-            return node
-        else:
-            return self._gtv_node(node.parent)
+        return node.scope.temp_scope
 
     def _gcc_node(self, node: MultiwayTreeNode) -> MultiwayTreeNode:
         """
         获取ChildCase节点
         """
-        if node.node.metadata.type == 'child_case':
-            return node
-        else:
-            return self._gcc_node(node.parent)
+        return node.scope.child_case
 
 
 class GlobalVariable(Variable):
@@ -164,7 +134,10 @@ class GlobalVariable(Variable):
                 "type": 'global'
             })
             self.node.node.send_step(VariableSetProcessObject(desc=desc))
-            self.node.node.global_option.global_cache.origin_global_variable_mapping[key] = value
+            global_option = self.node.node.global_option
+            global_option.global_cache.origin_global_variable_mapping[key] = value
+            if global_option.shard is not None:
+                global_option.shard.publish_variable(["global", key], value)
         else:
             self.node.node.send_step(VariableWarningProcessObject(desc=f"当前步骤不允许使用对变量进行设置"))
 
@@ -235,6 +208,9 @@ class EnvVariable(Variable):
                 self.node.node.send_step(VariableWarningProcessObject(desc=f"系统警告：设置参数时获取环境信息失败"))
             else:
                 env_variable_mapping[key] = value
+                shard = self.node.node.global_option.shard
+                if shard is not None:
+                    shard.publish_variable(["env", str(project_id), env, key], value)
                 desc = json.dumps({
                     "key": key,
                     "value": value,
@@ -0,0 +1,331 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Union
+
+BACKUP_ROOT = Path(__file__).resolve().parent.parent / "static" / "record_redis_backup"
+
+
+class RecordBackupNotFoundError(RuntimeError):
+    """备份文件不存在，记录已真正过期"""
+    pass
+
+
+class RecordBackupStore:
+    """
+    record redis 备份文件的分片存储。
+
+    目录结构：
+        record_redis_backup/
+            index.json              # 根索引：每个分片的字节数、文件数、最早访问时间
+            <shard>/manifest.json   # 分片清单：文件名 -> 分组、大小、创建/访问时间
+            <shard>/<safe_name>.json
+
+    同一个任务的所有记录（分组）落在同一个分片里，因此结束任务时按 Django 返回的保留列表清理，
+    只需要读取一个分片清单，不再对整个备份目录做 listdir。
+    """
+    MANIFEST_NAME = "manifest.json"
+    INDEX_NAME = "index.json"
+    LOCK_NAME = ".lock"
+
+    def __init__(self, root: Union[str, os.PathLike, None] = None):
+        self.root = Path(root) if root else BACKUP_ROOT
+
+    # --- 命名规则 ---
+
+    @staticmethod
+    def safe_filename(key_prefix: str) -> str:
+        return key_prefix.replace(':', '_').strip('_') + '.json'
+
+    @staticmethod
+    def group_of(key_prefix: str) -> str:
+        """同一任务的记录共享的分组前缀，与原先清理逻辑中的 file_prefix 保持一致"""
+        return key_prefix.split(":record:")[0].replace(":", "_")
+
+    @staticmethod
+    def shard_of_group(group: str) -> str:
+        return hashlib.sha1(group.encode('utf-8')).hexdigest()[:2]
+
+    @classmethod
+    def shard_of(cls, key_prefix: str) -> str:
+        return cls.shard_of_group(cls.group_of(key_prefix))
+
+    def shard_dir(self, shard: str) -> Path:
+        return self.root / shard
+
+    def filepath(self, key_prefix: str) -> Path:
+        return self.shard_dir(self.shard_of(key_prefix)) / self.safe_filename(key_prefix)
+
+    def legacy_filepath(self, key_prefix: str) -> Path:
+        """旧版本平铺在根目录下的备份文件"""
+        return self.root / self.safe_filename(key_prefix)
+
+    @staticmethod
+    def legacy_group(name: str) -> str:
+        """旧平铺目录中备份文件名对应的分组"""
+        return name[:-len('.json')].split("_record_")[0]
+
+    def resolve(self, key_prefix: str) -> Optional[Path]:
+        """查找备份文件，优先分片目录，兼容旧的平铺目录"""
+        for path in (self.filepath(key_prefix), self.legacy_filepath(key_prefix)):
+            if path.is_file():
+                return path
+        return None
+
+    # --- 文件锁与原子写 ---
+
+    @contextmanager
+    def _locked(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / self.LOCK_NAME, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_json(path: Path, default):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default
+
+    @staticmethod
+    def _write_json(path: Path, data):
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _read_manifest(self, shard: str) -> Dict[str, Dict[str, Any]]:
+        return self._read_json(self.shard_dir(shard) / self.MANIFEST_NAME, {})
+
+    def _write_manifest(self, shard: str, manifest: Dict[str, Dict[str, Any]]):
+        self._write_json(self.shard_dir(shard) / self.MANIFEST_NAME, manifest)
+
+    def _read_index(self) -> Dict[str, Any]:
+        index = self._read_json(self.root / self.INDEX_NAME, {})
+        index.setdefault("shards", {})
+        index.setdefault("cursor", 0)
+        return index
+
+    def _write_index(self, index: Dict[str, Any]):
+        self._write_json(self.root / self.INDEX_NAME, index)
+
+    def _sync_shard_stat(self, shard: str, manifest: Dict[str, Dict[str, Any]]):
+        """在持有分片锁的情况下，把分片统计同步到根索引（锁顺序：分片 -> 根索引）"""
+        with self._locked(self.root):
+            index = self._read_index()
+            if manifest:
+                index["shards"][shard] = {
+                    "bytes": sum(item.get("size", 0) for item in manifest.values()),
+                    "count": len(manifest),
+                    "oldest": min(item.get("access", 0) for item in manifest.values())
+                }
+            else:
+                index["shards"].pop(shard, None)
+            self._write_index(index)
+
+    # --- 写入、访问与清理 ---
+
+    def register(self, key_prefix: str):
+        """备份文件写入完成后登记到分片清单"""
+        path = self.filepath(key_prefix)
+        if not path.is_file():
+            return
+        shard = self.shard_of(key_prefix)
+        now = time.time()
+        with self._locked(self.shard_dir(shard)):
+            manifest = self._read_manifest(shard)
+            manifest[path.name] = {
+                "group": self.group_of(key_prefix),
+                "size": path.stat().st_size,
+                "created": now,
+                "access": now
+            }
+            self._write_manifest(shard, manifest)
+            self._sync_shard_stat(shard, manifest)
+
+    def touch(self, key_prefix: str):
+        """记录被恢复读取时刷新访问时间，作为 LRU 的依据"""
+        shard = self.shard_of(key_prefix)
+        name = self.safe_filename(key_prefix)
+        with self._locked(self.shard_dir(shard)):
+            manifest = self._read_manifest(shard)
+            if name not in manifest:
+                return
+            manifest[name]["access"] = time.time()
+            self._write_manifest(shard, manifest)
+            self._sync_shard_stat(shard, manifest)
+
+    def _remove_entries(self, shard: str, manifest: Dict[str, Dict[str, Any]], names: Iterable[str]) -> int:
+        removed = 0
+        for name in list(names):
+            try:
+                os.remove(self.shard_dir(shard) / name)
+                print(f"Successfully deleted: {shard}/{name}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Failed to delete {shard}/{name}: {e}")
+                continue
+            removed += manifest.pop(name, {}).get("size", 0)
+        return removed
+
+    def prune_group(self, key_prefix: str, keep_keys: Iterable[str]):
+        """
+        删除与 key_prefix 同一任务、但不在保留列表中的备份，只读取一个分片清单。
+        旧平铺目录中的备份不在这里扫描：服务启动时迁移进分片清单（见 RecordBackupRetention.migrate_legacy），
+        之后在该任务下一次结束时清理，或者按保留策略淘汰
+        """
+        shard = self.shard_of(key_prefix)
+        group = self.group_of(key_prefix)
+        keep_set = {self.safe_filename(key) for key in keep_keys}
+        with self._locked(self.shard_dir(shard)):
+            manifest = self._read_manifest(shard)
+            to_delete = [name for name, item in manifest.items() if
+                         item.get("group") == group and name not in keep_set]
+            if not to_delete:
+                return
+            self._remove_entries(shard, manifest, to_delete)
+            self._write_manifest(shard, manifest)
+            self._sync_shard_stat(shard, manifest)
+
+    def _legacy_entries(self) -> Iterable[os.DirEntry]:
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.json') and entry.name != self.INDEX_NAME:
+                    yield entry
+
+    # --- 后台保留策略 ---
+
+    def retention_step(self, max_bytes: int = 0, max_age: float = 0, batch: int = 8):
+        """
+        增量执行一次保留策略：
+        1. 按游标轮询 batch 个分片，删除超过 max_age 未访问的备份；
+        2. 总大小超过 max_bytes 时，从最早访问的分片开始按 LRU 淘汰，最多处理 batch 个分片。
+        每次只触达少量分片，不做全目录扫描。
+        """
+        index = self._read_index()
+        shards = sorted(index["shards"].keys())
+        if max_age > 0 and shards:
+            deadline = time.time() - max_age
+            start = index["cursor"] % len(shards)
+            for shard in (shards + shards)[start:start + min(batch, len(shards))]:
+                self._evict_shard(shard, lambda item: item.get("access", 0) < deadline)
+            with self._locked(self.root):
+                index = self._read_index()
+                index["cursor"] = start + min(batch, len(shards))
+                self._write_index(index)
+
+        if max_bytes > 0:
+            for _ in range(batch):
+                index = self._read_index()
+                total = sum(stat.get("bytes", 0) for stat in index["shards"].values())
+                if total <= max_bytes or not index["shards"]:
+                    break
+                shard = min(index["shards"], key=lambda s: index["shards"][s].get("oldest", 0))
+                self._evict_shard(shard, overflow=total - max_bytes)
+
+    def _evict_shard(self, shard: str, expired=None, overflow: int = 0):
+        with self._locked(self.shard_dir(shard)):
+            manifest = self._read_manifest(shard)
+            if expired is not None:
+                to_delete = [name for name, item in manifest.items() if expired(item)]
+            else:
+                to_delete = []
+                for name, item in sorted(manifest.items(), key=lambda kv: kv[1].get("access", 0)):
+                    if overflow <= 0:
+                        break
+                    to_delete.append(name)
+                    overflow -= item.get("size", 0)
+            if to_delete:
+                self._remove_entries(shard, manifest, to_delete)
+                self._write_manifest(shard, manifest)
+            self._sync_shard_stat(shard, manifest)
+
+    def migrate_legacy(self, batch: int = 50, time_budget: float = 0) -> int:
+        """
+        把旧版本平铺在根目录下的备份文件分批迁移进分片目录，返回本次迁移的文件数。
+        batch、time_budget（秒）不大于 0 时不限制文件数、耗时
+        """
+        moved = 0
+        if not self.root.is_dir() or self._read_index().get("legacy_migrated"):
+            return moved
+        deadline = time.monotonic() + time_budget
+        for entry in self._legacy_entries():
+            # 每一段至少迁移一个文件，保证分段执行总能迁移完
+            if (batch > 0 and moved >= batch) or (time_budget > 0 and moved and time.monotonic() >= deadline):
+                break
+            group = self.legacy_group(entry.name)
+            shard = self.shard_of_group(group)
+            target = self.shard_dir(shard) / entry.name
+            with self._locked(self.shard_dir(shard)):
+                try:
+                    os.replace(entry.path, target)
+                except FileNotFoundError:
+                    # 已被其他进程迁移
+                    continue
+                manifest = self._read_manifest(shard)
+                stat = target.stat()
+                manifest[entry.name] = {
+                    "group": group,
+                    "size": stat.st_size,
+                    "created": stat.st_mtime,
+                    "access": stat.st_mtime
+                }
+                self._write_manifest(shard, manifest)
+                self._sync_shard_stat(shard, manifest)
+            moved += 1
+        else:
+            # 平铺目录已经迁移完（新的备份只写入分片目录），之后不再扫描根目录
+            with self._locked(self.root):
+                index = self._read_index()
+                index["legacy_migrated"] = True
+                self._write_index(index)
+        return moved
+
+
+class RecordBackupRetention:
+    """在服务进程中后台运行的备份保留策略，周期性地增量清理，不占用任务结束时的关键路径"""
+
+    def __init__(self, store: RecordBackupStore = None):
+        self.store = store or RecordBackupStore()
+        self.interval = float(os.getenv("RECORD_BACKUP_RETENTION_INTERVAL", 60))
+        self.batch = int(os.getenv("RECORD_BACKUP_RETENTION_BATCH", 8))
+        self.max_bytes = int(float(os.getenv("RECORD_BACKUP_MAX_SIZE_MB", 0)) * 1024 * 1024)
+        self.max_age = float(os.getenv("RECORD_BACKUP_MAX_AGE_DAYS", 0)) * 24 * 3600
+        # 启动迁移时每一段占用线程的最长时间（秒）
+        self.migration_slice = float(os.getenv("RECORD_BACKUP_MIGRATION_SLICE", 1))
+
+    def run_once(self):
+        self.store.migrate_legacy(self.batch)
+        self.store.retention_step(self.max_bytes, self.max_age, self.batch)
+
+    async def migrate_legacy(self):
+        """服务启动时把旧平铺目录一次迁移完，按 migration_slice 分段执行，不限制文件数"""
+        while await asyncio.to_thread(self.store.migrate_legacy, 0, self.migration_slice):
+            pass
+
+    async def serve(self):
+        try:
+            await self.migrate_legacy()
+        except Exception as e:
+            # 没有迁移完的文件由之后每一轮的 run_once 继续迁移
+            traceback.print_exc()
+            print(f"备份目录迁移失败：{e}")
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                traceback.print_exc()
+                print(f"备份保留策略执行失败：{e}")
+            await asyncio.sleep(self.interval)
@@ -67,14 +67,10 @@ class StepExecRunner:
 
     async def core_runner(self):
         process_object = await self.get_base_process()
-        if self.is_send_self_step:
-            self.step_exec.send_step(process_object)
-        if self.is_send_parent_step:
-            self.step_exec.send_parent_step(process_object)
-        if self.is_send_child_case:
-            self.step_exec.send_child_case(process_object)
-        if self.is_send_summary:
-            self.step_exec.send_summary(process_object)
+        # 同一个事件写入多个列表时合并为一次 pipeline
+        self.step_exec.send_records(process_object, step=self.is_send_self_step,
+                                    parent_step=self.is_send_parent_step,
+                                    child_case=self.is_send_child_case, summary=self.is_send_summary)
         if self.is_run_core_exec:
             result = await self.run_callback()
         else:
@@ -1,4 +1,3 @@
-from core.lua_executor.redis_helper import LuaScriptExecutor
 from core.record.child_record.core import RecordController
 from core.record.task_record import TaskRecord
 
@@ -9,5 +8,4 @@ class TaskInfoRecord(RecordController):
         super().__init__(task_record)
 
     async def change_info(self, **kwargs):
-        await LuaScriptExecutor(self.get_client().client, 'update_fields').execute_async(
-            f"{self.task_record.redis_index}:task_info", kwargs)
+        await self.get_client().update_fields_lua(f"{self.task_record.redis_index}:task_info", **kwargs)
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from core.record.backup_store import RecordBackupNotFoundError
+from core.record.redis_client import AsyncRedisClient
+
+
+class _RestoreFlight:
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class RecordRestoreFlight:
+    """
+    记录恢复的合并器（single-flight）。
+
+    - 同一个 record_backup_index 同时只会有一个恢复在执行，其他请求挂在该次恢复上等待结果；
+    - 恢复成功后的短时间内不再重复恢复；
+    - 备份文件不存在时做短时间的负缓存，已过期的记录被轮询时不再反复访问文件系统。
+    """
+
+    def __init__(self, negative_ttl: float = None, positive_ttl: float = None, max_entries: int = 1024):
+        self.negative_ttl = negative_ttl if negative_ttl is not None else float(
+            os.getenv("RECORD_RESTORE_NEGATIVE_TTL", 30))
+        self.positive_ttl = positive_ttl if positive_ttl is not None else float(
+            os.getenv("RECORD_RESTORE_POSITIVE_TTL", 5))
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _RestoreFlight] = {}
+        self._negative: Dict[str, float] = {}
+        self._restored: Dict[str, float] = {}
+
+    def restore(self, record_backup_index: str):
+        now = time.monotonic()
+        with self._lock:
+            if self._negative.get(record_backup_index, 0) > now:
+                raise RecordBackupNotFoundError(f"错误：备份文件未找到 at '{record_backup_index}'")
+            if self._restored.get(record_backup_index, 0) > now:
+                return
+            flight = self._inflight.get(record_backup_index)
+            is_leader = flight is None
+            if is_leader:
+                flight = _RestoreFlight()
+                self._inflight[record_backup_index] = flight
+
+        if not is_leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return
+
+        try:
+            AsyncRedisClient.sync_import_from_file(record_backup_index)
+        except RecordBackupNotFoundError as e:
+            flight.error = e
+            self._remember(self._negative, record_backup_index, self.negative_ttl)
+            raise
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            self._remember(self._restored, record_backup_index, self.positive_ttl)
+        finally:
+            with self._lock:
+                self._inflight.pop(record_backup_index, None)
+            flight.event.set()
+
+    def _remember(self, cache: Dict[str, float], key: str, ttl: float):
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(cache) >= self.max_entries:
+                for expired_key in [k for k, expire in cache.items() if expire <= now]:
+                    cache.pop(expired_key, None)
+            cache[key] = now + ttl
+
+    def invalidate(self, record_backup_index: str):
+        with self._lock:
+            self._negative.pop(record_backup_index, None)
+            self._restored.pop(record_backup_index, None)
+
+
+record_restore_flight = RecordRestoreFlight()
@@ -1,13 +1,15 @@
 import os
 import json
 import asyncio
-from pathlib import Path
 from typing import Optional, List, Any, Callable, Dict
 
 import aiofiles
 from core.global_client.async_redis import get_async_client
-from core.global_client.sync_redis import get_sync_client, close_sync_pool
+from core.global_client.sync_redis import get_sync_client
 from core.lua_executor.redis_helper import LuaScriptExecutor
+from core.record.backup_store import RecordBackupStore, RecordBackupNotFoundError
+from core.record.value_codec import compress_value, decompress_value
+from remote.redis.replicator import RecordJournal
 
 
 class AsyncRedisClient:
@@ -23,6 +25,13 @@ class AsyncRedisClient:
         self.pool = pool
         self.client = async_global_redis_client
         self.default_ex = int(os.getenv("REDIS_TASK_RECORD_TIMEOUT"))
+        # 配置了中心记录存储时，每次写入在同一个 pipeline 中追加复制日志
+        self.journal = RecordJournal()
+
+    @staticmethod
+    def version_key(key: str) -> str:
+        """列表的变更版本号，列表每次写入（追加或原地修改）都会自增，轮询方据此判断是否有新数据"""
+        return f"{key}:version"
 
     async def close(self):
         """优雅地关闭连接池"""
@@ -31,30 +40,43 @@ class AsyncRedisClient:
 
     # --- 7. KV (String) 类型操作 ---
 
-    async def set_value(self, key: str, value: Any, ex: Optional[int] = None):
+    async def set_value(self, key: str, value: Any, ex: Optional[int] = None, compress: bool = True):
         """
         设置一个 KV 值，并附加默认的超时时间。
         如果 key 不存在，会自动创建。
+        compress=False 用于会被 Lua 脚本原地修改的 key。
         """
         timeout = ex if ex is not None else self.default_ex
-        await self.client.set(key, value, ex=timeout)
+        if compress:
+            value = compress_value(value)
+        if not self.journal.enabled:
+            await self.client.set(key, value, ex=timeout)
+            return
+        async with self.client.pipeline() as pipe:
+            pipe.set(key, value, ex=timeout)
+            self.journal.append(pipe, "SET", key, value, timeout)
+            await pipe.execute()
 
-    async def batch_set_value(self, data: dict, ex: Optional[int] = None):
+    async def batch_set_value(self, data: dict, ex: Optional[int] = None, compress: bool = True):
         """
         使用 Pipeline 批量设置 KV 值和过期时间。
 
         Args:
             data (dict): 一个字典，键为 Redis key，值为要存储的数据。
             ex (Optional[int]): 超时时间，单位秒。如果为 None，则使用默认值。
+            compress (bool): 是否压缩超过阈值的值，会被 Lua 脚本修改的 key 需要传 False。
         """
         timeout = ex if ex is not None else self.default_ex
         # 启用一个 Pipeline
         async with self.client.pipeline() as pipe:
             for key, value in data.items():
+                if compress:
+                    value = compress_value(value)
                 # 将 SET 命令添加到管道中
                 pipe.set(key, value)
                 # 将 EXPIRE 命令添加到管道中
                 pipe.expire(key, timeout)
+                self.journal.append(pipe, "SET", key, value, timeout)
 
             # 一次性执行所有命令
             await pipe.execute()
@@ -70,17 +92,21 @@ class AsyncRedisClient:
             new_value_str = values[0]
             try:
                 await LuaScriptExecutor(self.client, 'print_value').execute_async(key, json.loads(new_value_str))
+                await self._journal_sync(key)
             except (json.JSONDecodeError, TypeError):
                 print(f"跳过 key '{key}'，因为其值不是有效的 JSON 字符串: {new_value_str}")
                 continue
 
-    async def batch_create_and_init_lists(self, data: dict[str, list[Any]], ex: Optional[int] = None) -> None:
+    async def batch_create_and_init_lists(self, data: dict[str, list[Any]], ex: Optional[int] = None,
+                                          hash_data: Optional[dict[str, dict]] = None, compress: bool = True) -> None:
         """
         使用 Pipeline 批量创建多个列表类型的 key，并为其插入初始内容。
 
         Args:
             data (dict): 一个字典，键为 Redis key，值为包含初始内容的列表。
             ex (Optional[int]): 可选的过期时间，单位秒。
+            hash_data (dict): 需要在同一个 Pipeline 中先于列表写入的哈希字段，例如位置路径定义。
+            compress (bool): 是否压缩超过阈值的元素，元素会被 Lua 脚本修改的列表需要传 False。
         """
         if not data:
             return
@@ -89,32 +115,71 @@ class AsyncRedisClient:
 
         # 启用一个 Pipeline
         async with self.client.pipeline() as pipe:
+            for key, mapping in (hash_data or {}).items():
+                if mapping:
+                    pipe.hset(key, mapping=mapping)
+                    pipe.expire(key, timeout)
+                    self.journal.append(pipe, "HSET", key, mapping, timeout)
             for key, initial_values in data.items():
                 if initial_values:
+                    if compress:
+                        initial_values = [compress_value(value) for value in initial_values]
                     # 将 RPUSH 命令添加到管道中
                     pipe.rpush(key, *initial_values)
                     # 将 EXPIRE 命令添加到管道中
                     pipe.expire(key, timeout)
+                    self.journal.append(pipe, "RPUSH", key, list(initial_values), timeout)
+                    pipe.incr(self.version_key(key))
+                    pipe.expire(self.version_key(key), timeout)
+                    self.journal.append(pipe, "INCR", self.version_key(key), ttl=timeout)
 
             # 一次性执行所有命令
             await pipe.execute()
 
+    async def batch_set_hash(self, data: dict[str, dict], ex: Optional[int] = None):
+        """使用 Pipeline 批量写入哈希字段并设置过期时间"""
+        timeout = ex if ex is not None else self.default_ex
+        async with self.client.pipeline() as pipe:
+            for key, mapping in data.items():
+                if mapping:
+                    pipe.hset(key, mapping=mapping)
+                    pipe.expire(key, timeout)
+                    self.journal.append(pipe, "HSET", key, mapping, timeout)
+            await pipe.execute()
+
     async def get_value(self, key: str) -> Optional[str]:
-        """获取一个 KV 值"""
-        return await self.client.get(key)
+        """获取一个 KV 值，压缩过的值自动解压"""
+        return decompress_value(await self.client.get(key))
 
     async def delete_value(self, *key: str) -> int:
         """删除一个或多个 KV 值"""
-        return await self.client.delete(*key)
+        if not self.journal.enabled:
+            return await self.client.delete(*key)
+        async with self.client.pipeline() as pipe:
+            pipe.delete(*key)
+            for item in key:
+                self.journal.append(pipe, "DEL", item)
+            return (await pipe.execute())[0]
+
+    async def _journal_sync(self, key: str):
+        """Lua 脚本原地修改的 key 无法按命令重放，记录一条 SYNC，由复制器读取当前值整体覆盖"""
+        if not self.journal.enabled:
+            return
+        async with self.client.pipeline() as pipe:
+            self.journal.append(pipe, "SYNC", key)
+            await pipe.execute()
 
     async def increment_fields_lua(self, key: str, **kwargs):
         await LuaScriptExecutor(self.client, 'increment_fields').execute_async(key, kwargs)
+        await self._journal_sync(key)
 
     async def update_fields_lua(self, key, **kwargs):
         await LuaScriptExecutor(self.client, 'update_fields').execute_async(key, kwargs)
+        await self._journal_sync(key)
 
     async def update_fields_to_list_lua(self, key, *other_args, **kwargs):
         await LuaScriptExecutor(self.client, 'update_fields_to_list').execute_async(key, kwargs, *other_args)
+        await self._journal_sync(key)
 
     async def locked_update_value(self, key: str, update_function: Callable[[Optional[str]], Any]) -> Any:
         """
@@ -139,8 +204,8 @@ class AsyncRedisClient:
             # 2. 调用外部函数计算新值
             new_value = update_function(current_value)
 
-            # 3. 安全地写入新值
-            await self.set_value(key, new_value)
+            # 3. 安全地写入新值（该 key 可能同时被 Lua 脚本更新，不压缩）
+            await self.set_value(key, new_value, compress=False)
 
             return new_value
 
@@ -183,11 +248,16 @@ class AsyncRedisClient:
         # 9. 是的，Redis 的 RPUSH 等命令在 key 不存在时会自动创建
         if not values:
             return
+        values = [compress_value(value) for value in values]
         # 使用 pipeline 确保两个命令的原子性
         async with self.client.pipeline() as pipe:
             pipe.rpush(key, *values)
             timeout = ex if ex is not None else self.default_ex
             pipe.expire(key, timeout)
+            self.journal.append(pipe, "RPUSH", key, list(values), timeout)
+            pipe.incr(self.version_key(key))
+            pipe.expire(self.version_key(key), timeout)
+            self.journal.append(pipe, "INCR", self.version_key(key), ttl=timeout)
             await pipe.execute()
 
     async def get_list_slice(self, key: str, start_index: int = 0) -> List[str]:
@@ -200,13 +270,14 @@ class AsyncRedisClient:
             start_index = 0  # 保证下标大于等于0
 
         # Redis 的 LRANGE 命令中，-1 代表最后一个元素
-        return await self.client.lrange(key, start_index, -1)
+        return [decompress_value(value) for value in await self.client.lrange(key, start_index, -1)]
 
     # --- 10. 数据备份函数 ---
 
     async def export_by_prefix(self, key_prefix: str, output_dir: str):
         """
         [优化版]根据 key 前缀备份数据，同时保留 TTL (超时时间) 信息。
+        备份文件写入 output_dir 下的分片目录，并登记到分片清单。
         """
         backup_data = {}
         async for key in self.client.scan_iter(f"{key_prefix}*"):
@@ -219,6 +290,8 @@ class AsyncRedisClient:
                 value = await self.get_value(key)
             elif key_type == 'list':
                 value = await self.get_list_slice(key, 0)
+            elif key_type == 'hash':
+                value = await self.client.hgetall(key)
 
             if value is not None:
                 backup_data[key] = {
@@ -230,27 +303,27 @@ class AsyncRedisClient:
         if not backup_data:
             return
 
-        os.makedirs(output_dir, exist_ok=True)
-        safe_filename = key_prefix.replace(':', '_').strip('_') + '.json'
-        filepath = os.path.join(output_dir, safe_filename)
+        store = RecordBackupStore(output_dir)
+        filepath = store.filepath(key_prefix)
+        os.makedirs(filepath.parent, exist_ok=True)
         async with aiofiles.open(filepath, 'w', encoding='utf-8') as f:
             await f.write(json.dumps(backup_data, indent=2, ensure_ascii=False))
+        await asyncio.to_thread(store.register, key_prefix)
 
     @classmethod
     def sync_import_from_file(cls, key_prefix: str):
         sync_redis_client, _ = get_sync_client()
-        current_dir = Path(__file__).resolve().parent
-        parent_dir = current_dir.parent
-        output_dir = parent_dir / "static" / "record_redis_backup"
-        safe_filename = key_prefix.replace(':', '_').strip('_') + '.json'
-        filepath = os.path.join(output_dir, safe_filename)
+        store = RecordBackupStore()
+        filepath = store.resolve(key_prefix)
+        if filepath is None:
+            raise RecordBackupNotFoundError(f"错误：备份文件未找到 at '{key_prefix}'")
         try:
             # 1. 使用标准的同步 open() 函数读取文件
             with open(filepath, 'r', encoding='utf-8') as f:
                 content = f.read()
                 backup_data: Dict[str, Any] = json.loads(content)
         except FileNotFoundError:
-            raise RuntimeError(f"错误：备份文件未找到 at '{key_prefix}'")
+            raise RecordBackupNotFoundError(f"错误：备份文件未找到 at '{key_prefix}'")
         except json.JSONDecodeError:
             raise RuntimeError(f"错误：文件 '{key_prefix}' 不是一个有效的 JSON 文件。")
 
@@ -274,16 +347,16 @@ class AsyncRedisClient:
                     pipe.set(key, value)
                 elif key_type == 'list' and isinstance(value, list) and value:
                     pipe.rpush(key, *value)
-                # 您可以根据需要添加对其他类型的支持，例如 hash, set 等
-                # elif key_type == 'hash' and isinstance(value, dict) and value:
-                #     pipe.hset(key, mapping=value)
+                elif key_type == 'hash' and isinstance(value, dict) and value:
+                    pipe.hset(key, mapping=value)
 
                 if ttl > 0:
                     pipe.expire(key, int(ttl))
 
             # 3. 移除了 'await'，直接执行
             pipe.execute()
-        close_sync_pool()
+        # 服务进程中的同步连接池被并发的读取共享，这里不再关闭连接池
+        store.touch(key_prefix)
 
     # AsyncRedisClient 类中的新增函数
     async def import_from_file(self, filepath: str):
@@ -316,6 +389,8 @@ class AsyncRedisClient:
                     pipe.set(key, value)
                 elif key_type == 'list' and value:  # 确保 value 不为空
                     pipe.rpush(key, *value)
+                elif key_type == 'hash' and value:
+                    pipe.hset(key, mapping=value)
 
                 # 如果 TTL 大于 0，则设置过期时间
                 if ttl > 0:
@@ -2,7 +2,7 @@ import json
 from functools import lru_cache
 
 from core.record.redis_client import AsyncRedisClient
-from core.record.utils import ProcessObject
+from core.record.utils import ProcessObject, PositionPathIntern
 from core.task_object.child_case_list import ChildCase
 from core.task_object.generate_object import GlobalOption
 
@@ -13,11 +13,15 @@ class TaskRecord:
         self.global_option = global_option
         self.redis = AsyncRedisClient()
         self.redis_index = global_option.record.record_backup_index
+        # v2 事件的位置路径驻留表
+        self.position_paths = PositionPathIntern()
 
     async def cache_info(self):
         # task_info 缓存
+        # task_info、record_info、child_case_list 与状态 key 会被 Lua 脚本原地更新，不压缩
         await self.redis.set_value(f"{self.redis_index}:task_info",
-                                   json.dumps(self.global_option.task_info.to_dict(), ensure_ascii=False))
+                                   json.dumps(self.global_option.task_info.to_dict(), ensure_ascii=False),
+                                   compress=False)
         # case list缓存
         # await self.redis.set_value(f"{self.redis_index}:case_info",
         #                            json.dumps(self.global_option.case_list.to_dict(), ensure_ascii=False))
@@ -30,7 +34,8 @@ class TaskRecord:
         #                            json.dumps(self.global_option.global_cache.to_dict(), ensure_ascii=False))
         # 原始 record 缓存
         await self.redis.set_value(f"{self.redis_index}:record_info",
-                                   json.dumps(self.global_option.record.to_dict(), ensure_ascii=False))
+                                   json.dumps(self.global_option.record.to_dict(), ensure_ascii=False),
+                                   compress=False)
         # 初始化创建步骤record
         await self.initial_step_key(self.global_option.case_steps_snapshot)
 
@@ -55,8 +60,8 @@ class TaskRecord:
         # child_case_list 缓存
         await self.redis.batch_create_and_init_lists(
             {f"{self.redis_index}:child_case_record:child_case_list": _delete_cache_fields(
-                self.global_option.child_case_list.to_dict())})
-        await self.redis.batch_set_value(child_case_status_mapping)
+                self.global_option.child_case_list.to_dict())}, compress=False)
+        await self.redis.batch_set_value(child_case_status_mapping, compress=False)
         # child_case_process 缓存
         await self.redis.batch_create_and_init_lists(child_case_process_mapping)
 
@@ -98,12 +103,27 @@ class TaskRecord:
 
         await self.redis.locked_update_value(key, _increment)
 
+    def position_paths_key(self):
+        return f"{self.redis_index}:position_paths"
+
     async def batch_push_to_key(self, key: str, *args):
-        await self.redis.batch_create_and_init_lists({
+        await self.batch_push_to_keys({
             key: list(args)
         })
 
+    async def batch_push_to_keys(self, mapping: dict):
+        """把多组事件在一个 pipeline 中写入多个列表"""
+        pending = self.position_paths.take_pending()
+        await self.redis.batch_create_and_init_lists(
+            mapping, hash_data={self.position_paths_key(): pending} if pending else None)
+        self.position_paths.confirm(pending)
+
     async def batch_push_or_update_to_key(self, key: str, *args):
+        pending = self.position_paths.take_pending()
+        if pending:
+            # Lua 脚本只操作列表本身，路径定义需要先于事件写入
+            await self.redis.batch_set_hash({self.position_paths_key(): pending})
+            self.position_paths.confirm(pending)
         await self.redis.batch_create_and_init_lists_updated({
             key: list(args)
         })
@@ -111,41 +131,23 @@ class TaskRecord:
     async def get_value(self, key):
         return await self.redis.get_value(key)
 
-    @classmethod
-    def push_key_to_mapping(cls, step_list, prefix, status_mapping, process_mapping):
-        for step in step_list:
-            if step["type"] == 'empty':
-                continue
-            step_status_index = f"{prefix}:step:{step['id']}:status"
-            step_process_index = f"{prefix}:step:{step['id']}:process"
-            status_mapping[step_status_index] = json.dumps({
-                "id": step["id"],
-                "type": step["type"],
-                "label": step["label"],
-                "status": 'mid_pending',
-                "result": "mid_unknown",
-                "start": 0,
-                "end": 0
-            }, ensure_ascii=False)
-            process_mapping[step_process_index] = [ProcessObject(desc="步骤等待运行中...").to_json()]
-            if step.get("children", None):
-                cls.push_key_to_mapping(step["children"], prefix, status_mapping, process_mapping)
-
     async def initial_step_key(self, case_steps_snapshot):
         add_step_default_status_mapping = {}
         add_step_process_mapping = {
             f"{self.redis_index}:summary_record:process": [ProcessObject(desc="任务等待运行中...").to_json()]
         }
+        # 步骤初始状态由执行计划按用例预先序列化，这里只拼接各子用例的 key
+        pending_process = ProcessObject(desc="步骤等待运行中...").to_json()
         for child_case in self.global_option.child_case_list.list:
             child_case: ChildCase = child_case
             prefix_index = f"{self.redis_index}:step_record"
             case_id = child_case.case_id
             child_index = child_case.index_in_global_list
             case_index = f"{prefix_index}:case:{case_id}:child_case:{child_index}"
-            step_list = case_steps_snapshot.get(str(case_id))
-            self.push_key_to_mapping(step_list, case_index, add_step_default_status_mapping,
-                                     add_step_process_mapping)
-        await self.redis.batch_set_value(add_step_default_status_mapping)
+            for step_id, status in self.global_option.plan.step_status_templates(case_id):
+                add_step_default_status_mapping[f"{case_index}:step:{step_id}:status"] = status
+                add_step_process_mapping[f"{case_index}:step:{step_id}:process"] = [pending_process]
+        await self.redis.batch_set_value(add_step_default_status_mapping, compress=False)
         await self.redis.batch_create_and_init_lists(add_step_process_mapping)
 
     async def close(self):
@@ -1,9 +1,15 @@
+import hashlib
+import itertools
 import json
+import os
+import re
 from abc import ABC, abstractmethod
-from typing import Any, Union, List
+from contextvars import ContextVar, Token
+from typing import Any, Union, List, Dict, Iterable, Optional
 
 from core.enums.executor import RedisProcessTypeEnum, RedisDetailTypeEnum
-from core.payload.utils.tools import get_current_ms
+from core.payload.utils.tools import get_current_ms, PositionPath
+from core.utils import json_codec
 
 
 class JsonDetail(ABC):
@@ -36,6 +42,205 @@ class CoreExecReturn:
         self.result = result
 
 
+# v2 事件中 type 使用的短编码，按 RedisProcessTypeEnum 的定义顺序编号，新增类型只能追加在枚举末尾
+PROCESS_TYPE_CODES: Dict[str, int] = {member.value: code for code, member in enumerate(RedisProcessTypeEnum)}
+PROCESS_TYPES: List[str] = [member.value for member in RedisProcessTypeEnum]
+
+# 写入的事件格式：2 为紧凑格式（位置路径按 id 引用），1 为完整格式
+RECORD_EVENT_SCHEMA = int(os.getenv("RECORD_EVENT_SCHEMA", 2))
+
+
+class PositionPathIntern:
+    """
+    单个记录内的位置路径驻留表。
+
+    同一步骤的位置路径只在 `{record}:position_paths` 哈希中存一份，事件里只保留 id。
+    新出现的路径先进入 pending，由写入事件的同一个 pipeline 一并写入，写入成功后才确认，
+    并发写入方在确认前都会带上这份定义，保证读取方不会看到引用了未定义路径的事件。
+    """
+
+    def __init__(self):
+        self.known = set()
+        self.pending: Dict[str, str] = {}
+
+    @staticmethod
+    def encode(position_list) -> str:
+        return json_codec.dumps(position_list)
+
+    @staticmethod
+    def path_id(encoded: str) -> str:
+        return hashlib.blake2b(encoded.encode('utf-8'), digest_size=6).hexdigest()
+
+    def intern(self, position_list) -> Optional[str]:
+        if not position_list:
+            return None
+        if isinstance(position_list, PositionPath):
+            # 同一节点的所有事件共用一个 PositionPath，编码与哈希只计算一次
+            if position_list.interned is None:
+                encoded = self.encode(position_list.to_list())
+                position_list.interned = (self.path_id(encoded), encoded)
+            path_id, encoded = position_list.interned
+        else:
+            encoded = self.encode(position_list)
+            path_id = self.path_id(encoded)
+        if path_id not in self.known:
+            self.pending[path_id] = encoded
+        return path_id
+
+    def take_pending(self) -> Dict[str, str]:
+        return dict(self.pending)
+
+    def confirm(self, path_ids: Iterable[str]):
+        for path_id in path_ids:
+            self.pending.pop(path_id, None)
+            self.known.add(path_id)
+
+
+def is_compact_event(item: dict) -> bool:
+    return isinstance(item, dict) and "t" in item
+
+
+def expand_process_event(item: dict, position_paths: Dict[str, Any]) -> dict:
+    """把 v2 紧凑事件还原为 v1 的完整格式，v1 事件原样返回"""
+    if not is_compact_event(item):
+        return item
+    code = item.get("t")
+    return {
+        "type": PROCESS_TYPES[code] if isinstance(code, int) and 0 <= code < len(PROCESS_TYPES) else code,
+        "desc": item.get("desc"),
+        "detail": item.get("detail"),
+        "position_list": position_paths.get(item.get("p")),
+        "times": item.get("times", 0),
+        "time": item.get("time"),
+        "seq": item.get("seq")
+    }
+
+
+# 事件序号：在事件创建时分配，单调递增。写入方并发、批量写入，列表中的顺序可能与序号不一致，读取方按序号还原先后顺序：
+# 分页读取时向后多看若干条，后面还有序号更小的事件时本页在此截断（见 settled_count），跨页也按序号先后返回；
+# 轮询到列表末尾时还没写入的事件无法预知，只能出现在下一次轮询中
+_EVENT_SEQUENCE = itertools.count(1)
+
+
+class ShardEventSequence:
+    """
+    多进程分片执行时的事件序号，各进程以同一个起点计时：
+        序号 = ((经过的毫秒数 << 12 | 同一毫秒内的计数) << 6) | 进程槽位
+    同一进程内严格递增（同一毫秒内超过 4096 个事件时借用下一毫秒），不同进程的序号互不重复，并大致按时间先后排列。
+    槽位 0 为主进程，分片进程从 1 开始，最多 63 个。
+    """
+    MAX_SLOTS = 64
+
+    def __init__(self, slot: int, epoch_ms: int):
+        if not 0 <= slot < self.MAX_SLOTS:
+            raise ValueError(f"事件序号槽位超出范围：{slot}")
+        self.slot = slot
+        self.epoch_ms = epoch_ms
+        self.last_ms = -1
+        self.count = 0
+
+    def __next__(self) -> int:
+        elapsed = max(get_current_ms() - self.epoch_ms, 0)
+        if elapsed > self.last_ms:
+            self.last_ms, self.count = elapsed, 0
+        else:
+            self.count += 1
+            if self.count >= 4096:
+                self.last_ms, self.count = self.last_ms + 1, 0
+        return (((self.last_ms << 12) | self.count) << 6) | self.slot
+
+
+def configure_event_seq(slot: int, epoch_ms: int):
+    """切换为分片执行的事件序号，需要在本进程产生任何事件之前调用"""
+    global _EVENT_SEQUENCE
+    _EVENT_SEQUENCE = ShardEventSequence(slot, epoch_ms)
+
+
+# 同一进程同时执行多个任务的一部分时（分布式执行的工作节点），各任务在自己的上下文中使用各自的事件序号
+_CONTEXT_EVENT_SEQUENCE: ContextVar[Optional[ShardEventSequence]] = ContextVar("event_sequence", default=None)
+
+
+def use_event_seq(sequence: ShardEventSequence) -> Token:
+    """当前上下文（及其创建的子任务）改用 sequence 分配事件序号"""
+    return _CONTEXT_EVENT_SEQUENCE.set(sequence)
+
+
+def next_event_seq() -> int:
+    sequence = _CONTEXT_EVENT_SEQUENCE.get()
+    return next(sequence if sequence is not None else _EVENT_SEQUENCE)
+
+
+# to_compact_json 写出的规范形式：t、seq 在最前，p 在最后；Lua 脚本重新编码过的事件不满足该形式
+_COMPACT_EVENT_PATTERN = re.compile(
+    r'^\{"t":\s?(\d+),\s?(?:"seq":\s?(\d+),\s?)?(.*?)(?:,\s?"p":\s?"([0-9a-f]+)")?\}$', re.S)
+# to_json 写出的 v1 事件，seq 在最后
+_EVENT_SEQ_TAIL_PATTERN = re.compile(r'"seq":\s?(\d+)\}$')
+
+
+def match_compact_event(item_str: str):
+    """匹配规范形式的 v2 事件，返回 (type 编码, 中间字段, 路径 id, 序号)，不匹配时返回 None"""
+    matched = _COMPACT_EVENT_PATTERN.match(item_str)
+    if not matched or '"times":' in matched.group(3):
+        # 带 times 的事件被 Lua 合并过，字段顺序不再可靠，交给解码路径处理
+        return None
+    seq = int(matched.group(2)) if matched.group(2) is not None else None
+    return int(matched.group(1)), matched.group(3), matched.group(4), seq
+
+
+def match_event_seq(item_str: str) -> Optional[int]:
+    """不解码地取出 v1 事件的序号"""
+    matched = _EVENT_SEQ_TAIL_PATTERN.search(item_str)
+    return int(matched.group(1)) if matched else None
+
+
+def splice_compact_event(matched, position_path_json: Optional[str]) -> Optional[str]:
+    """不经过解码，直接把规范形式的 v2 事件拼接为 v1 的 JSON 字符串"""
+    code, body, _, seq = matched
+    if code >= len(PROCESS_TYPES):
+        return None
+    seq_piece = f', "seq": {seq}' if seq is not None else ''
+    return (f'{{"type": {json.dumps(PROCESS_TYPES[code])}, "position_list": {position_path_json or "null"}, '
+            f'"times": 0, {body}{seq_piece}}}')
+
+
+def sort_by_seq(items: list, seq_list: List[Optional[int]]) -> list:
+    """按事件序号排序；存在没有序号的旧事件时保持存储顺序"""
+    if not items or any(seq is None for seq in seq_list):
+        return items
+    return [item for _, item in sorted(zip(seq_list, items), key=lambda pair: pair[0])]
+
+
+def event_seq(item_str: str) -> Optional[int]:
+    """取出存储的事件的序号：v1 与规范形式的 v2 不解码，其他形式解码后读取，无效元素返回 None"""
+    matched = match_compact_event(item_str)
+    if matched:
+        return matched[3]
+    if item_str.startswith('{"type"'):
+        return match_event_seq(item_str)
+    try:
+        item = json_codec.loads(item_str)
+    except json_codec.JSONDecodeError:
+        return None
+    return item.get("seq") if isinstance(item, dict) else None
+
+
+def settled_count(seq_list: List[Optional[int]], following_seq_list: List[Optional[int]]) -> int:
+    """
+    分页读取时本页可以返回的条数：取最长的前缀，使其中最大的序号小于之后所有已读到的事件，其余留到下一页。
+    存在没有序号的旧事件、或第一条就无法返回（乱序超出向后查看的范围）时整页返回，保证翻页能够前进
+    """
+    if not following_seq_list or any(seq is None for seq in seq_list) or \
+            any(seq is None for seq in following_seq_list):
+        return len(seq_list)
+    prefix_max = list(itertools.accumulate(seq_list, max))
+    suffix_min = min(following_seq_list)
+    for count in range(len(seq_list), 0, -1):
+        if prefix_max[count - 1] < suffix_min:
+            return count
+        suffix_min = min(suffix_min, seq_list[count - 1])
+    return len(seq_list)
+
+
 class ProcessObject:
 
     def __init__(self, type=RedisProcessTypeEnum.SYSTEM.value, desc="",
@@ -44,6 +249,7 @@ class ProcessObject:
         self.desc = desc
         self.detail: Any = detail
         self.time = get_current_ms()
+        self.seq = next_event_seq()
         self.position_list = position_list
         self.other_info = other_info
 
@@ -53,15 +259,32 @@ class ProcessObject:
     def set_position_list(self, position_list):
         self.position_list = position_list
 
-    def to_json(self):
-        return json.dumps({
+    def to_json(self, position_paths: PositionPathIntern = None):
+        if position_paths is not None and RECORD_EVENT_SCHEMA >= 2:
+            return self.to_compact_json(position_paths)
+        return json_codec.dumps({
             "type": self.type,
             "desc": self.desc,
             "detail": self.detail.to_dict() if self.detail else None,
-            "position_list": self.position_list,
+            "position_list": self.position_list.to_list() if isinstance(self.position_list, PositionPath)
+            else self.position_list,
             "times": 0,
+            "time": self.time,
+            "seq": self.seq
+        })
+
+    def to_compact_json(self, position_paths: PositionPathIntern):
+        compact = {
+            "t": PROCESS_TYPE_CODES.get(self.type, self.type),
+            "seq": self.seq,
+            "desc": self.desc,
+            "detail": self.detail.to_dict() if self.detail else None,
             "time": self.time
-        }, ensure_ascii=False)
+        }
+        path_id = position_paths.intern(self.position_list)
+        if path_id:
+            compact["p"] = path_id
+        return json_codec.dumps(compact)
 
 
 class ExceptionObject(ProcessObject):
@@ -0,0 +1,28 @@
+import base64
+import os
+import zlib
+from typing import Any
+
+# 压缩值的标记前缀。正常的 JSON 文本不会以控制字符开头，读取时据此区分两种形式
+COMPRESSED_PREFIX = "\x1fz:"
+# 超过该长度（字符数）的值才压缩，0 表示关闭压缩
+COMPRESS_THRESHOLD = int(os.getenv("REDIS_COMPRESS_THRESHOLD", 4096))
+COMPRESS_LEVEL = int(os.getenv("REDIS_COMPRESS_LEVEL", 6))
+
+
+def compress_value(value: Any) -> Any:
+    """
+    超过阈值的字符串压缩为 前缀 + base64(zlib)，压缩后反而更大时保留原值。
+    注意：会被 Lua 脚本读取并解析的 key 不能压缩（Lua 中没有 zlib）。
+    """
+    if COMPRESS_THRESHOLD <= 0 or not isinstance(value, str) or len(value) < COMPRESS_THRESHOLD:
+        return value
+    packed = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(value.encode('utf-8'), COMPRESS_LEVEL)).decode('ascii')
+    return packed if len(packed) < len(value) else value
+
+
+def decompress_value(value: Any) -> Any:
+    """两种形式都可以传入，未压缩的值原样返回"""
+    if isinstance(value, str) and value.startswith(COMPRESSED_PREFIX):
+        return zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode('utf-8')
+    return value
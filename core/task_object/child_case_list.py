@@ -2,6 +2,9 @@ from typing import List
 
 
 class ChildCase:
+    __slots__ = ("type", "id", "label", "parent", "temp_variables", "error_strategy", "case_name", "case_id", "start",
+                 "end", "done_step_count", "failed_step_count", "skipped_step_count", "status", "origin_child_steps",
+                 "child_case_prefix", "index", "desc", "index_in_global_list")
 
     def __init__(self, type=None, parent=None, temp_variables=None, error_strategy=None, case_name=None, case_id=None,
                  start=None, end=None, done_step_count=None, failed_step_count=None, skipped_step_count=None,
@@ -28,7 +31,7 @@ class ChildCase:
         self.index_in_global_list = index_in_global_list
 
     def to_dict(self):
-        return self.__dict__
+        return {name: getattr(self, name) for name in self.__slots__}
 
 
 class ChildCaseList:
@@ -0,0 +1,95 @@
+import json
+from typing import Dict, Tuple, Optional, List, Any
+
+from core.task_object.step_mapping import StepMapping
+
+
+class PlanStep:
+    """
+    编译后的步骤：任务开始前一次性生成，在所有子用例、所有轮次之间共享，运行时不修改。
+    执行器只保存状态、结果等动态信息，静态信息都从这里读取。
+    """
+
+    def __init__(self, index: str, metadata: Any, parent: Optional['PlanStep']):
+        # origin_step_mapping 中的键
+        self.index = index
+        self.metadata = metadata
+        # 上级真实步骤（多任务器、用例步骤下的子步骤，上级为多任务器、用例步骤本身），根步骤为 None
+        self.parent = parent
+        # 位于用例步骤内的步骤沿用用例步骤的路径字段与记录 key
+        self.in_case = parent is not None and (parent.in_case or parent.metadata.type == 'case')
+        # 自身或任一上级被禁用时，整棵子树静态地确定为跳过
+        self.disabled = metadata.check == 'none' or (parent is not None and parent.disabled)
+        self.position = {"type": metadata.type, "index": metadata.id, "label": metadata.label}
+        # 非用例内步骤的路径字段
+        self.path_fields = {
+            "step": metadata.id,
+            "step_name": metadata.label,
+            "parent_step": parent.metadata.id if parent else None,
+            "parent_step_name": parent.metadata.label if parent else None,
+        }
+        self.children: Tuple['PlanStep', ...] = ()
+
+
+class CasePlan:
+    """一个用例的步骤表编译结果：按 origin_step_mapping 的键索引的 PlanStep"""
+
+    def __init__(self, mapping: Dict[str, Any]):
+        self.mapping = mapping
+        self.steps: Dict[str, PlanStep] = {}
+        referenced = {child for metadata in mapping.values() for child in (getattr(metadata, 'children', None) or [])}
+        for index in mapping:
+            if index not in referenced:
+                self._compile(index, None)
+
+    def _compile(self, index: str, parent: Optional[PlanStep]) -> PlanStep:
+        plan_step = PlanStep(index, self.mapping[index], parent)
+        self.steps[index] = plan_step
+        plan_step.children = tuple(self._compile(child, plan_step) for child in
+                                   (getattr(plan_step.metadata, 'children', None) or []) if child in self.mapping)
+        return plan_step
+
+    def get(self, index: str) -> Optional[PlanStep]:
+        return self.steps.get(index)
+
+
+class ExecutionPlan:
+    """
+    整个任务的执行计划：由 StepMapping 与 case_steps_snapshot 一次编译得到。
+        cases: 用例索引 -> CasePlan
+        step_status_templates: 用例 id -> 各步骤初始状态的 JSON，所有子用例共用
+    """
+
+    def __init__(self, step_mapping: StepMapping, case_steps_snapshot: Optional[Dict[str, List[dict]]] = None):
+        self.cases: Dict[str, CasePlan] = {name: CasePlan(mapping) for name, mapping in step_mapping.mapping.items()}
+        self.case_steps_snapshot = case_steps_snapshot or {}
+        self._status_templates: Dict[str, List[Tuple[Any, str]]] = {}
+
+    def case(self, case_index: str) -> CasePlan:
+        return self.cases[case_index]
+
+    def step_status_templates(self, case_id) -> List[Tuple[Any, str]]:
+        """用例快照中所有非空步骤的 (id, 初始状态 JSON)，同一用例只序列化一次"""
+        key = str(case_id)
+        templates = self._status_templates.get(key)
+        if templates is None:
+            templates = self._status_templates[key] = []
+            self._flatten(self.case_steps_snapshot.get(key) or [], templates)
+        return templates
+
+    @classmethod
+    def _flatten(cls, step_list: List[dict], templates: List[Tuple[Any, str]]):
+        for step in step_list:
+            if step["type"] == 'empty':
+                continue
+            templates.append((step["id"], json.dumps({
+                "id": step["id"],
+                "type": step["type"],
+                "label": step["label"],
+                "status": 'mid_pending',
+                "result": "mid_unknown",
+                "start": 0,
+                "end": 0
+            }, ensure_ascii=False)))
+            if step.get("children", None):
+                cls._flatten(step["children"], templates)
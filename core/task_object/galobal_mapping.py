@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from collections import deque
-from typing import Union, Self, TYPE_CHECKING, TypeVar, Generic
+from typing import Union, Self, TYPE_CHECKING, TypeVar, Generic, Optional, Tuple, Any
 
 if TYPE_CHECKING:
     from core.executor.core import RunnerExecutor
@@ -12,8 +12,78 @@ else:
 
 from core.record.task_record import TaskRecord
 
+# 会改变祖先索引的节点类型，其余节点直接共用父节点的索引
+SCOPE_NODE_TYPES = ('main_case', 'child_case', 'case', 'child_step_case', 'child_multitasker')
+
+
+class NodeScope:
+    """
+    节点的祖先索引：创建树节点时由父节点的索引一次推导得到，原先沿父链递归的查找都变为 O(1)。
+    只有任务根节点和 SCOPE_NODE_TYPES 中的节点会创建新的索引，其余节点共用父节点的索引。
+
+        task / main_case / child_case / case / child_step_case / child_multitasker:
+            最近的对应类型节点（含自身），case 为用例步骤，child_multitasker 为多任务器的某一轮
+        temp_scope: 最近的携带 temp_variables 的节点（含自身）
+        project_env: 当前位置的 (项目, 环境)，即 Variable._gpe 的结果；用例步骤的环境策略无法确定时为 None
+    """
+    __slots__ = ("task", "main_case", "child_case", "case", "child_step_case", "child_multitasker", "temp_scope",
+                 "project_env")
+
+    def __init__(self, task=None, main_case=None, child_case=None, case=None, child_step_case=None,
+                 child_multitasker=None, temp_scope=None, project_env: Optional[Tuple[Any, Any]] = None):
+        self.task: Optional[MultiwayTreeNode] = task
+        self.main_case: Optional[MultiwayTreeNode] = main_case
+        self.child_case: Optional[MultiwayTreeNode] = child_case
+        self.case: Optional[MultiwayTreeNode] = case
+        self.child_step_case: Optional[MultiwayTreeNode] = child_step_case
+        self.child_multitasker: Optional[MultiwayTreeNode] = child_multitasker
+        self.temp_scope: Optional[MultiwayTreeNode] = temp_scope
+        self.project_env: Optional[Tuple[Any, Any]] = project_env
+
+    @classmethod
+    def derive(cls, node: MultiwayTreeNode) -> NodeScope:
+        if node.parent is None:
+            return cls(task=node)
+        parent_scope = node.parent.scope
+        metadata = getattr(node.node, 'metadata', None)
+        node_type = getattr(metadata, 'type', None)
+        if node_type not in SCOPE_NODE_TYPES:
+            return parent_scope
+        scope = cls(parent_scope.task, parent_scope.main_case, parent_scope.child_case, parent_scope.case,
+                    parent_scope.child_step_case, parent_scope.child_multitasker, parent_scope.temp_scope,
+                    parent_scope.project_env)
+        setattr(scope, node_type, node)
+        if hasattr(metadata, 'temp_variables'):
+            scope.temp_scope = node
+        if node_type == 'main_case':
+            scope.project_env = (metadata.project_id, metadata.env)
+        elif node_type == 'case':
+            if metadata.env_strategy == 'self_case':
+                scope.project_env = (metadata.project_id, metadata.env)
+            elif metadata.env_strategy == 'current_case' and parent_scope.project_env is not None:
+                # 沿用上级的环境，用例步骤自身的项目优先
+                project_id = metadata.project_id if metadata.project_id is not None else parent_scope.project_env[0]
+                scope.project_env = (project_id, parent_scope.project_env[1])
+            else:
+                scope.project_env = None
+        return scope
+
+    def get_project_env(self, project_id=None) -> Tuple[Any, Any]:
+        """当前位置的 (项目, 环境)，project_id 不为空时（接口步骤）优先使用它"""
+        if self.project_env is None:
+            return None, None
+        return project_id if project_id is not None else self.project_env[0], self.project_env[1]
+
+    def search_env(self):
+        """最近的用例步骤使用自身环境时为它的环境，否则为主用例的环境"""
+        if self.case is not None and self.case.node.metadata.env_strategy == 'self_case':
+            return self.case.node.metadata.env
+        return self.main_case.node.metadata.env
+
 
 class MultiwayTreeNode(Generic[T]):
+    __slots__ = ("parent", "node", "children", "interface_last_node", "interface_last_node_result",
+                 "interface_detail_index", "scope")
 
     def __init__(self, parent: Union[MultiwayTreeNode, None] = None, node: RunnerExecutor = None,
                  children: deque[RunnerExecutor] = None):
@@ -23,6 +93,7 @@ class MultiwayTreeNode(Generic[T]):
         self.interface_last_node: Self = None
         self.interface_last_node_result = False
         self.interface_detail_index = None
+        self.scope: NodeScope = NodeScope.derive(self)
 
     def add_child(self, child: Union[RunnerExecutor, TaskRecord]):
         self.children.append(child)
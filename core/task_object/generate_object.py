@@ -10,9 +10,11 @@ import aiofiles
 import aiohttp
 from aiohttp import ClientSession
 
+from core.payload.node_executor.interface_utils.host_limiter import HostLimiterRegistry
 from core.task_object.case_list import CaseList
 from core.task_object.child_case_list import ChildCaseList
 from core.task_object.database_client import DatabaseController
+from core.task_object.execution_plan import ExecutionPlan
 from core.task_object.global_cache import GlobalCache
 from core.task_object.record import Record
 from core.task_object.step_mapping import StepMapping
@@ -107,10 +109,18 @@ class GlobalOption:
         self.record = Record(**record)
         self.main_executor = main_executor
         self.case_steps_snapshot = case_steps_snapshot
+        # 步骤表与用例快照一次编译为执行计划，运行时的执行器只保存动态状态
+        self.plan = ExecutionPlan(self.step_mapping, case_steps_snapshot)
         self.http_session: Union[None, ClientSession] = None
+        # 按服务前缀限制接口请求的并发与速率
+        self.host_limiters = HostLimiterRegistry()
         self.database_controller = DatabaseController()
         self.temp_ast_file_mapping = {}
         self.temp_ast_file_manager = AstTempFileController()
+        # 分片执行时工作进程内的分片协调通道（TaskShard），单进程执行时为 None
+        self.shard = None
+        # 任务的子用例历史耗时（DurationHistory），用于安排并发节点的开始顺序，未启用时为 None
+        self.history = None
 
     def set_session(self, session: ClientSession):
         self.http_session = session
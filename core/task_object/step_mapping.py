@@ -1,23 +1,31 @@
-from typing import Dict, Union, Any
+from typing import Dict, Union
 
 
 class Step:
-    pass
+    """
+    步骤元数据：任务期间会为每个步骤、每个子用例与多任务器的每一轮创建大量实例，
+    所有子类都用 __slots__ 声明字段，不再为每个实例分配 __dict__
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name, None) for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ())}
 
 
 class HasChildStep(Step):
-    pass
+    __slots__ = ()
 
 
 class VirtualNode:
-    pass
+    __slots__ = ()
 
 
-class RealNode(Any):
-    pass
+class RealNode:
+    __slots__ = ()
 
 
 class NormalStep(Step):
+    __slots__ = ("id", "type", "label", "check")
 
     def __init__(self):
         self.id = None
@@ -27,6 +35,9 @@ class NormalStep(Step):
 
 
 class Interface(Step, RealNode):
+    __slots__ = ("type", "id", "label", "check", "is_raise_step", "is_root_step", "should_raise", "raise_code",
+                 "status", "parent", "interface", "project_id")
+
     def __init__(self, type=None, id=None, label=None, check=None, is_raise_step=None, is_root_step=None,
                  should_raise=None, raise_code=None, status=None, parent=None, interface=None, project_id=None):
         self.type = type
@@ -44,6 +55,8 @@ class Interface(Step, RealNode):
 
 
 class Script(Step, RealNode):
+    __slots__ = ("type", "id", "check", "is_raise_step", "is_root_step", "status", "parent", "label", "script")
+
     def __init__(self, type=None, id=None, check=None, is_raise_step=None, is_root_step=None, status=None, parent=None,
                  label=None, script=None):
         self.type = type
@@ -58,6 +71,9 @@ class Script(Step, RealNode):
 
 
 class Group(HasChildStep, RealNode):
+    __slots__ = ("type", "id", "is_raise_step", "is_root_step", "label", "error_strategy", "check", "status", "parent",
+                 "children")
+
     def __init__(self, type=None, id=None, is_raise_step=None, is_root_step=None, label=None, error_strategy=None,
                  check=None, status=None, parent=None, children=None):
         self.type = type
@@ -73,6 +89,9 @@ class Group(HasChildStep, RealNode):
 
 
 class Database(Step, RealNode):
+    __slots__ = ("type", "id", "check", "is_raise_step", "is_root_step", "status", "parent", "label", "params_mode",
+                 "database_id", "sql", "params", "script")
+
     def __init__(self, type=None, id=None, check=None, is_raise_step=None, is_root_step=None, status=None, parent=None,
                  label=None, params_mode=None, database_id=None, sql=None, params=None, script=None):
         self.type = type
@@ -91,6 +110,11 @@ class Database(Step, RealNode):
 
 
 class Case(HasChildStep, RealNode):
+    __slots__ = ("type", "id", "check", "label", "is_raise_step", "is_root_step", "status", "parent", "project_id",
+                 "project_name", "env", "error_strategy", "case_error_strategy", "env_strategy",
+                 "runtime_parameters_strategy", "children", "drive_strategy", "loop_strategy", "times", "dataset",
+                 "load_loop_script")
+
     def __init__(self, type=None, id=None, check=None, label=None, is_raise_step=None, is_root_step=None, status=None,
                  parent=None, project_id=None, project_name=None, env=None, error_strategy=None,
                  case_error_strategy=None, env_strategy=None,
@@ -120,6 +144,9 @@ class Case(HasChildStep, RealNode):
 
 
 class ChildStepCase(HasChildStep, VirtualNode):
+    __slots__ = ("type", "id", "check", "label", "is_raise_step", "is_root_step", "status", "parent", "project_id",
+                 "project_name", "error_strategy", "temp_variables", "children")
+
 
     def __init__(self, type='child_step_case', id=None, check=None, label=None, is_raise_step=None, is_root_step=None,
                  status=None,
@@ -141,6 +168,9 @@ class ChildStepCase(HasChildStep, VirtualNode):
 
 
 class ChildMultitasker(HasChildStep, VirtualNode):
+    __slots__ = ("type", "id", "is_raise_step", "is_root_step", "label", "error_strategy", "check", "status", "parent",
+                 "children", "temp_variables")
+
     def __init__(self, type='child_multitasker', id=None, is_raise_step=None, is_root_step=None, label=None,
                  error_strategy=None, check=None,
                  status=None, parent=None,
@@ -159,6 +189,10 @@ class ChildMultitasker(HasChildStep, VirtualNode):
 
 
 class Multitasker(HasChildStep, RealNode):
+    __slots__ = ("type", "id", "is_raise_step", "is_root_step", "label", "drive_strategy", "loop_strategy",
+                 "error_strategy", "check", "times", "dataset", "delay", "load_loop_script", "delay_interface",
+                 "save_response", "status", "parent", "children")
+
     def __init__(self, type=None, id=None, is_raise_step=None, is_root_step=None, label=None, drive_strategy=None,
                  loop_strategy=None, error_strategy=None, check=None, times=None, dataset=None, delay=None,
                  load_loop_script=None, delay_interface=None, save_response=None, status=None, parent=None,
@@ -184,6 +218,12 @@ class Multitasker(HasChildStep, RealNode):
 
 
 class Assertion(Step, RealNode):
+    __slots__ = ("type", "id", "check", "is_raise_step", "is_root_step", "status", "parent", "label", "key", "value",
+                 "pattern", "script", "assert_mode", "interface_range", "interface_body_pattern",
+                 "interface_code_pattern", "interface_header_pattern", "interface_body_jsonpath",
+                 "interface_body_value", "interface_header_value", "interface_code_value", "interface_header_key",
+                 "interface_body_range", "failed_desc", "success_desc")
+
     def __init__(self, type=None, id=None, check=None, is_raise_step=None, is_root_step=None, status=None, parent=None,
                  label=None, key=None, value=None, pattern=None, script=None, assert_mode=None, interface_range=None,
                  interface_body_pattern=None, interface_code_pattern=None, interface_header_pattern=None,
@@ -218,6 +258,8 @@ class Assertion(Step, RealNode):
 
 
 class Empty(Step, RealNode):
+    __slots__ = ("type", "id", "check", "is_raise_step", "is_root_step", "status", "parent", "label")
+
     def __init__(self, type=None, id=None, check=None, is_raise_step=None, is_root_step=None, status=None, parent=None,
                  label=None):
         self.type = type
@@ -231,6 +273,9 @@ class Empty(Step, RealNode):
 
 
 class Error(Step, RealNode):
+    __slots__ = ("type", "id", "check", "is_raise_step", "is_root_step", "status", "parent", "label", "key", "value",
+                 "pattern", "script", "error_mode")
+
     def __init__(self, type=None, id=None, check=None, is_raise_step=None, is_root_step=None, status=None, parent=None,
                  label=None, key=None, value=None, pattern=None, script=None, error_mode=None):
         self.type = type
@@ -249,6 +294,8 @@ class Error(Step, RealNode):
 
 
 class Delay(Step, RealNode):
+    __slots__ = ("type", "id", "check", "is_raise_step", "is_root_step", "status", "parent", "label", "delay")
+
     def __init__(self, type=None, id=None, check=None, is_raise_step=None, is_root_step=None, status=None, parent=None,
                  label=None, delay=None):
         self.type = type
@@ -263,6 +310,9 @@ class Delay(Step, RealNode):
 
 
 class If(HasChildStep, RealNode):
+    __slots__ = ("type", "id", "is_raise_step", "is_root_step", "label", "error_strategy", "check", "status", "parent",
+                 "key", "value", "pattern", "script", "if_mode", "children")
+
     def __init__(self, type=None, id=None, is_raise_step=None, is_root_step=None, label=None, error_strategy=None,
                  check=None, status=None, parent=None, key=None, value=None, pattern=None, script=None, if_mode=None,
                  children=None):
@@ -323,5 +373,5 @@ class StepMapping:
             step_mapping.items()}
 
     def to_dict(self):
-        return {name: {step_name: step_item.__dict__ for step_name, step_item in item.items()} for
+        return {name: {step_name: step_item.to_dict() for step_name, step_item in item.items()} for
                 name, item in self.mapping.items()}
@@ -0,0 +1,132 @@
+"""
+事件循环的选择与循环延迟采样。
+
+任务进程（以及分片工作进程）通过 run() 启动事件循环，安装了 uvloop 时自动使用 uvloop，
+未安装时回退到标准库 asyncio 的事件循环。
+
+通过环境变量 EVENT_LOOP 选择：auto（默认）| uvloop | asyncio。
+服务进程由 uvicorn 启动，uvicorn 默认的 --loop auto 同样会在安装了 uvloop 时使用它。
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - 可选依赖
+    uvloop = None
+
+LOOP_NAME = "asyncio"
+
+_loop_factory: Callable[[], asyncio.AbstractEventLoop] = asyncio.new_event_loop
+
+
+def use(name: str = "auto") -> str:
+    """切换事件循环实现，返回实际生效的名称"""
+    global _loop_factory, LOOP_NAME
+    if name in ("auto", "uvloop") and uvloop is not None:
+        _loop_factory, LOOP_NAME = uvloop.new_event_loop, "uvloop"
+    else:
+        if name == "uvloop":
+            print("EVENT_LOOP=uvloop，但 uvloop 未安装，已回退到 asyncio 事件循环")
+        _loop_factory, LOOP_NAME = asyncio.new_event_loop, "asyncio"
+    return LOOP_NAME
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    return _loop_factory()
+
+
+def run(main: Coroutine) -> Any:
+    """代替 asyncio.run，在选定的事件循环上运行"""
+    with asyncio.Runner(loop_factory=_loop_factory) as runner:
+        return runner.run(main)
+
+
+class LoopLagMonitor:
+    """
+    循环延迟采样：每隔 interval 秒请求一次唤醒，实际唤醒时间比预期晚多少即为这一刻的循环延迟，
+    反映同步代码（脚本、解析、序列化）阻塞事件循环的程度。
+
+    每隔 report_interval 秒把汇总结果交给 report（如写入 record_info），stop() 时再汇报一次最终结果。
+    汇总结果：loop、samples、mean_ms、p50_ms、p99_ms、max_ms，分位数取最近 window 个样本。
+    """
+
+    def __init__(self, report: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+                 interval: Optional[float] = None, report_interval: Optional[float] = None, window: int = 10000):
+        self.report = report
+        self.interval = interval if interval is not None else float(os.getenv("LOOP_LAG_INTERVAL", 0.1))
+        self.report_interval = report_interval if report_interval is not None else \
+            float(os.getenv("LOOP_LAG_REPORT_INTERVAL", 5))
+        self.recent = deque(maxlen=window)
+        self.samples = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._sample())
+
+    async def stop(self) -> Dict[str, Any]:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        stats = self.stats()
+        await self._report(stats)
+        return stats
+
+    def add(self, lag: float):
+        lag = max(lag, 0.0)
+        self.recent.append(lag)
+        self.samples += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.recent)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000 if ordered else 0.0
+
+        return {
+            "loop": LOOP_NAME,
+            "samples": self.samples,
+            "mean_ms": round(self.total / self.samples * 1000, 3) if self.samples else 0.0,
+            "p50_ms": round(percentile(0.5), 3),
+            "p99_ms": round(percentile(0.99), 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+    async def _report(self, stats: Dict[str, Any]):
+        if self.report is None or not self.samples:
+            return
+        try:
+            await self.report(stats)
+        except Exception as e:
+            # 采样只用于观测，写入失败不影响任务执行
+            print(f"循环延迟写入失败：{e}")
+
+    async def _sample(self):
+        reported_at = time.monotonic()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.add(now - expected)
+            if now - reported_at >= self.report_interval:
+                reported_at = now
+                await self._report(self.stats())
+
+
+use(os.getenv("EVENT_LOOP", "auto"))
@@ -0,0 +1,86 @@
+"""
+统一的 JSON 编解码入口。
+
+热路径（事件记录、请求计时、响应详情、Lua 参数、断言/提取解析）都通过这里编解码，
+安装了 orjson 时自动使用 orjson，未安装或遇到 orjson 不支持的数据时回退到标准库 json。
+
+通过环境变量 JSON_CODEC 选择：auto（默认）| orjson | stdlib。
+"""
+import json
+import os
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+# 与标准库保持一致，调用方继续捕获 json.JSONDecodeError 即可（orjson 的异常是它的子类）
+JSONDecodeError = json.JSONDecodeError
+
+CODEC_NAME = "stdlib"
+
+
+def _stdlib_dumps(obj: Any, ensure_ascii: bool = False, sort_keys: bool = False, indent: Optional[int] = None,
+                  default: Optional[Callable] = None) -> str:
+    return json.dumps(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, indent=indent, default=default)
+
+
+def _stdlib_loads(s):
+    return json.loads(s)
+
+
+def _orjson_dumps(obj: Any, ensure_ascii: bool = False, sort_keys: bool = False, indent: Optional[int] = None,
+                  default: Optional[Callable] = None) -> str:
+    if indent not in (None, 2):
+        return _stdlib_dumps(obj, ensure_ascii, sort_keys, indent, default)
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent == 2:
+        option |= orjson.OPT_INDENT_2
+    try:
+        result = orjson.dumps(obj, default=default, option=option).decode('utf-8')
+    except TypeError:
+        # orjson 不支持的类型（如超过 64 位的整数、自定义对象）交给标准库处理
+        return _stdlib_dumps(obj, ensure_ascii, sort_keys, indent, default)
+    if ensure_ascii and not result.isascii():
+        # orjson 不做 ASCII 转义，需要转义的少数情况回退到标准库，保证输出与原先一致
+        return _stdlib_dumps(obj, ensure_ascii, sort_keys, indent, default)
+    return result
+
+
+def _orjson_loads(s):
+    return orjson.loads(s)
+
+
+_dumps = _stdlib_dumps
+_loads = _stdlib_loads
+
+
+def use(name: str = "auto") -> str:
+    """切换编解码实现，返回实际生效的名称"""
+    global _dumps, _loads, CODEC_NAME
+    if name in ("auto", "orjson") and orjson is not None:
+        _dumps, _loads, CODEC_NAME = _orjson_dumps, _orjson_loads, "orjson"
+    else:
+        if name == "orjson":
+            print("JSON_CODEC=orjson，但 orjson 未安装，已回退到标准库 json")
+        _dumps, _loads, CODEC_NAME = _stdlib_dumps, _stdlib_loads, "stdlib"
+    return CODEC_NAME
+
+
+def dumps(obj: Any, ensure_ascii: bool = False, sort_keys: bool = False, indent: Optional[int] = None,
+          default: Optional[Callable] = None) -> str:
+    """
+    编码为 str。与标准库不同，ensure_ascii 默认为 False（项目中几乎所有调用都显式关闭了它）；
+    orjson 输出不带分隔空格，调用方不能依赖具体的空白格式。
+    """
+    return _dumps(obj, ensure_ascii, sort_keys, indent, default)
+
+
+def loads(s) -> Any:
+    return _loads(s)
+
+
+use(os.getenv("JSON_CODEC", "auto"))
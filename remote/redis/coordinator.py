@@ -0,0 +1,169 @@
+import asyncio
+import json
+import multiprocessing
+import os
+from typing import Dict, Any, List
+
+from core.enums.executor import NodeStatusEnum, RunningModeEnum
+from core.executor.shard import TaskShard, init_coordination, sequential_case_ids, shard_units
+from core.global_client.async_redis import get_async_client
+from core.payload.utils.tools import get_current_ms
+from core.record.utils import configure_event_seq
+from remote.redis.lease_queue import LeaseQueue
+
+# 正在分布式执行的任务（记录索引的集合），工作节点轮询这里领取子用例
+DISTRIBUTED_TASKS_KEY = "distributed:tasks"
+
+
+def distributed_enabled() -> bool:
+    return os.getenv("TASK_DISTRIBUTED", "").lower() in ("1", "true", "yes")
+
+
+def job_key(redis_index: str) -> str:
+    return f"{redis_index}:dist:job"
+
+
+def task_queue(client, redis_index: str) -> LeaseQueue:
+    """一个任务的子用例租约队列，元素为一组子用例的全局序号（逗号分隔，见 work_items）"""
+    return LeaseQueue(client, f"{redis_index}:dist", TaskShard.key(redis_index, "errors"))
+
+
+def work_items(global_options) -> List[List[Any]]:
+    """
+    发布到租约队列的元素，每个元素由一个节点整体领取、按原有顺序执行：
+    顺序执行的任务整体为一个元素，顺序执行的用例的全部子用例为一个元素，并发执行的用例每个子用例为一个元素
+    """
+    child_cases = global_options.child_case_list.list
+    if global_options.task_info.loop_strategy != RunningModeEnum.CONCURRENTLY.value:
+        return [sorted(child_cases, key=lambda item: item.index_in_global_list)] if child_cases else []
+    return shard_units(child_cases, sequential_case_ids(global_options))
+
+
+def item_id(child_cases: List[Any]) -> str:
+    return ",".join(str(child_case.index_in_global_list) for child_case in child_cases)
+
+
+class DistributedTaskExecutor:
+    """
+    分布式执行的协调者（任务进程）：把子用例发布到租约队列，由任意多个工作节点
+    （python -m remote.redis.worker，可以在不同机器上）领取、执行并确认，所有节点写入同一份记录。
+
+    - 节点之间的变量与终止只是最终一致，顺序执行的用例（任务顺序执行时为整个任务）作为一个元素发布，
+      由一个节点按原有顺序执行，只有并发执行的用例的子用例分给不同节点；
+    - 协调者只写任务级的开始、结束记录，用例的开始、结束记录、共享变量与错误策略的终止与分片执行一样通过 TaskShard 协调；
+    - 工作节点失联时租约过期，子用例重新投递给其他节点（DIST_LEASE_MS、DIST_MAX_DELIVERIES）；
+      用例的开始、结束按元素幂等登记，重复执行的子用例不会让用例提前或重复结束；
+      多次失联后放弃的子用例由协调者标记为错误，并代它登记用例的结束；
+    - TASK_DISTRIBUTED_LOCAL_WORKERS 大于 0 时，协调者额外在本机启动这么多个只服务当前任务的工作进程；
+    - 所有节点需要连接同一个记录 Redis，文件由各节点自行缓存；
+      ExecType.DJANGO 的文件只在 Django 主机本地，其他机器上的节点不加入这类任务（见 TaskSession.open）。
+    """
+
+    def __init__(self):
+        self.poll_interval = float(os.getenv("DIST_POLL_INTERVAL", 0.5))
+        self.stall_warning = float(os.getenv("DIST_STALL_WARNING", 60))
+        self.local_workers = int(os.getenv("TASK_DISTRIBUTED_LOCAL_WORKERS", 0))
+
+    async def run(self, global_options, task_record, exec_dict, record):
+        # 延迟导入，避免与 payload 循环导入
+        from core.payload.task_exec import RunTaskExecutor
+        from core.record.child_record.summary import SummaryRecord
+        from remote.redis.worker import run_worker
+
+        redis_index = task_record.redis_index
+        client = get_async_client()[0]
+        queue = task_queue(client, redis_index)
+        items = work_items(global_options)
+
+        seq_epoch = get_current_ms()
+        configure_event_seq(0, seq_epoch)
+        await task_record.cache_info()
+        await init_coordination(redis_index, self._case_parts(items))
+        await client.delete(f"{redis_index}:dist:seq_slots")
+        history = global_options.history
+        if history is not None:
+            # 工作节点按队列顺序领取，预期耗时长的元素先发出；节点数量动态变化，不给出预测值
+            items = history.order_units(items)
+            history.start()
+        await queue.publish([item_id(child_cases) for child_cases in items])
+        job = {"exec": exec_dict, "record": record, "seq_epoch": seq_epoch,
+               "file_mapping": global_options.global_cache.origin_file_mapping}
+        await client.set(job_key(redis_index), json.dumps(job, ensure_ascii=False))
+        await client.sadd(DISTRIBUTED_TASKS_KEY, redis_index)
+        await SummaryRecord(task_record).push_message(
+            [f"任务开始（分布式执行，共 {len(global_options.child_case_list.list)} 个子用例，分为 {len(items)} 个执行单元）"])
+
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=run_worker, args=(redis_index,), name=f"task-worker-{index + 1}",
+                                     daemon=True) for index in range(self.local_workers)]
+        for process in processes:
+            process.start()
+        shard = TaskShard(redis_index, "coordinator")
+        by_item = {item_id(child_cases): child_cases for child_cases in items}
+
+        async def finish_abandoned():
+            await self._finish_abandoned(queue, shard, task_record, by_item)
+
+        try:
+            await self._wait(queue, len(items), finish_abandoned)
+        finally:
+            # 先下线任务，工作节点不再领取，随后关闭各自的任务会话
+            await client.srem(DISTRIBUTED_TASKS_KEY, redis_index)
+            await client.delete(job_key(redis_index))
+        await asyncio.gather(*(asyncio.to_thread(process.join) for process in processes))
+
+        errors = await client.hgetall(TaskShard.key(redis_index, "errors"))
+        await queue.clear()
+        await client.delete(f"{redis_index}:dist:seq_slots", *TaskShard.all_keys(redis_index))
+        if errors:
+            await RunTaskExecutor.end_task(task_record, "；".join(errors[key] for key in sorted(errors)))
+        else:
+            await RunTaskExecutor.end_task(task_record)
+
+    async def _wait(self, queue: LeaseQueue, total: int, finish_abandoned):
+        loop = asyncio.get_running_loop()
+        done, progressed_at = 0, loop.time()
+        while done < total:
+            await asyncio.sleep(self.poll_interval)
+            await queue.requeue_expired()
+            await finish_abandoned()
+            current = await queue.done_count()
+            if current != done:
+                done, progressed_at = current, loop.time()
+            elif loop.time() - progressed_at > self.stall_warning:
+                print(f"分布式任务 {queue.prefix}：{self.stall_warning:.0f}s 内没有执行单元完成（{done}/{total}），"
+                      f"请检查是否有工作节点在运行")
+                progressed_at = loop.time()
+        # 工作节点领取时也会放弃子用例，可能发生在上一次收尾之后
+        await finish_abandoned()
+
+    @classmethod
+    async def _finish_abandoned(cls, queue: LeaseQueue, shard: TaskShard, task_record,
+                                items: Dict[str, List[Any]]):
+        """被放弃的元素没有节点写它的结束记录：其中的子用例标记为错误结束，并代它登记所属用例的开始与结束"""
+        from core.record.child_record.summary import SummaryRecord
+
+        for item in await queue.take_abandoned():
+            child_cases = items.get(item)
+            if child_cases is None:
+                continue
+            cases = {}
+            for child_case in child_cases:
+                await task_record.update_fields_to_list(f"{task_record.redis_index}:child_case_record:child_case_list",
+                                                        child_case.index_in_global_list,
+                                                        status=NodeStatusEnum.ERROR.value, end=get_current_ms())
+                cases.setdefault(child_case.case_id, child_case.case_name)
+            for case_id, case_name in cases.items():
+                if await shard.enter_case(case_id, item):
+                    await SummaryRecord(task_record).push_message([f"开始执行用例:[{case_name}]"])
+                if await shard.leave_case(case_id, item):
+                    await SummaryRecord(task_record).push_message([f"用例:[{case_name}]，出现错误，执行结束"])
+
+    @classmethod
+    def _case_parts(cls, items: List[List[Any]]) -> Dict[str, int]:
+        """每个元素单独领取执行，用例需要等待包含它的子用例的全部元素结束"""
+        case_parts: Dict[str, int] = {}
+        for child_cases in items:
+            for case_id in {str(child_case.case_id) for child_case in child_cases}:
+                case_parts[case_id] = case_parts.get(case_id, 0) + 1
+        return case_parts
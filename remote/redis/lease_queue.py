@@ -0,0 +1,81 @@
+import os
+from typing import List, Optional
+
+from core.lua_script.lua_script_manager import LuaScriptRegistry
+
+
+class LeaseQueue:
+    """
+    基于 Redis 的租约队列：元素被领取后在 lease_ms 毫秒内有效，领取者需要定期续期，完成后确认。
+    领取者失联（进程退出、机器宕机）时租约过期，下一次领取或回收时元素回到队首重新投递；
+    同一元素的租约过期 max_deliveries 次后不再投递，记为完成并写入异常，同时放入 abandoned 等待发布者收尾。
+    租约过期时原领取者可能仍在执行，同一元素可能被执行多次，执行结果需要按元素幂等地登记。
+
+    数据（均在 {prefix}: 下）：pending、leases、owners、expired、done、abandoned，异常写入 errors_key。
+    租约的到期时间以 Redis 服务器的时间为准。
+    """
+
+    def __init__(self, client, prefix: str, errors_key: str, lease_ms: Optional[int] = None,
+                 max_deliveries: Optional[int] = None):
+        self.client = client
+        self.prefix = prefix
+        self.errors_key = errors_key
+        self.lease_ms = lease_ms or int(os.getenv("DIST_LEASE_MS", 30000))
+        self.max_deliveries = max_deliveries or int(os.getenv("DIST_MAX_DELIVERIES", 3))
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    @property
+    def all_keys(self) -> List[str]:
+        return [self.key(name) for name in ("pending", "leases", "owners", "expired", "done", "abandoned")]
+
+    async def publish(self, items: List[str]):
+        """清空上一次的数据并发布全部元素"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(*self.all_keys)
+            if items:
+                pipe.rpush(self.key("pending"), *items)
+            await pipe.execute()
+
+    async def _claim(self, owner: str) -> Optional[str]:
+        keys = [self.key("pending"), self.key("leases"), self.key("owners"), self.key("expired"), self.key("done"),
+                self.errors_key, self.key("abandoned")]
+        return await LuaScriptRegistry.get("lease_claim")(self.client, keys,
+                                                          [self.lease_ms, owner, self.max_deliveries])
+
+    async def claim(self, owner: str) -> Optional[str]:
+        """领取一个元素，没有可领取的元素时返回 None"""
+        return await self._claim(owner)
+
+    async def requeue_expired(self):
+        """只回收过期的租约，由协调者定期调用，保证没有工作节点领取时失联的元素也会被处理"""
+        await self._claim("")
+
+    async def extend(self, item: str, owner: str) -> bool:
+        return bool(await LuaScriptRegistry.get("lease_extend")(
+            self.client, [self.key("leases"), self.key("owners")], [item, owner, self.lease_ms]))
+
+    async def release(self, item: str, owner: str) -> bool:
+        """归还租约，元素立即回到队首由其他领取者执行"""
+        return bool(await LuaScriptRegistry.get("lease_release")(
+            self.client, [self.key("pending"), self.key("leases"), self.key("owners")], [item, owner]))
+
+    async def ack(self, item: str, owner: str) -> bool:
+        """确认完成，租约已经过期并被回收时返回 False（元素会被重新投递）"""
+        return await LuaScriptRegistry.get("lease_ack")(
+            self.client, [self.key("leases"), self.key("owners"), self.key("done")], [item, owner]) >= 0
+
+    async def take_abandoned(self) -> List[str]:
+        """取出放弃执行的元素，每个元素只会被取出一次"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrange(self.key("abandoned"), 0, -1)
+            pipe.delete(self.key("abandoned"))
+            items, _ = await pipe.execute()
+        return items
+
+    async def done_count(self) -> int:
+        return await self.client.scard(self.key("done"))
+
+    async def clear(self):
+        await self.client.delete(*self.all_keys)
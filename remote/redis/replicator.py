@@ -0,0 +1,298 @@
+import asyncio
+import json
+import os
+import socket
+import traceback
+from typing import Dict, List, Optional, Any, Tuple
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from core.lua_script.lua_script_manager import LuaScriptRegistry
+
+# 本地 Redis 中的复制日志（Stream），执行器写记录时在同一个 pipeline 里追加一条
+JOURNAL_KEY = "replication:journal"
+# 只允许一个服务进程运行复制器
+SHIPPER_LEASE_KEY = "replication:shipper"
+
+
+def replication_enabled() -> bool:
+    return bool(os.getenv("RECORD_CENTRAL_REDIS_CONNECTION"))
+
+
+def stream_id(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def version_key(key: str) -> str:
+    """与 AsyncRedisClient.version_key 一致：列表的变更版本号"""
+    return f"{key}:version"
+
+
+class RecordJournal:
+    """
+    复制日志的写入端，只负责往 pipeline 里追加日志条目，不会等待中心存储。
+
+    条目类型：
+        RPUSH  key, values   追加列表元素（按原样重放）
+        SET    key, value    写入字符串
+        HSET   key, mapping  写入哈希字段
+        INCR   key           计数加一（列表的版本号）
+        SYNC   key           key 被 Lua 脚本等原地修改，复制时读取本地的当前值整体覆盖，连同它的版本号
+        DEL    key
+    """
+
+    def __init__(self):
+        self.enabled = replication_enabled()
+        self.maxlen = int(os.getenv("RECORD_REPLICATION_JOURNAL_MAXLEN", 1000000))
+
+    def append(self, pipe, op: str, key: str, data: Any = None, ttl: Optional[int] = None):
+        if not self.enabled:
+            return
+        fields = {"op": op, "key": key}
+        if data is not None:
+            fields["data"] = json.dumps(data, ensure_ascii=False)
+        if ttl is not None:
+            fields["ttl"] = int(ttl)
+        # 中心存储长时间不可用时，限制本地日志的长度，避免撑爆本地 Redis；裁剪掉未复制的条目时由复制器整体重新同步
+        pipe.xadd(JOURNAL_KEY, fields, maxlen=self.maxlen, approximate=True)
+
+
+class RecordReplicator:
+    """
+    记录复制器：在服务进程后台运行，把本地 Redis 的复制日志批量写入中心记录存储。
+
+    - 执行器只写本地 Redis，任务执行永远不会因为中心存储慢或不可用而阻塞；
+    - 已复制到的位置（游标）与数据在同一个 MULTI 事务里写入中心存储，断线重连后从游标继续重放，
+      不会重复追加列表元素；
+    - SYNC 的快照与日志的最新位置在同一个 Lua 脚本里原子读取，快照已经包含该位置之前对这个 key 的全部写入，
+      因此本批与之后批次里该位置之前同一个 key 的条目（RPUSH、INCR 等）不再重放；
+      每个 key 的覆盖位置与游标一起保存在中心存储，重连后同样生效；
+    - 每轮最多复制 batch 条，间隔 interval 秒，日志积压超过 max_lag 时打印告警；
+    - 本地日志保留游标所在的条目，日志的第一条晚于游标说明未复制的条目被 maxlen 裁剪掉了，
+      这时把本地的全部 key 整体覆盖到中心存储（见 _resync），本地已经删除的 key 留在中心存储等待过期。
+    """
+
+    def __init__(self, local_client=None, central_client=None, node: str = None):
+        self.node = node or os.getenv("RECORD_REPLICATION_NODE") or socket.gethostname()
+        self.interval = float(os.getenv("RECORD_REPLICATION_INTERVAL", 0.2))
+        self.batch = int(os.getenv("RECORD_REPLICATION_BATCH", 500))
+        self.max_lag = int(os.getenv("RECORD_REPLICATION_MAX_LAG", 100000))
+        self.lease_ms = int(os.getenv("RECORD_REPLICATION_LEASE_MS", 10000))
+        self.local = local_client
+        self.central = central_client
+        self.owner = f"{self.node}:{os.getpid()}"
+        self.cursor: Optional[str] = None
+        self.covered: Dict[str, str] = {}
+
+    @property
+    def cursor_key(self) -> str:
+        return f"replication:cursor:{self.node}"
+
+    @property
+    def covered_key(self) -> str:
+        """key -> 该 key 最近一次快照覆盖到的日志位置"""
+        return f"replication:covered:{self.node}"
+
+    def _connect(self):
+        if self.local is None:
+            from core.global_client.async_redis import get_async_client
+            self.local = get_async_client()[0]
+        if self.central is None:
+            self.central = aioredis.Redis.from_url(os.getenv("RECORD_CENTRAL_REDIS_CONNECTION"),
+                                                   decode_responses=True)
+
+    async def _hold_lease(self) -> bool:
+        """同一台机器上的多个服务进程只有一个在复制，续期与获取在同一个 Lua 脚本里完成"""
+        return bool(await LuaScriptRegistry.get("lease_hold")(self.local, [SHIPPER_LEASE_KEY],
+                                                              [self.owner, self.lease_ms]))
+
+    async def lag(self) -> int:
+        return await self.local.xlen(JOURNAL_KEY)
+
+    async def _load_cursor(self):
+        if self.cursor is None:
+            async with self.central.pipeline(transaction=True) as pipe:
+                pipe.get(self.cursor_key)
+                pipe.hgetall(self.covered_key)
+                cursor, covered = await pipe.execute()
+            self.cursor = cursor or "0-0"
+            self.covered = covered or {}
+
+    async def _snapshot(self, keys: List[str]) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+        """原子读取若干 key 的当前值，返回 (日志的最新位置, 快照)"""
+        result = await LuaScriptRegistry.get("replication_snapshot")(self.local, [JOURNAL_KEY, *keys], [])
+        snapshots = {}
+        for key, (key_type, ttl, value) in zip(keys, result[1:]):
+            if key_type == 'string':
+                value = value[0]
+            elif key_type == 'hash':
+                value = dict(zip(value[::2], value[1::2]))
+            snapshots[key] = {"type": key_type, "value": value, "ttl": int(ttl)}
+        return result[0], snapshots
+
+    async def _journal_trimmed(self) -> bool:
+        """游标之后的条目是否已经被裁剪（本地日志总是保留游标所在的条目）"""
+        if self.cursor == "0-0":
+            return False
+        first = await self.local.xrange(JOURNAL_KEY, count=1)
+        return bool(first) and stream_id(first[0][0]) > stream_id(self.cursor)
+
+    async def _resync(self):
+        """
+        丢失的日志条目无法重放，把本地的全部 key 按快照整体覆盖到中心存储。
+        游标移到开始覆盖时日志的最新位置，之后的条目照常重放，已被快照包含的条目由覆盖位置跳过。
+        """
+        latest = await self.local.xrevrange(JOURNAL_KEY, count=1)
+        start_id = latest[0][0] if latest else "0-0"
+        print(f"记录复制：游标 {self.cursor} 之后的日志已被裁剪，整体重新同步本地记录")
+        covered = dict(self.covered)
+        keys, synced = [], 0
+        async for key in self.local.scan_iter(count=self.batch):
+            if key == JOURNAL_KEY or key.startswith("replication:"):
+                continue
+            keys.append(key)
+            if len(keys) >= self.batch:
+                synced += await self._resync_keys(keys, covered)
+                keys = []
+        if keys:
+            synced += await self._resync_keys(keys, covered)
+        covered = {key: entry_id for key, entry_id in covered.items() if stream_id(entry_id) > stream_id(start_id)}
+        async with self.central.pipeline(transaction=True) as pipe:
+            pipe.delete(self.covered_key)
+            if covered:
+                pipe.hset(self.covered_key, mapping=covered)
+            pipe.set(self.cursor_key, start_id)
+            await pipe.execute()
+        self.cursor = start_id
+        self.covered = covered
+        await self.local.xtrim(JOURNAL_KEY, minid=start_id)
+        print(f"记录复制：重新同步了 {synced} 个 key")
+
+    async def _resync_keys(self, keys: List[str], covered: Dict[str, str]) -> int:
+        snapshot_id, snapshots = await self._snapshot(keys)
+        synced = 0
+        async with self.central.pipeline(transaction=True) as pipe:
+            for key, snapshot in snapshots.items():
+                # 集合等不复制的类型与已经删除的 key 不处理
+                if snapshot["type"] in ('string', 'list', 'hash'):
+                    self._restore(pipe, key, snapshot)
+                    covered[key] = snapshot_id
+                    synced += 1
+            await pipe.execute()
+        return synced
+
+    async def ship_once(self) -> int:
+        """复制一批日志，返回复制的条数"""
+        await self._load_cursor()
+        if await self._journal_trimmed():
+            await self._resync()
+        entries = await self.local.xrange(JOURNAL_KEY, min=f"({self.cursor}", count=self.batch)
+        if not entries:
+            return 0
+
+        # SYNC 条目只需要每个 key 最新的一份，列表的版本号随列表一起读取
+        sync_keys = {fields["key"] for _, fields in entries if fields.get("op") == "SYNC"}
+        snapshot_keys = sorted(sync_keys | {version_key(key) for key in sync_keys})
+        snapshot_id, snapshots = await self._snapshot(snapshot_keys) if snapshot_keys else ("0-0", {})
+
+        last_id = entries[-1][0]
+        covered = {key: entry_id for key, entry_id in self.covered.items()
+                   if key not in snapshots and stream_id(entry_id) > stream_id(last_id)}
+        covered.update({key: snapshot_id for key in snapshots if stream_id(snapshot_id) > stream_id(last_id)})
+        async with self.central.pipeline(transaction=True) as pipe:
+            for entry_id, fields in entries:
+                key = fields.get("key")
+                if key in snapshots:
+                    continue
+                if key in self.covered and stream_id(entry_id) <= stream_id(self.covered[key]):
+                    # 上一批的快照已经包含了这次写入
+                    continue
+                self._replay(pipe, fields)
+            for key, snapshot in snapshots.items():
+                self._restore(pipe, key, snapshot, companion=key not in sync_keys)
+            pipe.delete(self.covered_key)
+            if covered:
+                pipe.hset(self.covered_key, mapping=covered)
+            pipe.set(self.cursor_key, last_id)
+            await pipe.execute()
+        self.cursor = last_id
+        self.covered = covered
+        # 已复制的日志从本地裁剪掉，保留游标所在的条目用来发现裁剪
+        await self.local.xtrim(JOURNAL_KEY, minid=last_id)
+        return len(entries)
+
+    @staticmethod
+    def _replay(pipe, fields: Dict[str, str]):
+        op, key = fields.get("op"), fields.get("key")
+        data = json.loads(fields["data"]) if "data" in fields else None
+        ttl = int(fields["ttl"]) if "ttl" in fields else None
+        if op == "RPUSH" and data:
+            pipe.rpush(key, *data)
+        elif op == "SET":
+            pipe.set(key, data)
+        elif op == "HSET" and data:
+            pipe.hset(key, mapping=data)
+        elif op == "INCR":
+            pipe.incr(key)
+        elif op == "DEL":
+            pipe.delete(key)
+        if ttl is not None and ttl > 0:
+            pipe.expire(key, ttl)
+
+    @staticmethod
+    def _restore(pipe, key: str, snapshot: Dict[str, Any], companion: bool = False):
+        """用快照整体覆盖中心存储中的 key；本地已不存在时删除，随列表读取的版本号不存在时不处理"""
+        if snapshot["type"] == 'none':
+            if not companion:
+                pipe.delete(key)
+            return
+        pipe.delete(key)
+        if snapshot["type"] == 'string':
+            pipe.set(key, snapshot["value"])
+        elif snapshot["type"] == 'list' and snapshot["value"]:
+            pipe.rpush(key, *snapshot["value"])
+        elif snapshot["type"] == 'hash' and snapshot["value"]:
+            pipe.hset(key, mapping=snapshot["value"])
+        if snapshot["ttl"] > 0:
+            pipe.expire(key, snapshot["ttl"])
+
+    async def drain(self, timeout: float = 5) -> bool:
+        """在限定时间内尽量复制完积压的日志，返回是否已全部复制"""
+        self._connect()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            if await self.ship_once() == 0:
+                return True
+        return False
+
+    async def serve(self):
+        if not replication_enabled():
+            return
+        self._connect()
+        backoff = self.interval
+        while True:
+            try:
+                if await self._hold_lease():
+                    shipped = await self.ship_once()
+                    if shipped == 0:
+                        lag = 0
+                    else:
+                        lag = await self.lag()
+                        if lag > self.max_lag:
+                            print(f"记录复制积压：{lag} 条，超过 {self.max_lag}")
+                    backoff = self.interval
+                    if lag > 0:
+                        # 有积压时不等待，尽快追平
+                        continue
+            except (RedisError, OSError) as e:
+                # 中心存储断开时退避重试，重连后从游标继续重放
+                print(f"记录复制失败，{backoff:.1f}s 后重试：{e}")
+                self.cursor = None
+                backoff = min(backoff * 2, 30)
+            except Exception as e:
+                traceback.print_exc()
+                print(f"记录复制异常：{e}")
+            await asyncio.sleep(backoff)
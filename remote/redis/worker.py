@@ -0,0 +1,218 @@
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import traceback
+from typing import Dict, Optional
+
+from core.enums.executor import ExecType
+from core.executor.runner import MainExecutor, PreActionExecutor, PostActionExecutor
+from core.executor.shard import TaskShard
+from core.global_client.async_redis import get_async_client, close_async_pool
+from core.payload.core import PayloadExecutor
+from core.payload.node_executor.interface_utils.http_client import HttpClient
+from core.record.task_record import TaskRecord
+from core.record.utils import ShardEventSequence, use_event_seq
+from core.task_object.generate_object import generate
+from core.utils import event_loop
+from remote.redis.coordinator import DISTRIBUTED_TASKS_KEY, job_key, task_queue
+from remote.redis.lease_queue import LeaseQueue
+
+
+class TaskRejected(RuntimeError):
+    """当前节点无法执行该任务（如读不到任务文件），不再领取它的元素"""
+
+
+class TaskSession:
+    """
+    工作节点上一个任务的执行环境：同一个任务的子用例复用解析好的任务数据、HTTP 会话与分片协调通道，
+    任务下线（协调者结束任务）后关闭。
+    """
+
+    def __init__(self, redis_index: str, owner: str):
+        self.redis_index = redis_index
+        self.owner = owner
+        self.global_options = None
+        self.task_record: Optional[TaskRecord] = None
+        self.shard: Optional[TaskShard] = None
+        self.sequence: Optional[ShardEventSequence] = None
+        self.child_cases: Dict[str, object] = {}
+        self.own_files = False
+        self._resources = contextlib.AsyncExitStack()
+
+    async def open(self) -> bool:
+        """读取任务数据并准备执行环境，任务已经下线时返回 False"""
+        client = get_async_client()[0]
+        job = await client.get(job_key(self.redis_index))
+        if job is None:
+            return False
+        job = json.loads(job)
+        global_options = generate(job["exec"], job["record"], MainExecutor())
+        global_options.main_executor.exec_type = ExecType(global_options.task_info.rpc_method)
+        # 同一任务的各个节点按加入顺序分配事件序号槽位，槽位 0 为协调者
+        slot = await client.incr(f"{self.redis_index}:dist:seq_slots")
+        self.sequence = ShardEventSequence((slot - 1) % (ShardEventSequence.MAX_SLOTS - 1) + 1, job["seq_epoch"])
+        self.shard = TaskShard(self.redis_index, self.owner)
+        global_options.shard = self.shard
+        self.child_cases = {str(child_case.index_in_global_list): child_case
+                            for child_case in global_options.child_case_list.list}
+        self.global_options = global_options
+        self.task_record = TaskRecord(global_options)
+        session = await self._resources.enter_async_context(HttpClient().get_session())
+        global_options.set_session(session)
+        file_mapping = job.get("file_mapping") or {}
+        if file_mapping and all(os.path.exists(path_dict.get("exec_path") or "") for path_dict in file_mapping.values()):
+            # 与协调者在同一台机器上时直接使用协调者缓存的文件
+            global_options.global_cache.origin_file_mapping = file_mapping
+        else:
+            self._check_file_source(global_options)
+            # 其他机器上的节点各自缓存一份，任务下线后清理
+            await PreActionExecutor().cache_file(global_options)
+            self.own_files = True
+        await self.shard.start(global_options)
+        print(f"工作节点 {self.owner}：加入任务 {self.redis_index}")
+        return True
+
+    @classmethod
+    def _check_file_source(cls, global_options):
+        """ExecType.DJANGO 的文件从 Django 主机的本地路径复制，本机读不到时不加入任务，元素留给 Django 主机上的节点"""
+        if global_options.main_executor.exec_type != ExecType.DJANGO:
+            return
+        missing = [file_name for file_name, path_dict in global_options.global_cache.origin_file_mapping.items()
+                   if not os.path.exists(path_dict.get("local") or "")]
+        if missing:
+            raise TaskRejected(f"任务文件只在 Django 主机本地（{', '.join(missing)}），当前节点无法获取")
+
+    async def run(self, queue: LeaseQueue, item: str):
+        child_cases = [self.child_cases.get(index) for index in item.split(",")]
+        heartbeat = asyncio.create_task(self._heartbeat(queue, item))
+        try:
+            if None in child_cases:
+                raise RuntimeError(f"子用例 {item} 不存在")
+            use_event_seq(self.sequence)
+            # 会话内同一时间只执行一个元素，元素内的子用例按原有顺序执行；
+            # 用例的开始、结束按元素登记，租约过期后被重新执行时不会重复计数
+            self.global_options.child_case_list.list = child_cases
+            self.shard.part = item
+            await PayloadExecutor(self.global_options, self.task_record).run()
+        except Exception as e:
+            traceback.print_exc()
+            await self.shard.report_error(f"工作节点 {self.owner} 执行子用例 {item} 失败：{e}")
+        finally:
+            heartbeat.cancel()
+            # 先把本元素设置的变量写出去，再确认完成
+            await self.shard.sync_once()
+        if not await queue.ack(item, self.owner):
+            print(f"工作节点 {self.owner}：元素 {item} 的租约已过期，将由其他节点重新执行")
+
+    async def _heartbeat(self, queue: LeaseQueue, item: str):
+        interval = queue.lease_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await queue.extend(item, self.owner):
+                    print(f"工作节点 {self.owner}：元素 {item} 的租约已被回收")
+                    return
+            except Exception as e:
+                print(f"工作节点 {self.owner}：续期失败：{e}")
+
+    async def close(self):
+        if self.shard is not None:
+            await self.shard.close()
+        await self._resources.aclose()
+        if self.global_options is not None:
+            await self.global_options.database_controller.close()
+            await self.global_options.temp_ast_file_manager.close()
+            if self.own_files:
+                await PostActionExecutor._clean_temp_file(self.global_options.task_info.id)
+        print(f"工作节点 {self.owner}：退出任务 {self.redis_index}")
+
+
+class DistributedWorker:
+    """
+    分布式执行的工作节点：轮询正在分布式执行的任务，领取元素（一组子用例，见 coordinator.work_items）执行并确认。
+    DIST_WORKER_SLOTS 个执行槽同时工作，每个槽同一时间执行一个元素（子用例内部的并发仍由 MAX_CONCURRENCY 控制）。
+    only_task 不为空时只服务这一个任务，任务下线后退出（协调者在本机启动的工作进程）。
+    """
+
+    def __init__(self, only_task: Optional[str] = None, slots: Optional[int] = None):
+        self.only_task = only_task
+        self.slots = slots or int(os.getenv("DIST_WORKER_SLOTS", 1))
+        self.poll_interval = float(os.getenv("DIST_POLL_INTERVAL", 0.5))
+        self.worker_id = os.getenv("DIST_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+        # 当前节点无法执行的任务
+        self.rejected = set()
+
+    async def serve(self):
+        try:
+            await asyncio.gather(*(self._slot(f"{self.worker_id}:{index + 1}") for index in range(self.slots)))
+        finally:
+            await close_async_pool()
+
+    async def _active_tasks(self):
+        client = get_async_client()[0]
+        if self.only_task is not None:
+            return [self.only_task] if await client.sismember(DISTRIBUTED_TASKS_KEY, self.only_task) else []
+        return sorted(await client.smembers(DISTRIBUTED_TASKS_KEY))
+
+    async def _slot(self, owner: str):
+        sessions: Dict[str, TaskSession] = {}
+        try:
+            while True:
+                active = await self._active_tasks()
+                for redis_index in [redis_index for redis_index in sessions if redis_index not in active]:
+                    await sessions.pop(redis_index).close()
+                self.rejected &= set(active)
+                if self.only_task is not None and not active:
+                    return
+                if not await self._run_one(owner, active, sessions):
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            for session in sessions.values():
+                await session.close()
+
+    async def _run_one(self, owner: str, active, sessions: Dict[str, TaskSession]) -> bool:
+        """从任一任务领取并执行一个元素，没有可领取的元素时返回 False"""
+        client = get_async_client()[0]
+        for redis_index in active:
+            if redis_index in self.rejected:
+                continue
+            queue = task_queue(client, redis_index)
+            item = await queue.claim(owner)
+            if item is None:
+                continue
+            session = sessions.get(redis_index)
+            if session is None:
+                session = TaskSession(redis_index, owner)
+                try:
+                    opened = await session.open()
+                except TaskRejected as e:
+                    print(f"工作节点 {owner}：不加入任务 {redis_index}：{e}")
+                    self.rejected.add(redis_index)
+                    opened = False
+                except Exception as e:
+                    traceback.print_exc()
+                    print(f"工作节点 {owner}：加入任务 {redis_index} 失败：{e}")
+                    opened = False
+                if not opened:
+                    # 归还租约，元素立即由其他节点领取，不计入投递次数
+                    await queue.release(item, owner)
+                    await session.close()
+                    continue
+                sessions[redis_index] = session
+            await session.run(queue, item)
+            return True
+        return False
+
+
+def run_worker(only_task: Optional[str] = None):
+    """工作进程入口"""
+    import dotenv
+    dotenv.load_dotenv()
+    event_loop.run(DistributedWorker(only_task).serve())
+
+
+if __name__ == '__main__':
+    # 在任意节点上启动：python -m remote.redis.worker，本机启动多个即可在本地验证
+    run_worker()
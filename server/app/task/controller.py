@@ -1,4 +1,3 @@
-import asyncio
 import time
 
 import psutil
@@ -6,6 +5,7 @@ import psutil
 from core.global_client.async_redis import close_async_pool
 from core.global_client.sync_redis import close_sync_pool
 from core.inner_entry import run_task
+from core.utils import event_loop
 
 
 class TaskController:
@@ -18,7 +18,8 @@ class TaskController:
             await run_task(request['exec'], request['record'])
             await self._inner_process_done_callback()
 
-        asyncio.run(main_task())
+        # EVENT_LOOP 选择事件循环实现，安装了 uvloop 时默认使用
+        event_loop.run(main_task())
 
     @staticmethod
     async def _inner_process_done_callback():
@@ -1,10 +1,11 @@
 import os
 import uuid
 
-from fastapi import BackgroundTasks, Request
-from core.record.redis_client import AsyncRedisClient
+from fastapi import BackgroundTasks, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from core.record.record_restore import record_restore_flight
 from server.app.task.controller import TaskController, ServerSourceInfo
-from server.app.task.record_controller import RecordController
+from server.app.task.record_controller import RecordController, dumps_with_raw
 from server.routers.task import task_router
 from task_process.monitor import monitor_and_run_task
 
@@ -30,7 +31,7 @@ async def restore_record(request: Request):
     data = await request.json()
     record_backup_index = data['record_backup_index']
     try:
-        AsyncRedisClient.sync_import_from_file(record_backup_index)
+        await run_in_threadpool(record_restore_flight.restore, record_backup_index)
         return {"message": "已恢复"}
     except Exception as e:
         return {"message": f"恢复异常：{e}"}
@@ -51,7 +52,10 @@ class RPCObject:
 @task_router.post('/rpc/record')
 async def rpc_record(request: Request):
     rpc_object = RPCObject(**dict(request.query_params))
-    data = RecordController(rpc_object.name).get_data(record_backup_index=rpc_object.record_backup_index,
-                                                      **await request.json())
+    kwargs = await request.json()
+    # 同步的 redis 读取与文件恢复放到线程池中执行，不阻塞事件循环，并发的恢复由 record_restore_flight 合并
+    data = await run_in_threadpool(RecordController(rpc_object.name).get_data,
+                                   record_backup_index=rpc_object.record_backup_index, **kwargs)
     print(rpc_object.name)
-    return {"data": data}
+    # 记录内容本身已是 JSON 文本，直接拼接为响应体，避免解码后再序列化
+    return Response(content=dumps_with_raw({"data": data}), media_type="application/json")
@@ -1,11 +1,35 @@
 import json
+import os
 from typing import Optional, Tuple, Any, Dict, List
 
 from core.global_client.sync_redis import get_sync_client
+from core.record.record_restore import record_restore_flight
 from core.record.redis_client import AsyncRedisClient
+from core.record.value_codec import decompress_value
+from core.record.utils import is_compact_event, expand_process_event, match_compact_event, splice_compact_event, \
+    match_event_seq, sort_by_seq, event_seq, settled_count
+from core.utils import json_codec
+
+
+class RawJson(str):
+    """已经是 JSON 文本的值，响应时原样拼接，不再解码与重新编码"""
+    pass
+
+
+def dumps_with_raw(obj) -> str:
+    if isinstance(obj, RawJson):
+        return str(obj)
+    if isinstance(obj, dict):
+        return "{" + ", ".join(f"{json.dumps(str(k), ensure_ascii=False)}: {dumps_with_raw(v)}"
+                               for k, v in obj.items()) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ", ".join(dumps_with_raw(item) for item in obj) + "]"
+    return json_codec.dumps(obj)
 
 
 class RecordController:
+    # 分页读取时向后多读的条数，用于判断本页末尾的事件之后是否还有序号更小的事件（写入方并发写入的乱序范围）
+    SEQ_LOOKAHEAD = int(os.getenv("RECORD_SEQ_LOOKAHEAD", 100))
 
     def __init__(self, name):
         self.name = name
@@ -15,8 +39,9 @@ class RecordController:
         return getattr(self, self.name)(**kwargs)
 
     def get_json_list_by_chunk(self, key: str, start_index: int, record_backup_index=None,
-                               extra_key: Optional[str] = None) -> Tuple[
-        List[Dict[str, Any]], int, Optional[Any]]:
+                               extra_key: Optional[str] = None, max_count: Optional[int] = None,
+                               version: Optional[int] = None,
+                               filter_types: Optional[List[str]] = None) -> Tuple:
         """
         从 Redis 列表分批获取 JSON 数据并解析为字典列表。
 
@@ -25,39 +50,102 @@ class RecordController:
             key (str): Redis 列表的键。
             start_index (int): 查询的起始索引。
             extra_key(str):额外的查询
+            max_count(int): 单次最多返回的条数，为空时返回到列表末尾。
+            version(int): 上一次读到列表末尾时拿到的版本号，首次轮询传 0。
+                          版本号未变化时不再读取列表，直接返回空数据。
+            filter_types(list): 只返回这些类型的事件。只有传入过滤条件时才会在服务端解码事件，
+                                否则存储的 JSON 文本直接拼接进响应体。
+
+        事件按序号排序。分页读取时会向后多读 SEQ_LOOKAHEAD 条，后面还有序号更小的事件时本页提前截断，
+        返回的条数可能少于 max_count，下一次查询从截断处继续。
 
         Returns:
-            Tuple[List[Dict[str, Any]], int]: 一个元组, 包含:
-                                              1. 解析后的字典列表。
-                                              2. 下一次查询的新索引。
+            Tuple: 一个元组, 包含:
+                   1. 解析后的字典列表。
+                   2. 下一次查询的新索引。
+                   3. extra_key 的值。
+                   4. 列表的版本号（仅在传入 max_count 或 version 时返回；本页未读到末尾时为 None）。
         """
+        version_key = AsyncRedisClient.version_key(key)
+        with_version = max_count is not None or version is not None
+
+        if version and start_index > 0:
+            # 先只读版本号，没有变化时跳过 LRANGE 与解析
+            pipe = self.client.pipeline()
+            pipe.get(version_key)
+            if extra_key:
+                pipe.get(extra_key)
+            results = pipe.execute()
+            if results[0] is not None and int(results[0]) == int(version):
+                extra_key_value = self._extra_value(results[1]) if extra_key else None
+                return [], start_index, extra_key_value, int(version)
+
+        def _read():
+            # 事务 pipeline，保证版本号与列表内容一致
+            _pipe = self.client.pipeline()
+            _pipe.lrange(key, start_index, start_index + max_count + self.SEQ_LOOKAHEAD - 1 if max_count else -1)
+            _pipe.llen(key)
+            _pipe.get(version_key)
+            if extra_key:
+                _pipe.get(extra_key)
+            return _pipe.execute()
+
         # 因为 decode_responses=True, 这里直接返回 List[str]
-        pipe = self.client.pipeline()
-        pipe.lrange(key, start_index, -1)
-        if extra_key:
-            pipe.get(extra_key)
-        results = pipe.execute()
-        json_strings: List[str] = results[0]
+        results = _read()
+        json_strings: List[str] = self._settled_page(results[0], max_count)
         if len(json_strings) == 0 and start_index == 0:
-            # 尝试从文件恢复
-            AsyncRedisClient.sync_import_from_file(record_backup_index)
+            # 尝试从文件恢复（同一记录的并发恢复会合并为一次）
+            record_restore_flight.restore(record_backup_index)
             # --- 再次尝试查询（同样使用 pipeline）---
-            pipe_retry = self.client.pipeline()
-            pipe_retry.lrange(key, start_index, -1)
-            if extra_key:
-                pipe_retry.get(extra_key)  # 再次查询时也要带上 extra_key
-
-            results = pipe_retry.execute()  # 使用新的结果覆盖旧的
-            json_strings = results[0]
+            results = _read()  # 使用新的结果覆盖旧的
+            json_strings = self._settled_page(results[0], max_count)
         if not json_strings and start_index == 0:
             raise RuntimeError("数据已过期，无法恢复")
 
         # --- 数据处理 ---
         extra_key_value = None
         if extra_key:
-            # 如果提供了 extra_key，那么 results 列表的第二个元素就是它的值
-            extra_key_value = json.loads(results[1])
+            # 如果提供了 extra_key，那么 results 列表的最后一个元素就是它的值
+            extra_key_value = self._extra_value(results[3])
 
+        if filter_types:
+            parsed_data = [item for item in self.parse_process_events(json_strings, record_backup_index)
+                           if item.get("type") in filter_types]
+        else:
+            parsed_data = self.splice_process_events(json_strings, record_backup_index)
+
+        # 注意：next_index 应该基于原始获取的数据量计算，而不是成功解析的数量
+        next_index = start_index + len(json_strings)
+
+        if not with_version:
+            return parsed_data, next_index, extra_key_value
+
+        # 只有读到列表末尾时才返回版本号，否则客户端需要继续翻页
+        current_version = int(results[2]) if results[2] is not None and next_index >= results[1] else None
+        return parsed_data, next_index, extra_key_value, current_version
+
+    @staticmethod
+    def _settled_page(values: List[str], max_count: Optional[int]) -> List[str]:
+        """解压本页的元素，多读的部分只用于判断本页在哪里截断，不返回"""
+        json_strings = [decompress_value(value) for value in values]
+        if not max_count or len(json_strings) <= max_count:
+            return json_strings
+        page, following = json_strings[:max_count], json_strings[max_count:]
+        return page[:settled_count([event_seq(item) for item in page], [event_seq(item) for item in following])]
+
+    @staticmethod
+    def _extra_value(value: Optional[str]):
+        return RawJson(decompress_value(value)) if value is not None else None
+
+    def _position_paths(self, path_ids: List[str], record_backup_index: Optional[str]) -> Dict[str, str]:
+        """批量读取位置路径定义，返回 id -> 路径 JSON 文本"""
+        if not path_ids or not record_backup_index:
+            return {}
+        values = self.client.hmget(f"{record_backup_index}:position_paths", path_ids)
+        return {path_id: value for path_id, value in zip(path_ids, values) if value}
+
+    def parse_process_events(self, json_strings: List[str], record_backup_index: Optional[str]) -> List[
+        Dict[str, Any]]:
         parsed_data: List[Dict[str, Any]] = []
         for item_str in json_strings:
             try:
@@ -65,13 +153,57 @@ class RecordController:
                 parsed_data.append(item_dict)
             except json.JSONDecodeError:
                 continue
+        # 写入方并发写入，列表中的顺序不代表先后顺序，按事件序号排序（跨页的顺序由 _settled_page 保证）
+        parsed_data = sort_by_seq(parsed_data, [item.get("seq") if isinstance(item, dict) else None
+                                                for item in parsed_data])
+        return self.expand_process_events(parsed_data, record_backup_index)
 
-        # 注意：next_index 应该基于原始获取的数据量计算，而不是成功解析的数量
-        next_index = start_index + len(json_strings)
+    def splice_process_events(self, json_strings: List[str], record_backup_index: Optional[str]) -> RawJson:
+        """
+        不重新编码事件，直接把存储的 JSON 文本拼接成响应中的数组。
+        v1 事件原样拼接；规范形式的 v2 事件通过字符串拼接还原为 v1；其余（如被 Lua 合并过的）事件走解码路径。
+        事件只由 ProcessObject.to_json / to_compact_json 与 Lua 脚本写入，拼接路径只按形状判断、不再解码，
+        只有解码路径会丢弃无效元素。拼接结果按事件序号排序。
+        """
+        raw_list = [item_str.startswith('{"type"') and item_str.endswith('}') for item_str in json_strings]
+        matched_list = [None if raw else match_compact_event(item_str)
+                        for item_str, raw in zip(json_strings, raw_list)]
+        path_ids = list({matched[2] for matched in matched_list if matched and matched[2]})
+        position_paths = self._position_paths(path_ids, record_backup_index)
+        pieces: List[Optional[str]] = []
+        seq_list: List[Optional[int]] = []
+        fallback: Dict[int, Dict[str, Any]] = {}
+        for item_str, raw, matched in zip(json_strings, raw_list, matched_list):
+            if raw:
+                spliced, seq = item_str, match_event_seq(item_str)
+            elif matched:
+                spliced, seq = splice_compact_event(matched, position_paths.get(matched[2])), matched[3]
+            else:
+                spliced, seq = None, None
+            if spliced is None:
+                try:
+                    fallback[len(pieces)] = json.loads(item_str)
+                except json.JSONDecodeError:
+                    # 与原先的解析行为保持一致，丢弃无效元素
+                    continue
+            pieces.append(spliced)
+            seq_list.append(seq)
+        if fallback:
+            expanded = self.expand_process_events(list(fallback.values()), record_backup_index)
+            for i, item in zip(fallback.keys(), expanded):
+                pieces[i] = json.dumps(item, ensure_ascii=False)
+                seq_list[i] = item.get("seq") if isinstance(item, dict) else None
+        return RawJson("[" + ", ".join(sort_by_seq(pieces, seq_list)) + "]")
 
-        return parsed_data, next_index, extra_key_value
+    def expand_process_events(self, items: List[Dict[str, Any]], record_backup_index: Optional[str]) -> List[
+        Dict[str, Any]]:
+        """把 v2 紧凑事件还原为完整格式，位置路径从记录的驻留哈希中批量读取"""
+        path_ids = list({item["p"] for item in items if is_compact_event(item) and item.get("p")})
+        position_paths = {path_id: json.loads(value) for path_id, value in
+                          self._position_paths(path_ids, record_backup_index).items()}
+        return [expand_process_event(item, position_paths) for item in items]
 
-    def get_json_from_redis(self, key: str, record_backup_index: Any) -> Dict[str, Any]:
+    def get_json_from_redis(self, key: str, record_backup_index: Any) -> RawJson:
         """
         从 Redis 查询一个 JSON 数据，如果 key 不存在，则尝试从备份恢复并重新查询。
 
@@ -80,26 +212,22 @@ class RecordController:
             record_backup_index (Any): 传递给恢复函数所需的备份索引。
 
         Returns:
-            Dict[str, Any]: 从 Redis 获取并解析后的 Python 字典。
+            RawJson: 从 Redis 获取的 JSON 文本，响应时原样输出。
 
         Raises:
             RuntimeError: 如果初次查询和恢复后再次查询均失败。
-            ValueError: 如果从 Redis 获取到的内容不是有效的 JSON 格式。
         """
         content = self.client.get(key)
 
         if content is None:
-            AsyncRedisClient.sync_import_from_file(record_backup_index)
+            record_restore_flight.restore(record_backup_index)
             content = self.client.get(key)
 
         if content is None:
             raise RuntimeError("数据已过期，无法恢复")
 
-        try:
-            data_dict = json.loads(content)
-            return data_dict
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"从 key '{key}' 获取的内容无法被解析为 JSON。错误: {e}")
+        # 存储的内容本身就是 JSON，原样拼接进响应体
+        return RawJson(decompress_value(content))
 
     def get_redis_details_batch(self,
                                 record_backup_index: str,
@@ -130,13 +258,13 @@ class RecordController:
 
         # 3. 检查是否有查询失败的 key (值为 None)
         if None in values:
-            AsyncRedisClient.sync_import_from_file(record_backup_index)
+            record_restore_flight.restore(record_backup_index)
             # 再次尝试读取
             values = self.client.mget(full_keys)
         if None in values:
             raise RuntimeError("数据已过期，无法恢复")
 
-        # 4. 如果所有 key 都成功查到，将子索引和查询到的值组合成一个字典
-        result_dict = dict(zip(child_indices, values))
+        # 4. 如果所有 key 都成功查到，将子索引和查询到的值组合成一个字典（压缩过的值解压后返回）
+        result_dict = dict(zip(child_indices, [decompress_value(value) for value in values]))
 
         return result_dict
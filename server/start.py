@@ -1,8 +1,12 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 
-from core.lua_script.lua_script_manager import LuaScriptManager
+from core.record.backup_store import RecordBackupRetention
+from remote.redis.replicator import RecordReplicator
 from server.routers import task
 import dotenv
 
@@ -10,11 +14,26 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 def pre_load(BASE_DIR):
+    # Lua 脚本由 LuaScriptRegistry 在首次使用时懒加载，启动阶段不再同步访问 Redis
     dotenv.load_dotenv()
-    LuaScriptManager.initialize(BASE_DIR)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 备份目录的保留策略在服务进程后台增量执行
+    retention_task = asyncio.create_task(RecordBackupRetention().serve())
+    # 配置了 RECORD_CENTRAL_REDIS_CONNECTION 时，把本地记录异步复制到中心存储
+    replication_task = asyncio.create_task(RecordReplicator().serve())
+    yield
+    for background_task in (retention_task, replication_task):
+        background_task.cancel()
+    # 等待后台任务真正结束后再退出，避免事件循环关闭时还有未完成的任务
+    await asyncio.gather(retention_task, replication_task, return_exceptions=True)
 
 
 pre_load(BASE_DIR)
-app = FastAPI(title="AsyncExecutor")
+app = FastAPI(title="AsyncExecutor", lifespan=lifespan)
+# 记录轮询的响应体较大，压缩后传输
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("RESPONSE_GZIP_MIN_SIZE", 1024)))
 
 app.include_router(task.task_router)
@@ -9,6 +9,31 @@ import psutil
 from task_process.runner import task_wrapper
 
 
+def children_rss(p_info) -> int:
+    total = 0
+    for child in p_info.children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            continue
+    return total
+
+
+def kill_children(p_info):
+    """强制结束任务进程前先结束它启动的分片工作进程，避免遗留孤儿进程"""
+    if p_info is None:
+        return
+    try:
+        children = p_info.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return
+    for child in children:
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            continue
+
+
 def monitor_and_run_task(
         task_id,
         target_func,
@@ -19,6 +44,7 @@ def monitor_and_run_task(
         负责启动并监控一个运行目标任务的子进程。
     """
     process = None
+    p_info = None
     peak_memory_usage = 0.0
     start_time = time.time()
     try:
@@ -46,9 +72,9 @@ def monitor_and_run_task(
             print(f"进程 [监控器 线程 {os.getpid()}] 无法获取进程 {pid} 的句柄。")
 
         while p_info and process.is_alive():
-            # 检查内存
+            # 检查内存（任务分片执行时包含各分片工作进程）
             try:
-                memory_usage = p_info.memory_info().rss
+                memory_usage = p_info.memory_info().rss + children_rss(p_info)
                 peak_memory_usage = max(peak_memory_usage, memory_usage)
                 if memory_usage > (int(os.getenv('MULTI_PROCESS_MEMORY_LIMIT')) * 1024 * 1024):
                     print(
@@ -64,12 +90,14 @@ def monitor_and_run_task(
         process.join(timeout=int(os.getenv('WAITING_MULTI_PROCESS_TIME')))
         if process.is_alive():
             print(f"进程 [监控器] 进程 {pid} 未能优雅退出，强制 kill。")
+            kill_children(p_info)
             process.kill()
 
     except Exception as e:
         traceback.print_exc()
         print(f"进程 [监控器] 监控任务 {task_id} 时发生未知错误: {e}")
         if process and process.is_alive():
+            kill_children(p_info)
             process.kill()
     finally:
         print(f"进程 [监控器 线程 {os.getpid()}] 完成监控任务 {task_id}")
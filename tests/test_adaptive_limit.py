@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from core.controller.adaptive_limit import AdaptiveConcurrency, AdaptiveSemaphore
+
+
+def acquire(semaphore, count):
+    async def main():
+        for _ in range(count):
+            await semaphore.acquire()
+
+    asyncio.run(main())
+
+
+def test_shrinking_takes_idle_permits_first():
+    semaphore = AdaptiveSemaphore(10)
+    acquire(semaphore, 3)
+    semaphore.set_limit(5)
+    assert (semaphore._value, semaphore._debt, semaphore.in_use) == (2, 0, 3)
+
+
+def test_shrinking_below_in_use_is_repaid_by_releases():
+    semaphore = AdaptiveSemaphore(10)
+    acquire(semaphore, 8)
+    semaphore.set_limit(4)
+    assert (semaphore._value, semaphore._debt, semaphore.in_use) == (0, 4, 8)
+    # 正在执行的节点不受影响，归还的名额先抵扣欠额
+    for in_use in (7, 6, 5, 4):
+        semaphore.release()
+        assert semaphore._value == 0 and semaphore.in_use == in_use
+    semaphore.release()
+    assert (semaphore._value, semaphore._debt, semaphore.in_use) == (1, 0, 3)
+    for _ in range(3):
+        semaphore.release()
+    assert (semaphore._value, semaphore.in_use) == (4, 0)
+
+
+def test_growing_repays_debt_before_adding_permits():
+    semaphore = AdaptiveSemaphore(10)
+    acquire(semaphore, 8)
+    semaphore.set_limit(4)
+    semaphore.set_limit(7)
+    assert (semaphore._value, semaphore._debt, semaphore.in_use) == (0, 1, 8)
+    semaphore.set_limit(9)
+    assert (semaphore._value, semaphore._debt, semaphore.in_use) == (1, 0, 8)
+    for _ in range(8):
+        semaphore.release()
+    assert semaphore._value == 9
+
+
+def test_growing_wakes_waiters():
+    async def main():
+        semaphore = AdaptiveSemaphore(1)
+        await semaphore.acquire()
+        waiters = [asyncio.create_task(semaphore.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert not any(waiter.done() for waiter in waiters)
+        semaphore.set_limit(3)
+        await asyncio.wait_for(asyncio.gather(*waiters), 1)
+        assert semaphore.in_use == 3 and semaphore.locked()
+
+    asyncio.run(main())
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setenv("ADAPTIVE_MIN_CONCURRENCY", "2")
+    monkeypatch.setenv("ADAPTIVE_MIN_SAMPLES", "10")
+    monkeypatch.setenv("ADAPTIVE_ERROR_RATE", "0.1")
+    monkeypatch.setenv("ADAPTIVE_LATENCY_TOLERANCE", "2")
+    monkeypatch.setenv("ADAPTIVE_DECREASE", "0.5")
+    return AdaptiveConcurrency(AdaptiveSemaphore(10), maximum=12)
+
+
+def observe(controller, latencies, errors=0):
+    for latency in latencies:
+        controller.observe(latency)
+    for _ in range(errors):
+        controller.observe(0, error=True)
+
+
+def test_waits_for_enough_samples(controller):
+    observe(controller, [10] * 5, errors=4)
+    assert not controller.adjust()
+    # 样本继续累积到下一个窗口
+    observe(controller, [10])
+    assert controller.adjust()
+    assert controller.limit == 5
+
+
+def test_errors_decrease_multiplicatively(controller):
+    observe(controller, [10] * 8, errors=2)
+    assert controller.adjust()
+    assert controller.limit == 5
+    assert controller.history[-1]["reason"] == "errors"
+    assert controller.history[-1]["error_rate"] == 0.2
+
+
+def test_latency_above_baseline_decreases(controller):
+    observe(controller, [10] * 10)
+    assert not controller.adjust()
+    assert controller.baseline_ms == 10
+    observe(controller, [10] * 5 + [50] * 5)
+    assert controller.adjust()
+    assert controller.limit == 5 and controller.history[-1]["reason"] == "latency"
+    # 基线只缓慢靠近更高的 p50
+    assert controller.baseline_ms == pytest.approx(14)
+
+
+def test_increases_only_when_saturated(controller):
+    observe(controller, [10] * 10)
+    assert not controller.adjust()
+    acquire(controller.semaphore, 10)
+    observe(controller, [10] * 10)
+    assert controller.adjust()
+    assert controller.limit == 11 and controller.history[-1]["reason"] == "increase"
+
+
+def test_limit_stays_within_bounds(controller):
+    for _ in range(5):
+        observe(controller, [], errors=10)
+        controller.adjust()
+    assert controller.limit == 2
+    assert not controller.adjust()
+    controller.semaphore.set_limit(12)
+    acquire(controller.semaphore, 12)
+    observe(controller, [10] * 10)
+    assert not controller.adjust()
+    assert controller.limit == 12
@@ -0,0 +1,209 @@
+import asyncio
+import contextlib
+from collections import deque
+
+import pytest
+
+from core.controller.async_task_runner import TaskRunner, LazyExecutors
+
+
+class FakeExecutor:
+    """测试用执行器：叶子节点等待 io 秒后返回 value，error 不为空时抛出；有子节点时并发执行子节点"""
+
+    def __init__(self, context, value=None, io=0.0, error=None, children=None, limit=None, log=None):
+        self.context = context
+        self.value = value
+        self.io = io
+        self.error = error
+        self.children = children
+        self.limit = limit
+        self.log = log if log is not None else []
+        self.is_container = children is not None
+
+    async def before_callback(self):
+        return None
+
+    async def run(self, *args):
+        if self.children is not None:
+            return await self.context.run_concurrently(self.children, self.limit)
+        await asyncio.sleep(self.io)
+        self.log.append(self.value)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    async def after_callback(self, result=None, *args):
+        pass
+
+    async def skipped_callback(self, *args):
+        pass
+
+    async def error_callback(self, e, *args):
+        raise e
+
+
+@pytest.mark.parametrize("scheduler", ["pool", "task"])
+def test_results_keep_submission_order(scheduler):
+    async def main():
+        runner = TaskRunner(4, scheduler)
+        children = deque(FakeExecutor(runner.context, value=index, io=(5 - index) / 1000) for index in range(5))
+        assert await runner.context.run_concurrently(children) == [0, 1, 2, 3, 4]
+        await runner.wait_for_dynamic_tasks()
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("scheduler", ["pool", "task"])
+@pytest.mark.parametrize("limit", [None, 1, 2])
+@pytest.mark.parametrize("failing", [0, 2])
+def test_every_executor_runs_after_one_fails(scheduler, limit, failing):
+    async def main():
+        runner = TaskRunner(10, scheduler)
+        log = []
+        children = deque(FakeExecutor(runner.context, value=index, io=0.001, log=log,
+                                      error=ValueError(index) if index == failing else None)
+                         for index in range(6))
+        with pytest.raises(ValueError):
+            await runner.context.run_concurrently(children, limit)
+        # 与 gather 一致：等待方收到异常，其余执行器照常执行完（每个节点一个 Task 时，异常还会由 tracker 再抛出一次）
+        with contextlib.suppress(ValueError):
+            await runner.wait_for_dynamic_tasks()
+        assert sorted(log) == list(range(6))
+
+    asyncio.run(main())
+
+
+def test_group_limit_is_respected():
+    async def main():
+        runner = TaskRunner(10)
+        running, peak = 0, 0
+
+        class Counted(FakeExecutor):
+            async def run(self, *args):
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                try:
+                    return await super().run(*args)
+                finally:
+                    running -= 1
+
+        children = deque(Counted(runner.context, value=index, io=0.002) for index in range(12))
+        await runner.context.run_concurrently(children, 3)
+        assert peak == 3
+
+    asyncio.run(main())
+
+
+def test_nested_groups_do_not_starve_with_few_workers(monkeypatch):
+    monkeypatch.setenv("SCHEDULER_WORKERS", "2")
+
+    async def main():
+        runner = TaskRunner(2)
+        context = runner.context
+        root = FakeExecutor(context, children=deque(
+            FakeExecutor(context, children=deque(FakeExecutor(context, value=(case, step), io=0.001)
+                                                 for step in range(4)))
+            for case in range(5)))
+        results = await asyncio.wait_for(context.run_concurrently(deque([root])), 5)
+        assert results == [[[(case, step) for step in range(4)] for case in range(5)]]
+
+    asyncio.run(main())
+
+
+class Window:
+    """记录按需创建的执行器中同时存在（已创建、未结束）的最大个数"""
+
+    def __init__(self):
+        self.created = 0
+        self.finished = 0
+        self.peak = 0
+
+    def executors(self, context, count, error_at=None):
+        window = self
+
+        class Tracked(FakeExecutor):
+            async def run(self, *args):
+                try:
+                    return await super().run(*args)
+                finally:
+                    window.finished += 1
+
+        for index in range(count):
+            self.created += 1
+            self.peak = max(self.peak, self.created - self.finished)
+            yield Tracked(context, value=index, io=0.001, log=[],
+                          error=ValueError(index) if index == error_at else None)
+
+    async def async_executors(self, context, count):
+        for executor in self.executors(context, count):
+            await asyncio.sleep(0)
+            yield executor
+
+
+@pytest.mark.parametrize("scheduler", ["pool", "task"])
+@pytest.mark.parametrize("window_size,limit,expected", [(4, None, 4), (None, 3, 3), (5, 2, 5), (1, None, 1)])
+def test_lazy_executors_stay_within_the_window(scheduler, window_size, limit, expected):
+    async def main():
+        runner = TaskRunner(100, scheduler)
+        window = Window()
+        lazy = LazyExecutors(window.executors(runner.context, 40), window_size)
+        assert await runner.context.run_concurrently(lazy, limit) is None
+        await runner.wait_for_dynamic_tasks()
+        assert window.created == window.finished == 40
+        assert window.peak == expected
+
+    asyncio.run(main())
+
+
+def test_lazy_window_defaults(monkeypatch):
+    async def main(expected):
+        runner = TaskRunner(6)
+        window = Window()
+        await runner.context.run_concurrently(LazyExecutors(window.executors(runner.context, 30)))
+        assert window.peak == expected
+
+    # 未指定窗口与组的并发上限时为 CHILD_EXECUTOR_WINDOW，再退回到工作协程数
+    asyncio.run(main(6))
+    monkeypatch.setenv("CHILD_EXECUTOR_WINDOW", "2")
+    asyncio.run(main(2))
+
+
+@pytest.mark.parametrize("scheduler", ["pool", "task"])
+def test_lazy_executors_from_an_async_source(scheduler):
+    async def main():
+        runner = TaskRunner(10, scheduler)
+        window = Window()
+        await runner.context.run_concurrently(LazyExecutors(window.async_executors(runner.context, 25), 3))
+        assert window.finished == 25 and window.peak <= 3
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("scheduler", ["pool", "task"])
+def test_lazy_executors_stop_creating_after_an_error(scheduler):
+    async def main():
+        runner = TaskRunner(10, scheduler)
+        window = Window()
+        with pytest.raises(ValueError):
+            await runner.context.run_concurrently(LazyExecutors(window.executors(runner.context, 50, error_at=3), 2))
+        with contextlib.suppress(ValueError):
+            await runner.wait_for_dynamic_tasks()
+        # 已创建的执行器照常执行完，之后不再创建新的执行器
+        assert window.created == window.finished < 50
+
+    asyncio.run(main())
+
+
+def test_lazy_source_error_is_raised_to_the_waiter():
+    def broken(context):
+        yield FakeExecutor(context, value=0)
+        raise RuntimeError("数据集读取失败")
+
+    async def main():
+        runner = TaskRunner(10)
+        with pytest.raises(RuntimeError):
+            await runner.context.run_concurrently(LazyExecutors(broken(runner.context), 2))
+        await runner.wait_for_dynamic_tasks()
+
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from core.record.backup_store import RecordBackupStore, RecordBackupRetention
+
+
+def write_backup(store, key_prefix, legacy=False):
+    path = store.legacy_filepath(key_prefix) if legacy else store.filepath(key_prefix)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"key": key_prefix}))
+    if not legacy:
+        store.register(key_prefix)
+    return path
+
+
+def test_prune_group_removes_migrated_and_sharded_backups(tmp_path):
+    store = RecordBackupStore(tmp_path)
+    write_backup(store, "task_1:record:1", legacy=True)
+    write_backup(store, "task_1:record:2", legacy=True)
+    write_backup(store, "task_2:record:1", legacy=True)
+    write_backup(store, "task_1:record:3")
+    write_backup(store, "task_1:record:4")
+    assert store.migrate_legacy(batch=0) == 3
+
+    store.prune_group("task_1:record:4", ["task_1:record:2", "task_1:record:4"])
+    assert store.resolve("task_1:record:1") is None and store.resolve("task_1:record:3") is None
+    assert all(store.resolve(key) is not None for key in ("task_1:record:2", "task_1:record:4", "task_2:record:1"))
+
+
+def test_prune_group_does_not_scan_the_legacy_directory(tmp_path, monkeypatch):
+    store = RecordBackupStore(tmp_path)
+    paths = [write_backup(store, f"task_1:record:{index}", legacy=True) for index in range(4)]
+    assert store.migrate_legacy(batch=2) == 2
+    legacy = sorted(path.name for path in tmp_path.glob("task_1_record_*.json"))
+
+    def scan():
+        raise AssertionError("任务结束时不应扫描平铺目录")
+
+    monkeypatch.setattr(store, "_legacy_entries", scan)
+    store.prune_group("task_1:record:3", ["task_1:record:3"])
+    monkeypatch.undo()
+    # 只清理已经迁移进分片的备份，没有迁移的留到下一次
+    assert sorted(path.name for path in tmp_path.glob("task_1_record_*.json")) == legacy
+    assert len(list(tmp_path.rglob("task_1_record_*.json"))) == 3 - (paths[3].name in legacy)
+    assert store.migrate_legacy(batch=0) == 2
+    store.prune_group("task_1:record:3", ["task_1:record:3"])
+    remaining = sorted(path.name for path in tmp_path.rglob("task_1_record_*.json"))
+    assert remaining == [paths[3].name]
+    assert store.resolve("task_1:record:3") is not None
+
+
+@pytest.mark.parametrize("migration_slice", [0, 1e-9])
+def test_retention_migrates_everything_at_startup(tmp_path, migration_slice):
+    store = RecordBackupStore(tmp_path)
+    for index in range(5):
+        write_backup(store, f"task_{index}:record:1", legacy=True)
+    retention = RecordBackupRetention(store)
+    retention.migration_slice = migration_slice
+    asyncio.run(retention.migrate_legacy())
+    assert store._read_index().get("legacy_migrated")
+    assert not list(tmp_path.glob("task_*.json"))
+    assert all(store.resolve(f"task_{index}:record:1") is not None for index in range(5))
+
+
+def test_migration_finishes_and_stops_scanning(tmp_path):
+    store = RecordBackupStore(tmp_path)
+    write_backup(store, "task_1:record:1", legacy=True)
+    write_backup(store, "task_1:record:2", legacy=True)
+    assert store.migrate_legacy(batch=1) == 1
+    assert not store._read_index().get("legacy_migrated")
+    assert store.migrate_legacy(batch=10) == 1
+    assert store._read_index().get("legacy_migrated")
+    assert store.migrate_legacy(batch=10) == 0
+    assert all(store.resolve(f"task_1:record:{index}").parent.name != tmp_path.name for index in (1, 2))
@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.utils import event_loop
+from core.utils.event_loop import LoopLagMonitor
+
+
+@pytest.fixture
+def restore_loop(monkeypatch):
+    # use() 修改模块级的选择，测试结束后还原
+    monkeypatch.setattr(event_loop, "_loop_factory", event_loop._loop_factory)
+    monkeypatch.setattr(event_loop, "LOOP_NAME", event_loop.LOOP_NAME)
+
+
+def test_stats_percentiles():
+    monitor = LoopLagMonitor(interval=1)
+    for ms in range(100, 0, -1):
+        monitor.add(ms / 1000)
+    monitor.add(-0.5)
+    stats = monitor.stats()
+    assert stats["samples"] == 101
+    assert (stats["p50_ms"], stats["p99_ms"], stats["max_ms"]) == (50.0, 99.0, 100.0)
+    assert stats["mean_ms"] == round(5050 / 101, 3)
+
+
+def test_stats_percentiles_use_the_recent_window():
+    monitor = LoopLagMonitor(interval=1, window=2)
+    for ms in (100, 1, 2):
+        monitor.add(ms / 1000)
+    stats = monitor.stats()
+    assert (stats["samples"], stats["p50_ms"], stats["p99_ms"], stats["max_ms"]) == (3, 2.0, 2.0, 100.0)
+
+
+def test_stats_without_samples():
+    assert LoopLagMonitor(interval=1).stats() == {"loop": event_loop.LOOP_NAME, "samples": 0, "mean_ms": 0.0,
+                                                  "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+
+def test_use_falls_back_to_asyncio_without_uvloop(restore_loop, monkeypatch):
+    monkeypatch.setattr(event_loop, "uvloop", None)
+    assert event_loop.use("uvloop") == "asyncio" and event_loop.use("auto") == "asyncio"
+    assert event_loop._loop_factory is asyncio.new_event_loop
+    assert event_loop.run(asyncio.sleep(0, result="done")) == "done"
+
+
+def test_use_prefers_uvloop_when_installed(restore_loop, monkeypatch):
+    fake_uvloop = SimpleNamespace(new_event_loop=asyncio.new_event_loop)
+    monkeypatch.setattr(event_loop, "uvloop", fake_uvloop)
+    assert event_loop.use("auto") == "uvloop" and event_loop.LOOP_NAME == "uvloop"
+    assert event_loop.use("asyncio") == "asyncio"
+
+
+def test_stop_reports_the_final_stats():
+    reports = []
+
+    async def report(stats):
+        reports.append(stats)
+
+    async def main():
+        monitor = LoopLagMonitor(report, interval=0.001, report_interval=3600)
+        monitor.start()
+        while monitor.samples < 3:
+            await asyncio.sleep(0.001)
+        return await monitor.stop()
+
+    stats = asyncio.run(main())
+    assert reports == [stats] and stats["samples"] >= 3
+
+
+def test_stop_without_samples_does_not_report():
+    async def report(stats):
+        raise AssertionError("没有样本时不汇报")
+
+    monitor = LoopLagMonitor(report, interval=0)
+    monitor.start()
+    assert asyncio.run(monitor.stop())["samples"] == 0
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from core.payload import step_exec
+from core.payload.step_exec import RunStepExecutor
+from core.payload.utils.tools import StaticPathIndex
+from core.task_object.execution_plan import ExecutionPlan
+from core.task_object.galobal_mapping import MultiwayTreeNode
+from core.task_object.step_mapping import StepMapping
+
+
+def step(type, id, check="all", children=None, **kwargs):
+    item = {"type": type, "id": id, "label": f"{type}-{id}", "check": check, **kwargs}
+    if children is not None:
+        item["children"] = children
+    return item
+
+
+STEPS = {
+    "1": step("group", 1, children=["2", "3"]),
+    "2": step("interface", 2),
+    "3": step("multitasker", 3, check="none", children=["4", "5"], times=5),
+    "4": step("interface", 4),
+    "5": step("case", 5, children=["6"], times=3),
+    "6": step("script", 6),
+    "7": step("case", 7, children=["8"]),
+    "8": step("interface", 8),
+}
+
+
+@pytest.fixture
+def plan():
+    return ExecutionPlan(StepMapping({"0": STEPS}), {"7": [
+        {"id": 1, "type": "group", "label": "分组", "children": [{"id": 2, "type": "interface", "label": "接口"}]},
+        {"id": 9, "type": "empty", "label": "空"},
+    ]})
+
+
+def test_plan_links_parents_and_children(plan):
+    case_plan = plan.case("0")
+    assert case_plan.get("1").parent is None and case_plan.get("7").parent is None
+    assert case_plan.get("1").children == (case_plan.get("2"), case_plan.get("3"))
+    assert case_plan.get("6").parent is case_plan.get("5")
+    assert case_plan.get("4").path_fields == {"step": 4, "step_name": "interface-4", "parent_step": 3,
+                                              "parent_step_name": "multitasker-3"}
+    assert case_plan.get("4").position == {"type": "interface", "index": 4, "label": "interface-4"}
+    # 用例步骤下的步骤在用例内，多任务器下的步骤不在
+    assert [index for index in STEPS if case_plan.get(index).in_case] == ["6", "8"]
+    # 禁用沿子树传播
+    assert [index for index in STEPS if case_plan.get(index).disabled] == ["3", "4", "5", "6"]
+
+
+def test_step_status_templates_are_serialised_once(plan):
+    templates = plan.step_status_templates(7)
+    assert [step_id for step_id, _ in templates] == [1, 2]
+    assert json.loads(templates[0][1]) == {"id": 1, "type": "group", "label": "分组", "status": "mid_pending",
+                                           "result": "mid_unknown", "start": 0, "end": 0}
+    assert plan.step_status_templates("7") is templates
+    assert plan.step_status_templates(8) == []
+
+
+class NoDrive:
+    def __init__(self, *args, **kwargs):
+        raise AssertionError("被禁用的多任务器、用例步骤不应计算驱动次数")
+
+
+def test_disabled_multitasker_skips_each_child_once(plan, monkeypatch):
+    monkeypatch.setattr(step_exec, "MultitaskerRunController", NoDrive)
+    monkeypatch.setattr(step_exec, "CaseRunController", NoDrive)
+    case_plan = plan.case("0")
+    root = MultiwayTreeNode(parent=None, node=None, children=())
+
+    async def skipped_nodes(plan_step, parent_node):
+        """按执行器展开一棵被禁用的子树，返回会被跳过的节点数"""
+        executor = RunStepExecutor(plan_step.metadata, None, None, None, parent_node, plan_step, None, None,
+                                   StaticPathIndex())
+        node = MultiwayTreeNode(parent=parent_node, node=executor)
+        count = 1
+        for child in await executor.make_child_executor(node):
+            assert child.plan_step.disabled
+            count += await skipped_nodes(child.plan_step, node)
+        return count
+
+    # 多任务器、子步骤、用例步骤、用例步骤下的脚本各跳过一次，与驱动次数（5 次、3 次）无关
+    assert asyncio.run(skipped_nodes(case_plan.get("3"), root)) == 4
@@ -0,0 +1,141 @@
+import asyncio
+import gc
+from types import SimpleNamespace
+
+import pytest
+
+from core.controller.async_task_runner import TaskRunner
+from core.enums.executor import NodeStatusEnum, RunningModeEnum
+from core.executor.core import RunnerExecutor
+from core.payload import case_exec, child_case_exec
+from core.payload.case_exec import RunCaseExecutor
+from core.payload.child_case_exec import RunChildCaseExecutor
+from core.payload.utils.tools import StaticPathIndex, PositionItem
+from core.task_object.case_list import Case
+from core.task_object.child_case_list import ChildCase
+from core.task_object.galobal_mapping import MultiwayTreeNode
+
+
+def live(cls):
+    gc.collect()
+    return sum(1 for item in gc.get_objects() if isinstance(item, cls))
+
+
+class FakeStep(RunnerExecutor):
+    """代替 RunStepExecutor 的叶子步骤：与真实步骤一样在父节点下创建树节点，执行时记录祖先与存活的执行器数"""
+    __slots__ = ("parent_node", "parent", "observed")
+
+    def __init__(self, step, global_option, task_runner, dynamic_mapping, parent_node, plan_step, parent, record,
+                 spi, in_case=False):
+        super().__init__(step, global_option, task_runner, dynamic_mapping, record, spi)
+        self.parent_node = parent_node
+        self.parent = parent
+        self.observed = global_option.observed
+
+    async def before_callback(self, *args, **kwargs):
+        step_node = MultiwayTreeNode(parent=self.parent_node, node=self, children=())
+        self.check_and_change_status(step_node)
+        return step_node
+
+    async def run(self, step_node):
+        scope = step_node.scope
+        self.observed.append({
+            "status": self.status,
+            "ancestors": (scope.task.node.metadata.type, scope.main_case.node.metadata.id,
+                          scope.child_case.node is self.parent),
+            "child_cases": live(RunChildCaseExecutor),
+            "steps": live(FakeStep),
+        })
+        await asyncio.sleep(0)
+
+    async def after_callback(self, result=None, *args, **kwargs):
+        pass
+
+    async def error_callback(self, e, *args, **kwargs):
+        raise e
+
+    async def skipped_callback(self, *args, **kwargs):
+        pass
+
+
+class Record:
+    redis_index = "record-1"
+
+    async def update_fields_to_list(self, *args, **kwargs):
+        pass
+
+
+class Silent:
+    def __init__(self, record):
+        pass
+
+    async def push_message(self, *args, **kwargs):
+        pass
+
+    async def increment_field(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def tree(monkeypatch):
+    monkeypatch.setattr(case_exec, "SummaryRecord", Silent)
+    monkeypatch.setattr(child_case_exec, "RecordInfoRecord", Silent)
+    monkeypatch.setattr(child_case_exec, "RunStepExecutor", FakeStep)
+
+    def build(child_case_count, step_count, task_status=NodeStatusEnum.RUNNING):
+        runner = TaskRunner(4)
+        steps = {str(index): SimpleNamespace(metadata=SimpleNamespace(type="interface", id=index, check="all"),
+                                             position=PositionItem(type="interface", index=index, label="").to_dict(),
+                                             path_fields={"step": index})
+                 for index in range(step_count)}
+        global_option = SimpleNamespace(shard=None, history=None, observed=[],
+                                        plan=SimpleNamespace(case=lambda index: steps))
+        task_node = MultiwayTreeNode(parent=None, node=SimpleNamespace(
+            metadata=SimpleNamespace(type="task"), status=task_status))
+        case = Case(type="main_case", id="c1", name="用例1", index=0, project_id=1, env=1,
+                    loop_strategy=RunningModeEnum.SEQUENTIALLY.value)
+        child_cases = [ChildCase(type="child_case", case_id="c1", case_name="用例1", index=index,
+                                 index_in_global_list=index, origin_child_steps=list(steps))
+                       for index in range(child_case_count)]
+        spi = StaticPathIndex(task=1, case="c1", case_name="用例1", case_index=0,
+                              position_list=[PositionItem(type="case", index="c1", label="用例1").to_dict()])
+        executor = RunCaseExecutor(case, global_option, child_cases, runner, {}, task_node, Record(), spi)
+        return runner, executor, global_option.observed
+
+    return build
+
+
+def test_finished_child_cases_are_released(tree):
+    async def main():
+        runner, executor, observed = tree(child_case_count=4, step_count=3)
+        await runner.context._run_task(executor)
+        await runner.wait_for_dynamic_tasks()
+        return observed
+
+    observed = asyncio.run(main())
+    assert len(observed) == 12
+    # 顺序执行时同一时间只有一个子用例及其步骤存活，结束的子用例连同它的步骤已经释放
+    assert {item["child_cases"] for item in observed} == {1}
+    assert max(item["steps"] for item in observed) <= 3
+    assert live(RunChildCaseExecutor) == 0 and live(FakeStep) == 0
+
+
+def test_steps_find_task_case_and_child_case_through_parents(tree):
+    async def main():
+        runner, executor, observed = tree(child_case_count=2, step_count=2)
+        await runner.context._run_task(executor)
+        return observed
+
+    observed = asyncio.run(main())
+    assert [item["ancestors"] for item in observed] == [("task", "c1", True)] * 4
+    assert {item["status"] for item in observed} == {NodeStatusEnum.PENDING}
+
+
+def test_skipped_task_is_found_from_steps(tree):
+    async def main():
+        runner, executor, observed = tree(child_case_count=1, step_count=2, task_status=NodeStatusEnum.SKIPPED)
+        await runner.context._run_task(executor)
+        return observed
+
+    # 子用例本身在创建节点后被标记为跳过，步骤沿祖先找到被跳过的任务
+    assert {item["status"] for item in asyncio.run(main())} == {NodeStatusEnum.SKIPPED}
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.enums.executor import RunningModeEnum
+from core.executor.history import DurationHistory, lpt_makespan
+
+
+def child_case(case_id, index, index_in_global_list=None):
+    return SimpleNamespace(case_id=case_id, index=index,
+                           index_in_global_list=index if index_in_global_list is None else index_in_global_list)
+
+
+@pytest.mark.parametrize("durations,machines,expected", [
+    ([], 4, 0),
+    ([5], 3, 5),
+    ([3, 3, 2, 2, 2], 2, 7),
+    ([1, 2, 3, 4, 5, 6, 7], 3, 10),
+    ([4, 4, 4], 10, 4),
+    ([4, 4, 4], 0, 12),
+])
+def test_lpt_makespan(durations, machines, expected):
+    assert lpt_makespan(durations, machines) == expected
+
+
+def test_lpt_makespan_does_not_depend_on_input_order():
+    durations = [1, 1, 1, 1, 1, 1, 8]
+    assert lpt_makespan(durations, 2) == lpt_makespan(list(reversed(durations)), 2) == 8
+
+
+def test_partition_balances_predicted_load():
+    history = DurationHistory(1, {"c:0": 8, "c:1": 7, "c:2": 6, "c:3": 5, "c:4": 4})
+    child_cases = [child_case("c", index) for index in range(5)]
+    groups = history.partition(child_cases, 2)
+    loads = [sum(history.predict_child_cases(group)) for group in groups]
+    assert sorted(loads) == [13, 17]
+    assert max(loads) == lpt_makespan(history.durations.values(), 2)
+    # 每个子用例只分给一组，组内按全局序号排列
+    assert sorted(item.index for group in groups for item in group) == list(range(5))
+    for group in groups:
+        assert [item.index_in_global_list for item in group] == sorted(item.index_in_global_list for item in group)
+
+
+def test_partition_without_history_spreads_evenly():
+    history = DurationHistory(1)
+    groups = history.partition([child_case("c", index) for index in range(7)], 3)
+    assert sorted(len(group) for group in groups) == [2, 2, 3]
+
+
+def test_partition_more_parts_than_child_cases():
+    history = DurationHistory(1, {"c:0": 3})
+    groups = history.partition([child_case("c", 0), child_case("c", 1)], 4)
+    assert sum(len(group) for group in groups) == 2
+    assert sum(1 for group in groups if not group) == 2
+
+
+def test_unknown_child_cases_use_the_case_average():
+    history = DurationHistory(1, {"a:0": 10, "a:1": 30, "b:0": 100})
+    assert history.predict_child_cases([child_case("a", index) for index in range(3)]) == [10, 30, 20]
+    # 整个用例都没有历史时按所有已知耗时的平均值估计
+    assert history.predict_child_cases([child_case("c", 0)]) == [pytest.approx(140 / 3)]
+
+
+def test_order_child_cases_longest_first_and_stable():
+    history = DurationHistory(1, {"c:0": 1, "c:1": 5, "c:2": 5, "c:3": 9})
+    ordered = history.order_child_cases([child_case("c", index) for index in range(4)])
+    assert [item.index for item in ordered] == [3, 1, 2, 0]
+
+
+def test_predict_case_by_loop_strategy():
+    history = DurationHistory(1, {"c:0": 4, "c:1": 3, "c:2": 3})
+    child_cases = [child_case("c", index) for index in range(3)]
+    sequential = SimpleNamespace(loop_strategy=RunningModeEnum.SEQUENTIALLY.value)
+    concurrent = SimpleNamespace(loop_strategy=RunningModeEnum.CONCURRENTLY.value)
+    assert history.predict_case(sequential, child_cases, workers=8) == 10
+    assert history.predict_case(concurrent, child_cases, workers=8) == 4
+    assert history.predict_case(concurrent, child_cases, workers=8, limit=2) == 6
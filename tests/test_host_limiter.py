@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from core.payload.node_executor.interface_utils.host_limiter import HostLimiter
+
+
+async def request(limiter, permit, entered=None):
+    async with permit:
+        async with limiter.slot(permit=permit):
+            if entered is not None:
+                entered.set()
+            await asyncio.sleep(0)
+
+
+def test_permit_is_lent_while_the_host_is_busy():
+    async def main():
+        limiter, permit = HostLimiter("http://a", max_in_flight=1), asyncio.Semaphore(2)
+        await limiter.in_flight.acquire()
+        waiting = asyncio.create_task(request(limiter, permit))
+        await asyncio.sleep(0.01)
+        # 排队期间归还了任务级名额，其他服务的请求可以用满
+        assert permit._value == 2
+        limiter.in_flight.release()
+        await waiting
+        assert permit._value == 2 and limiter.in_flight._value == 1
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("cancels", [1, 3])
+def test_cancelled_while_taking_the_permit_back(cancels):
+    async def main():
+        limiter, permit = HostLimiter("http://a", max_in_flight=1), asyncio.Semaphore(1)
+        await limiter.in_flight.acquire()
+        waiting = asyncio.create_task(request(limiter, permit))
+        await asyncio.sleep(0.01)
+        # 排队期间名额被其他请求占用，服务空出后等待取回名额时被取消
+        await permit.acquire()
+        limiter.in_flight.release()
+        await asyncio.sleep(0.01)
+        for _ in range(cancels):
+            waiting.cancel()
+            await asyncio.sleep(0)
+        assert not waiting.done()
+        permit.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert permit._value == 1
+        assert limiter.in_flight._value == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_while_waiting_for_the_host():
+    async def main():
+        limiter, permit = HostLimiter("http://a", max_in_flight=1), asyncio.Semaphore(1)
+        await limiter.in_flight.acquire()
+        waiting = asyncio.create_task(request(limiter, permit))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        limiter.in_flight.release()
+        assert permit._value == 1 and limiter.in_flight._value == 1
+
+    asyncio.run(main())
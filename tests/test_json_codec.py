@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from core.utils import json_codec
+
+CODECS = ["stdlib", "orjson"]
+
+
+@pytest.fixture(params=CODECS)
+def codec(request):
+    name = json_codec.use(request.param)
+    if name != request.param:
+        pytest.skip(f"{request.param} 未安装")
+    yield name
+    json_codec.use("auto")
+
+
+def test_round_trip(codec):
+    value = {"name": "用户", "items": [1, 2.5, None, True], "nested": {"a": []}}
+    assert json_codec.loads(json_codec.dumps(value)) == value
+
+
+def test_matches_stdlib_options(codec):
+    value = {"b": 1, "a": "中文"}
+    assert json.loads(json_codec.dumps(value, sort_keys=True, indent=2)) == value
+    assert json_codec.dumps(value, sort_keys=True).index('"a"') < json_codec.dumps(value, sort_keys=True).index('"b"')
+    assert json_codec.dumps(value, ensure_ascii=True) == json.dumps(value, ensure_ascii=True)
+    assert json_codec.dumps(value, indent=4) == json.dumps(value, ensure_ascii=False, indent=4)
+
+
+def test_falls_back_for_unsupported_values(codec):
+    assert json_codec.loads(json_codec.dumps({"big": 2 ** 70})) == {"big": 2 ** 70}
+    assert json_codec.dumps({"value": object()}, default=lambda item: "obj") in ('{"value": "obj"}',
+                                                                                '{"value":"obj"}')
+    assert json_codec.loads(json_codec.dumps({1: "a"})) == {"1": "a"}
+
+
+def test_decode_error_is_stdlib_compatible(codec):
+    with pytest.raises(json.JSONDecodeError):
+        json_codec.loads('{"a": ')
+    assert json_codec.loads(b'{"a": 1}') == {"a": 1}
+
+
+def test_unknown_codec_falls_back_to_stdlib():
+    try:
+        assert json_codec.use("stdlib") == "stdlib"
+        assert json_codec.use("unknown") == "stdlib"
+        assert json_codec.CODEC_NAME == "stdlib"
+    finally:
+        json_codec.use("auto")
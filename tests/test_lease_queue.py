@@ -0,0 +1,194 @@
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+
+from core.executor import shard as shard_module
+from core.enums.executor import RunningModeEnum
+from core.executor.shard import TaskShard, init_coordination
+from remote.redis.lease_queue import LeaseQueue
+
+REDIS_INDEX = "record-1"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(shard_module, "get_async_client", lambda: (client, None))
+    return client
+
+
+def make_queue(client, lease_ms=50, max_deliveries=3):
+    return LeaseQueue(client, f"{REDIS_INDEX}:dist", TaskShard.key(REDIS_INDEX, "errors"), lease_ms=lease_ms,
+                      max_deliveries=max_deliveries)
+
+
+class Worker:
+    """与 TaskSession.run 相同的登记顺序：按子用例登记用例的开始、结束，最后确认"""
+
+    def __init__(self, name, queue):
+        self.name = name
+        self.queue = queue
+        self.shard = TaskShard(REDIS_INDEX, name)
+        self.events = []
+
+    async def claim(self):
+        return await self.queue.claim(self.name)
+
+    async def start(self, item, case_id="c1"):
+        self.shard.part = item
+        self.events.append(("enter", item, await self.shard.enter_case(case_id)))
+
+    async def finish(self, item, case_id="c1"):
+        self.shard.part = item
+        self.events.append(("leave", item, await self.shard.leave_case(case_id)))
+        return await self.queue.ack(item, self.name)
+
+
+def test_redelivered_child_case_does_not_end_the_case_early(client):
+    async def main():
+        queue = make_queue(client)
+        await init_coordination(REDIS_INDEX, {"c1": 3})
+        await queue.publish(["0", "1", "2"])
+        slow, fast = Worker("slow", queue), Worker("fast", queue)
+
+        assert await slow.claim() == "0"
+        await slow.start("0")
+        # 慢节点的租约过期，子用例 0 重新投递给另一个节点
+        await asyncio.sleep(0.08)
+        assert await fast.claim() == "0"
+        await fast.start("0")
+        assert await fast.finish("0")
+        # 慢节点随后也执行完：确认失败，登记不重复计数
+        assert not await slow.finish("0")
+        for _ in range(2):
+            item = await fast.claim()
+            await fast.start(item)
+            await fast.finish(item)
+
+        events = slow.events + fast.events
+        assert [event for event in events if event[0] == "enter" and event[2]] == [("enter", "0", True)]
+        # 只有最后一个子用例结束时写用例的结束记录，且只写一次
+        assert [event for event in events if event[0] == "leave" and event[2]] == [("leave", "2", True)]
+        assert await queue.done_count() == 3
+
+    asyncio.run(main())
+
+
+def test_concurrent_workers_end_each_case_once(client):
+    async def main():
+        queue = make_queue(client, lease_ms=30)
+        cases = {str(index): f"c{index % 3}" for index in range(30)}
+        await init_coordination(REDIS_INDEX, {case_id: list(cases.values()).count(case_id)
+                                              for case_id in set(cases.values())})
+        await queue.publish(list(cases))
+        ended = []
+
+        async def serve(worker, delay):
+            while (item := await worker.claim()) is not None:
+                await worker.start(item, cases[item])
+                # 部分节点比租约慢，子用例会被重复执行
+                await asyncio.sleep(delay)
+                worker.shard.part = item
+                if await worker.shard.leave_case(cases[item]):
+                    ended.append(cases[item])
+                await worker.queue.ack(item, worker.name)
+
+        await asyncio.gather(*(serve(Worker(f"w{index}", queue), 0.05 if index == 0 else 0.001)
+                               for index in range(4)))
+        await queue.requeue_expired()
+        assert sorted(ended) == ["c0", "c1", "c2"]
+
+    asyncio.run(main())
+
+
+def test_abandoned_child_case_is_finished_by_the_coordinator(client, monkeypatch):
+    from core.record.child_record import summary
+    from remote.redis.coordinator import DistributedTaskExecutor
+
+    messages, updates = [], []
+
+    class Summary:
+        def __init__(self, record):
+            pass
+
+        async def push_message(self, message):
+            messages.extend(message)
+
+    monkeypatch.setattr(summary, "SummaryRecord", Summary)
+
+    async def update_fields_to_list(key, index, **kwargs):
+        updates.append((index, kwargs["status"]))
+
+    task_record = SimpleNamespace(redis_index=REDIS_INDEX, update_fields_to_list=update_fields_to_list)
+
+    async def main():
+        queue = make_queue(client, max_deliveries=1)
+        await init_coordination(REDIS_INDEX, {"c1": 2})
+        await queue.publish(["0", "1"])
+        lost, worker = Worker("lost", queue), Worker("ok", queue)
+        assert await lost.claim() == "0"
+        await lost.start("0")
+        assert await worker.claim() == "1"
+        await worker.start("1")
+        assert await worker.finish("1")
+        # 领取子用例 0 的节点失联，超过最多投递次数后放弃
+        await asyncio.sleep(0.08)
+        await queue.requeue_expired()
+        assert await queue.done_count() == 2
+        assert "child_case:0" in await client.hgetall(TaskShard.key(REDIS_INDEX, "errors"))
+
+        child_cases = {item: [SimpleNamespace(case_id="c1", case_name="用例1", index_in_global_list=int(item))]
+                       for item in ("0", "1")}
+        coordinator_shard = TaskShard(REDIS_INDEX, "coordinator")
+        await DistributedTaskExecutor._finish_abandoned(queue, coordinator_shard, task_record, child_cases)
+        # 已经取出的元素不会再次收尾
+        await DistributedTaskExecutor._finish_abandoned(queue, coordinator_shard, task_record, child_cases)
+        assert updates == [(0, "end_error")]
+        assert messages == ["用例:[用例1]，出现错误，执行结束"]
+        # 失联的节点之后又执行完，不会再写一次结束记录
+        lost.shard.part = "0"
+        assert not await lost.shard.leave_case("c1")
+
+    asyncio.run(main())
+
+
+def test_released_item_is_redelivered_without_counting(client):
+    async def main():
+        queue = make_queue(client, max_deliveries=1)
+        await queue.publish(["0", "1"])
+        assert await queue.claim("remote") == "0"
+        # 其他领取者不能归还
+        assert not await queue.release("0", "other")
+        assert await queue.release("0", "remote")
+        assert await queue.claim("local") == "0"
+        assert await queue.ack("0", "local")
+        assert not await client.hgetall(TaskShard.key(REDIS_INDEX, "errors"))
+
+    asyncio.run(main())
+
+
+def distributed_options(task_strategy, case_strategies, child_case_counts):
+    child_cases = []
+    for case_id, count in child_case_counts.items():
+        for index in range(count):
+            child_cases.append(SimpleNamespace(case_id=case_id, index=index, index_in_global_list=len(child_cases)))
+    return SimpleNamespace(
+        task_info=SimpleNamespace(loop_strategy=task_strategy),
+        case_list=SimpleNamespace(data=[SimpleNamespace(id=case_id, loop_strategy=strategy)
+                                        for case_id, strategy in case_strategies.items()]),
+        child_case_list=SimpleNamespace(list=child_cases))
+
+
+def test_sequential_case_is_published_as_one_item():
+    from remote.redis.coordinator import DistributedTaskExecutor, item_id, work_items
+
+    sequential, concurrent = RunningModeEnum.SEQUENTIALLY.value, RunningModeEnum.CONCURRENTLY.value
+    items = work_items(distributed_options(concurrent, {"seq": sequential, "con": concurrent}, {"seq": 3, "con": 2}))
+    assert [item_id(child_cases) for child_cases in items] == ["0,1,2", "3", "4"]
+    assert DistributedTaskExecutor._case_parts(items) == {"seq": 1, "con": 2}
+    # 顺序执行的任务整体为一个元素
+    items = work_items(distributed_options(sequential, {"a": concurrent, "b": concurrent}, {"a": 2, "b": 1}))
+    assert [item_id(child_cases) for child_cases in items] == ["0,1,2"]
+    assert DistributedTaskExecutor._case_parts(items) == {"a": 1, "b": 1}
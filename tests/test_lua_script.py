@@ -0,0 +1,85 @@
+import asyncio
+
+import fakeredis
+import pytest
+from redis.exceptions import NoScriptError
+
+from core.lua_script.lua_script_manager import LuaScript, LuaScriptRegistry
+
+ECHO = LuaScript("echo", "return {KEYS, ARGV}")
+
+
+class Counting:
+    """记录 EVALSHA、SCRIPT LOAD 的调用次数"""
+
+    def __init__(self, client, load=True):
+        self.client = client
+        self.load = load
+        self.evalsha_calls = 0
+        self.load_calls = 0
+
+    def evalsha(self, *args):
+        self.evalsha_calls += 1
+        return self.client.evalsha(*args)
+
+    def script_load(self, content):
+        self.load_calls += 1
+        # load=False 模拟加载后脚本再次丢失
+        return self.client.script_load(content) if self.load else ECHO.sha1
+
+
+def test_keys_and_args_are_split_by_key_count():
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    assert ECHO.call_sync(client, ["k1", "k2"], ["a", 1]) == [["k1", "k2"], ["a", "1"]]
+    assert ECHO.call_sync(client, [], ["a", "b"]) == [[], ["a", "b"]]
+
+
+def test_sync_call_reloads_once_after_script_flush():
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    client.script_load(ECHO.content)
+    client.script_flush()
+    counting = Counting(client)
+    assert ECHO.call_sync(counting, ["k"], ["v"]) == [["k"], ["v"]]
+    assert (counting.evalsha_calls, counting.load_calls) == (2, 1)
+    # 脚本已重新加载，后续调用不再 SCRIPT LOAD
+    assert ECHO.call_sync(counting, ["k"], ["v"]) == [["k"], ["v"]]
+    assert (counting.evalsha_calls, counting.load_calls) == (3, 1)
+
+
+def test_sync_call_retries_only_once():
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    counting = Counting(client, load=False)
+    with pytest.raises(NoScriptError):
+        ECHO.call_sync(counting, ["k"], ["v"])
+    assert (counting.evalsha_calls, counting.load_calls) == (2, 1)
+
+
+def test_async_call_reloads_once_after_script_flush():
+    async def main():
+        client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+        assert await ECHO(client, ["k1"], ["a", "b"]) == [["k1"], ["a", "b"]]
+        await client.script_flush()
+        calls = []
+        script_load = client.script_load
+
+        async def counting_load(content):
+            calls.append(content)
+            return await script_load(content)
+
+        client.script_load = counting_load
+        assert await ECHO(client, ["k1", "k2"], ["a"]) == [["k1", "k2"], ["a"]]
+        assert calls == [ECHO.content]
+
+    asyncio.run(main())
+
+
+def test_registry_loads_scripts_by_name(tmp_path):
+    (tmp_path / "echo.lua").write_text(ECHO.content, encoding="utf-8")
+    LuaScriptRegistry.configure(str(tmp_path))
+    try:
+        script = LuaScriptRegistry.get("echo")
+        assert script.sha1 == ECHO.sha1 and LuaScriptRegistry.get("echo") is script
+        with pytest.raises(ValueError):
+            LuaScriptRegistry.get("missing")
+    finally:
+        LuaScriptRegistry.configure(None)
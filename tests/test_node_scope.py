@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.enums.executor import ErrorStrategyMixinEnum, NodeStatusEnum
+from core.payload.utils.error_strategy import ErrorStrategyController
+from core.payload.utils.tools import search_env
+from core.payload.variables_controller.variable import Variable
+from core.task_object.galobal_mapping import MultiwayTreeNode
+
+
+class Shard:
+    def __init__(self):
+        self.skipped = []
+
+    def publish_skip(self, scope):
+        self.skipped.append(scope)
+
+
+def add(parent, in_case=False, shard=None, **metadata):
+    executor = SimpleNamespace(metadata=SimpleNamespace(**metadata), status=NodeStatusEnum.RUNNING, in_case=in_case,
+                               global_option=SimpleNamespace(shard=shard))
+    return MultiwayTreeNode(parent=parent, node=executor, children=())
+
+
+@pytest.fixture
+def tree():
+    """
+    task
+    └── main_case(项目 1, 环境 10)
+        └── child_case
+            └── group
+                ├── case_self(self_case, 项目 2, 环境 20) ── child_step_case ── interface(项目 5)
+                ├── case_current(current_case, 项目 3) ── script
+                └── case_unknown(multi_env) ── script
+    """
+    shard = Shard()
+    task = add(None, type="task")
+    main_case = add(task, type="main_case", id="c1", project_id=1, env=10)
+    child_case = add(main_case, type="child_case", temp_variables={})
+    group = add(child_case, type="group", error_strategy=ErrorStrategyMixinEnum.RAISE)
+    case_self = add(group, type="case", env_strategy="self_case", project_id=2, env=20,
+                    error_strategy=ErrorStrategyMixinEnum.REF_CASE_INNER, case_error_strategy="current_case")
+    child_step_case = add(case_self, in_case=True, type="child_step_case", temp_variables={},
+                          error_strategy=ErrorStrategyMixinEnum.RAISE)
+    interface = add(child_step_case, in_case=True, shard=shard, type="interface", project_id=5)
+    case_current = add(group, type="case", env_strategy="current_case", project_id=3, env=30,
+                       error_strategy=ErrorStrategyMixinEnum.RAISE)
+    case_unknown = add(group, type="case", env_strategy="multi_env", project_id=4, env=40)
+    return SimpleNamespace(
+        shard=shard, task=task, main_case=main_case, child_case=child_case, group=group, case_self=case_self,
+        child_step_case=child_step_case, interface=interface, case_current=case_current,
+        current_leaf=add(case_current, in_case=True, type="script"),
+        unknown_leaf=add(case_unknown, in_case=True, type="script"),
+    )
+
+
+def test_scope_points_at_the_nearest_ancestors(tree):
+    scope = tree.interface.scope
+    assert (scope.task, scope.main_case, scope.child_case, scope.case, scope.child_step_case) == (
+        tree.task, tree.main_case, tree.child_case, tree.case_self, tree.child_step_case)
+    # 非索引类型的节点共用父节点的索引
+    assert tree.interface.scope is tree.child_step_case.scope and tree.group.scope is tree.child_case.scope
+    assert tree.current_leaf.scope.case is tree.case_current and tree.current_leaf.scope.child_step_case is None
+    assert list(Variable._temp_scopes(tree.interface)) == [tree.child_step_case, tree.child_case]
+
+
+def test_search_env_follows_the_case_step_env_strategy(tree):
+    assert search_env(tree.interface) == 20
+    assert search_env(tree.current_leaf) == 10
+    assert search_env(tree.group) == 10
+
+
+def test_gpe_resolves_project_and_env_from_the_scope(tree):
+    # 接口步骤使用自身的项目，环境来自使用自身环境的用例步骤
+    assert Variable._gpe(tree.interface) == (5, 20)
+    assert Variable._gpe(tree.child_step_case) == (2, 20)
+    # current_case 沿用主用例的环境，用例步骤自身的项目优先
+    assert Variable._gpe(tree.current_leaf) == (3, 10)
+    assert Variable._gpe(tree.group, project_id=7) == (7, 10)
+    assert Variable._gpe(tree.unknown_leaf) == (None, None)
+    assert Variable._get_root_case_project_env(tree.interface) == (1, 10)
+
+
+def test_error_strategy_lookups_use_the_scope(tree):
+    assert ErrorStrategyController.get_task_node(tree.interface) is tree.task
+    assert ErrorStrategyController.get_mian_case_node(tree.interface) is tree.main_case
+    assert ErrorStrategyController.get_main_child_case_node(tree.interface) is tree.child_case
+    assert ErrorStrategyController.get_inner_case_node(tree.interface) is tree.case_self
+    assert ErrorStrategyController.get_inner_child_case_node(tree.interface) is tree.child_step_case
+
+
+@pytest.mark.parametrize("strategy, skipped, published", [
+    (ErrorStrategyMixinEnum.TASK, "task", ["task"]),
+    (ErrorStrategyMixinEnum.REF_CASE, "case_self", []),
+    (ErrorStrategyMixinEnum.REF_CHILD_CASE, "child_step_case", []),
+    # 引用用例由内部抉择时，结束当前用例只结束引用的子用例
+    (ErrorStrategyMixinEnum.CURRENT_CASE, "child_step_case", []),
+    (ErrorStrategyMixinEnum.CASE, "case_self", []),
+])
+def test_error_strategy_skips_the_scope_node(tree, strategy, skipped, published):
+    tree.child_step_case.node.metadata.error_strategy = strategy
+    ErrorStrategyController(tree.interface).exec()
+    skipped_nodes = [name for name in ("task", "main_case", "child_case", "case_self", "child_step_case")
+                     if getattr(tree, name).node.status == NodeStatusEnum.SKIPPED]
+    assert skipped_nodes == [skipped]
+    assert tree.shard.skipped == published
+
+
+def test_case_strategy_outside_ref_case_inner_ends_the_main_case(tree):
+    tree.case_self.node.metadata.error_strategy = ErrorStrategyMixinEnum.RAISE
+    tree.child_step_case.node.metadata.error_strategy = ErrorStrategyMixinEnum.CASE
+    ErrorStrategyController(tree.interface).exec()
+    assert tree.main_case.node.status == NodeStatusEnum.SKIPPED
+    assert tree.case_self.node.status == NodeStatusEnum.RUNNING
+    assert tree.shard.skipped == ["case:c1"]
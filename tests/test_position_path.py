@@ -0,0 +1,60 @@
+from core.payload.utils.tools import StaticPathIndex, PositionItem, PositionPath, EMPTY_POSITION_PATH
+from core.record.utils import PositionPathIntern, ProcessObject
+
+
+def item(type, index):
+    return PositionItem(type=type, index=index, label=f"{type}-{index}").to_dict()
+
+
+def root_spi():
+    spi = StaticPathIndex(task=1, case="c1", case_name="用例1", case_index=0)
+    spi.add_position(item("task", 1))
+    spi.add_position(item("case", "c1"))
+    return spi
+
+
+def test_siblings_share_the_parent_path():
+    spi = root_spi()
+    first = spi.extend(item("interface", 1), step=1)
+    second = spi.extend(item("interface", 2), step=2)
+    assert first.position_list.parent is spi.position_list is second.position_list.parent
+    assert spi.copy().position_list is spi.position_list
+    # 派生子路径不影响父路径与兄弟路径
+    assert [position["index"] for position in spi.position_list] == [1, "c1"]
+    assert [position["index"] for position in first.position_list] == [1, "c1", 1]
+    assert [position["index"] for position in second.position_list] == [1, "c1", 2]
+    assert (first.step, second.step, spi.step) == (1, 2, None)
+
+
+def test_list_form_is_cached_and_round_trips():
+    items = [item("task", 1), item("case", "c1"), item("child_case", 0)]
+    path = PositionPath.from_list(items)
+    assert path.to_list() == items and path.to_list() is path.to_list()
+    assert len(path) == 3 and path and not EMPTY_POSITION_PATH and EMPTY_POSITION_PATH.to_list() == []
+    assert PositionPath.from_list(path.to_list()).to_list() == items
+
+
+def test_to_dict_matches_the_old_list_form():
+    spi = root_spi().extend(item("interface", 7), step=7, step_name="接口")
+    assert spi.to_dict() == {
+        "record_index": None, "task": 1, "case": "c1", "case_index": 0, "child_case": None, "step": 7,
+        "parent_step": None, "parent_step_name": None, "step_name": "接口", "case_name": "用例1",
+        "position_list": [item("task", 1), item("case", "c1"), item("interface", 7)],
+    }
+    process = ProcessObject(desc="a", position_list=spi.position_list)
+    legacy = ProcessObject(desc="a", position_list=spi.position_list.to_list())
+    legacy.time, legacy.seq = process.time, process.seq
+    assert process.to_json() == legacy.to_json()
+
+
+def test_intern_encodes_a_shared_path_once(monkeypatch):
+    spi = root_spi().extend(item("interface", 1))
+    intern = PositionPathIntern()
+    expected = intern.intern(spi.position_list.to_list())
+    encoded = []
+    original = PositionPathIntern.encode
+    monkeypatch.setattr(PositionPathIntern, "encode", staticmethod(lambda value: encoded.append(value) or
+                                                                   original(value)))
+    assert intern.intern(spi.position_list) == expected
+    assert intern.intern(spi.copy().position_list) == expected
+    assert len(encoded) == 1
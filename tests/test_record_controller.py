@@ -0,0 +1,121 @@
+import json
+
+import fakeredis
+import pytest
+
+from core.record.utils import ProcessObject, PositionPathIntern
+from server.app.task import record_controller
+from server.app.task.record_controller import RecordController
+
+KEY = "record-1:summary"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(record_controller, "get_sync_client", lambda: (client, None))
+    return client
+
+
+def event(desc, seq, compact=False):
+    process = ProcessObject(desc=desc, position_list=[{"type": "task", "index": 0}])
+    process.seq = seq
+    if not compact:
+        return process.to_json()
+    return process.to_compact_json(PositionPathIntern())
+
+
+def descs(data):
+    return [item["desc"] for item in json.loads(data)]
+
+
+def test_malformed_events_are_dropped(client):
+    # 拼接路径只按形状判断，形状不对的元素走解码路径并被丢弃
+    client.rpush(KEY, event("a", 1), '{"type": "system", "desc": "broken"', event("b", 2, compact=True),
+                 "not json", event("c", 4))
+    data, next_index, _ = RecordController("get_json_list_by_chunk").get_json_list_by_chunk(KEY, 0)
+    assert descs(data) == ["a", "b", "c"]
+    assert next_index == 5
+
+
+def test_spliced_events_are_not_decoded(client, monkeypatch):
+    client.rpush(KEY, event("a", 1), event("b", 2, compact=True))
+
+    def loads(*_args, **_kwargs):
+        raise AssertionError("拼接路径不应解码事件")
+
+    monkeypatch.setattr(record_controller.json, "loads", loads)
+    monkeypatch.setattr(record_controller.json_codec, "loads", loads)
+    data, _, _ = RecordController("get_json_list_by_chunk").get_json_list_by_chunk(KEY, 0)
+    monkeypatch.undo()
+    assert descs(data) == ["a", "b"]
+
+
+def read_pages(max_count):
+    controller, start_index, pages = RecordController("get_json_list_by_chunk"), 0, []
+    while True:
+        data, start_index, _, version = controller.get_json_list_by_chunk(KEY, start_index, max_count=max_count)
+        pages.append(descs(data))
+        if version is not None:
+            return pages
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_pages_are_ordered_by_seq_across_pages(client, compact):
+    # 并发写入造成的乱序：序号 3 的事件写在了第二页
+    order = [1, 2, 4, 5, 3, 6, 8, 7, 9]
+    client.rpush(KEY, *[event(str(seq), seq, compact) for seq in order])
+    client.set(f"{KEY}:version", 1)
+    pages = read_pages(max_count=4)
+    assert sum(pages, []) == [str(seq) for seq in range(1, 10)]
+    assert pages[0] == ["1", "2"]
+
+
+def test_pages_without_seq_keep_stored_order(client):
+    client.rpush(KEY, *[json.dumps({"type": "system", "desc": str(index)}) for index in (2, 1, 3)])
+    client.set(f"{KEY}:version", 1)
+    assert read_pages(max_count=2) == [["2", "1"], ["3"]]
+
+
+def test_disorder_beyond_lookahead_still_makes_progress(client, monkeypatch):
+    monkeypatch.setattr(RecordController, "SEQ_LOOKAHEAD", 2)
+    client.rpush(KEY, *[event(str(seq), seq) for seq in (9, 2, 3, 4, 5)])
+    client.set(f"{KEY}:version", 1)
+    assert read_pages(max_count=1) == [["9"], ["2"], ["3"], ["4"], ["5"]]
+
+
+def test_max_count_pages_advance_next_index_and_return_version_at_end(client):
+    client.rpush(KEY, *[event(desc, seq) for seq, desc in enumerate("abcde", 1)])
+    client.set(f"{KEY}:version", 3)
+    controller = RecordController("get_json_list_by_chunk")
+    pages = []
+    start_index = 0
+    for _ in range(3):
+        data, start_index, _, version = controller.get_json_list_by_chunk(KEY, start_index, max_count=2)
+        pages.append((descs(data), start_index, version))
+    # 版本号只在读到列表末尾时返回，前面的页为 None，客户端据此继续翻页
+    assert pages == [(["a", "b"], 2, None), (["c", "d"], 4, None), (["e"], 5, 3)]
+
+
+def test_version_is_returned_only_when_requested(client):
+    client.rpush(KEY, event("a", 1), event("b", 2))
+    client.set(f"{KEY}:version", 2)
+    controller = RecordController("get_json_list_by_chunk")
+    assert len(controller.get_json_list_by_chunk(KEY, 0)) == 3
+    data, next_index, _, version = controller.get_json_list_by_chunk(KEY, 0, version=0)
+    assert (descs(data), next_index, version) == (["a", "b"], 2, 2)
+
+
+def test_unchanged_version_short_circuits_without_reading_the_list(client):
+    client.rpush(KEY, event("a", 1), event("b", 2))
+    client.set(f"{KEY}:version", 2)
+    client.set(f"{KEY}:extra", json.dumps({"status": "running"}))
+    controller = RecordController("get_json_list_by_chunk")
+    _, next_index, _, version = controller.get_json_list_by_chunk(KEY, 0, version=0)
+    # 版本号未变化时即使列表有新元素也不读取，原样返回索引与版本号，extra_key 照常返回
+    client.rpush(KEY, event("c", 3))
+    assert controller.get_json_list_by_chunk(KEY, next_index, extra_key=f"{KEY}:extra", version=version) == (
+        [], 2, '{"status": "running"}', 2)
+    client.set(f"{KEY}:version", 3)
+    data, next_index, _, version = controller.get_json_list_by_chunk(KEY, next_index, version=version)
+    assert (descs(data), next_index, version) == (["c"], 3, 3)
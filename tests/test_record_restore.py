@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.record import record_restore
+from core.record.backup_store import RecordBackupNotFoundError
+from core.record.record_restore import RecordRestoreFlight
+
+
+class SlowImport:
+    """代替从备份文件导入：记录调用次数，放行前一直阻塞"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.release = threading.Event()
+
+    def __call__(self, record_backup_index):
+        self.calls.append(record_backup_index)
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def importer(monkeypatch):
+    def install(error=None):
+        slow = SlowImport(error)
+        monkeypatch.setattr(record_restore.AsyncRedisClient, "sync_import_from_file", slow)
+        return slow
+
+    return install
+
+
+def restore_concurrently(flight, indexes, slow):
+    def restore(index):
+        try:
+            flight.restore(index)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(len(indexes)) as pool:
+        futures = [pool.submit(restore, index) for index in indexes]
+        # 等所有请求都挂到进行中的恢复上
+        time.sleep(0.05)
+        slow.release.set()
+        return [future.result() for future in futures]
+
+
+def test_concurrent_restores_of_one_record_run_once(importer):
+    slow = importer()
+    flight = RecordRestoreFlight(negative_ttl=30, positive_ttl=5)
+    assert restore_concurrently(flight, ["r1"] * 8, slow) == [None] * 8
+    assert slow.calls == ["r1"]
+    # 恢复成功后的短时间内不再重复恢复
+    flight.restore("r1")
+    assert slow.calls == ["r1"]
+
+
+def test_different_records_restore_independently(importer):
+    slow = importer()
+    flight = RecordRestoreFlight()
+    assert restore_concurrently(flight, ["r1", "r2", "r1", "r2"], slow) == [None] * 4
+    assert sorted(slow.calls) == ["r1", "r2"]
+
+
+def test_missing_backup_is_shared_and_negatively_cached(importer):
+    slow = importer(RecordBackupNotFoundError("missing"))
+    flight = RecordRestoreFlight(negative_ttl=30, positive_ttl=5)
+    results = restore_concurrently(flight, ["r1"] * 4, slow)
+    assert all(isinstance(result, RecordBackupNotFoundError) for result in results)
+    assert slow.calls == ["r1"]
+    with pytest.raises(RecordBackupNotFoundError):
+        flight.restore("r1")
+    assert slow.calls == ["r1"]
+    # 备份重新写入后清除缓存即可再次恢复
+    flight.invalidate("r1")
+    slow.error = None
+    flight.restore("r1")
+    assert slow.calls == ["r1", "r1"]
+
+
+def test_other_errors_are_not_cached(importer):
+    slow = importer(OSError("disk"))
+    flight = RecordRestoreFlight(negative_ttl=30, positive_ttl=5)
+    results = restore_concurrently(flight, ["r1"] * 3, slow)
+    assert all(isinstance(result, OSError) for result in results)
+    slow.error = None
+    flight.restore("r1")
+    assert slow.calls == ["r1", "r1"]
+
+
+def test_caches_expire(importer):
+    slow = importer()
+    slow.release.set()
+    flight = RecordRestoreFlight(negative_ttl=0, positive_ttl=0)
+    flight.restore("r1")
+    flight.restore("r1")
+    assert slow.calls == ["r1", "r1"]
@@ -0,0 +1,207 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError
+
+from remote.redis import replicator
+from remote.redis.replicator import JOURNAL_KEY, RecordJournal, RecordReplicator
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    monkeypatch.setenv("RECORD_CENTRAL_REDIS_CONNECTION", "redis://central")
+    local = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    central = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    return local, central
+
+
+async def rpush(local, key, *values):
+    """与 AsyncRedisClient.append_to_list 相同的写入与日志"""
+    journal = RecordJournal()
+    async with local.pipeline() as pipe:
+        pipe.rpush(key, *values)
+        journal.append(pipe, "RPUSH", key, list(values), 3600)
+        pipe.incr(replicator.version_key(key))
+        journal.append(pipe, "INCR", replicator.version_key(key), ttl=3600)
+        await pipe.execute()
+
+
+async def update_in_place(local, key, index, value):
+    """模拟 Lua 脚本原地修改后追加 SYNC"""
+    await local.lset(key, index, value)
+    await local.incr(replicator.version_key(key))
+    async with local.pipeline() as pipe:
+        RecordJournal().append(pipe, "SYNC", key)
+        await pipe.execute()
+
+
+async def assert_replicated(local, central, key):
+    assert await central.lrange(key, 0, -1) == await local.lrange(key, 0, -1)
+    assert await central.get(replicator.version_key(key)) == await local.get(replicator.version_key(key))
+
+
+@pytest.mark.parametrize("batch", [1, 2, 3, 500])
+def test_mixed_rpush_and_sync_on_one_key(stores, batch):
+    local, central = stores
+
+    async def main():
+        key = "record:step:process"
+        shipper = RecordReplicator(local, central, node="n1")
+        shipper.batch = batch
+        await rpush(local, key, "e1", "e2")
+        await update_in_place(local, key, 0, "e1*")
+        await rpush(local, key, "e3")
+        await rpush(local, key, "e4")
+        await update_in_place(local, key, 3, "e4*")
+        await rpush(local, key, "e5")
+        assert await shipper.drain()
+        await assert_replicated(local, central, key)
+        assert await central.lrange(key, 0, -1) == ["e1*", "e2", "e3", "e4*", "e5"]
+        assert await central.get(replicator.version_key(key)) == "6"
+        # 快照之后的新写入照常追加
+        await rpush(local, key, "e6")
+        assert await shipper.drain()
+        await assert_replicated(local, central, key)
+
+    asyncio.run(main())
+
+
+def test_snapshot_covering_later_entries_of_the_next_batch(stores):
+    local, central = stores
+
+    async def main():
+        key = "record:child_case:process"
+        shipper = RecordReplicator(local, central, node="n1")
+        shipper.batch = 1
+        await update_in_place_or_create(local, key)
+        await rpush(local, key, "b")
+        await rpush(local, key, "c")
+        # 第一批只有 SYNC，快照已经包含了后两次追加，之后的批次不能再追加一遍
+        assert await shipper.ship_once() == 1
+        assert await central.lrange(key, 0, -1) == ["a", "b", "c"]
+        assert await shipper.drain()
+        await assert_replicated(local, central, key)
+
+    async def update_in_place_or_create(local, key):
+        await rpush(local, key, "x")
+        await update_in_place(local, key, 0, "a")
+        # 只保留 SYNC 之后的日志，让第一批从 SYNC 开始
+        for entry_id, fields in await local.xrange(JOURNAL_KEY):
+            if fields["op"] != "SYNC":
+                await local.xdel(JOURNAL_KEY, entry_id)
+        await central.rpush(key, "x")
+        await central.set(replicator.version_key(key), 1)
+
+    asyncio.run(main())
+
+
+def test_replay_after_disconnect(stores):
+    local, central = stores
+
+    async def main():
+        key = "record:summary:process"
+        shipper = RecordReplicator(local, central, node="n1")
+        shipper.batch = 2
+        for value in ("e1", "e2", "e3"):
+            await rpush(local, key, value)
+        await update_in_place(local, key, 1, "e2*")
+        await rpush(local, key, "e4")
+
+        # 事务已经在中心存储执行，但回包前连接断开：游标随数据写入，重连后从中心存储的游标继续
+        original = central.pipeline
+
+        def pipeline_dropping_reply(*args, **kwargs):
+            pipe = original(*args, **kwargs)
+            execute = pipe.execute
+
+            async def execute_then_disconnect(*a, **kw):
+                await execute(*a, **kw)
+                raise ConnectionError("connection lost")
+
+            pipe.execute = execute_then_disconnect
+            return pipe
+
+        central.pipeline = pipeline_dropping_reply
+        with pytest.raises(ConnectionError):
+            await shipper.ship_once()
+        central.pipeline = original
+        # serve() 在出错时丢弃内存中的游标
+        shipper.cursor = None
+        # 另一个进程接手复制也从中心存储的游标继续
+        assert await RecordReplicator(local, central, node="n1").drain()
+        await assert_replicated(local, central, key)
+        assert await central.lrange(key, 0, -1) == ["e1", "e2*", "e3", "e4"]
+
+    asyncio.run(main())
+
+
+def test_journal_entries_replayed_verbatim(stores):
+    local, central = stores
+
+    async def main():
+        journal = RecordJournal()
+        async with local.pipeline() as pipe:
+            journal.append(pipe, "SET", "info", json.dumps({"a": 1}), 60)
+            journal.append(pipe, "HSET", "paths", {"1": "task"}, 60)
+            journal.append(pipe, "DEL", "gone")
+            await pipe.execute()
+        await central.set("gone", 1)
+        assert await RecordReplicator(local, central, node="n1").drain()
+        assert json.loads(await central.get("info")) == {"a": 1}
+        assert await central.hgetall("paths") == {"1": "task"}
+        assert not await central.exists("gone")
+        assert 0 < await central.ttl("info") <= 60
+
+    asyncio.run(main())
+
+
+def test_trimmed_journal_forces_a_full_resync(stores):
+    local, central = stores
+
+    async def main():
+        key = "record:summary:process"
+        shipper = RecordReplicator(local, central, node="n1")
+        await rpush(local, key, "e1")
+        assert await shipper.drain()
+        # 中心存储不可用期间日志超过 maxlen，未复制的条目被裁剪掉
+        for value in ("e2", "e3", "e4"):
+            await rpush(local, key, value)
+        await local.set("record:info", "i")
+        await local.sadd("distributed:tasks", "record")
+        await local.xtrim(JOURNAL_KEY, maxlen=1, approximate=False)
+        assert await shipper.drain()
+        await assert_replicated(local, central, key)
+        assert await central.lrange(key, 0, -1) == ["e1", "e2", "e3", "e4"]
+        assert await central.get("record:info") == "i"
+        # 不复制的类型不写入中心存储
+        assert not await central.exists("distributed:tasks")
+        # 重新同步之后的写入照常追加，不会再次整体同步
+        await rpush(local, key, "e5")
+        assert not await shipper._journal_trimmed()
+        assert await shipper.drain()
+        await assert_replicated(local, central, key)
+
+    asyncio.run(main())
+
+
+def test_shipper_lease_is_held_by_one_process(stores):
+    local, central = stores
+
+    async def main():
+        first, second = RecordReplicator(local, central, node="n1"), RecordReplicator(local, central, node="n1")
+        first.owner, second.owner = "n1:1", "n1:2"
+        first.lease_ms = second.lease_ms = 50
+        assert await first._hold_lease()
+        assert not await second._hold_lease()
+        # 持有者续期后租约不会过期
+        await asyncio.sleep(0.03)
+        assert await first._hold_lease()
+        await asyncio.sleep(0.03)
+        assert not await second._hold_lease()
+        await asyncio.sleep(0.06)
+        assert await second._hold_lease()
+        assert not await first._hold_lease()
+
+    asyncio.run(main())
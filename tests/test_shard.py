@@ -0,0 +1,128 @@
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError
+
+from core.executor import shard as shard_module
+from core.enums.executor import RunningModeEnum
+from core.executor.history import DurationHistory
+from core.executor.shard import TaskShard, ShardedTaskExecutor, shard_count
+
+REDIS_INDEX = "record-1"
+
+
+class FlakyClient:
+    """前 failures 次事务在 EXEC 时连接断开，其余操作转给 fakeredis"""
+
+    def __init__(self, client, failures):
+        self.client = client
+        self.failures = failures
+
+    def pipeline(self, *args, **kwargs):
+        pipe = self.client.pipeline(*args, **kwargs)
+        if self.failures:
+            self.failures -= 1
+
+            async def execute(*_args, **_kwargs):
+                raise ConnectionError("connection lost")
+
+            pipe.execute = execute
+        return pipe
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FlakyClient(fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True), 0)
+    monkeypatch.setattr(shard_module, "get_async_client", lambda: (client, None))
+    return client
+
+
+def make_shard(label):
+    shard = TaskShard(REDIS_INDEX, label)
+    shard.global_option = SimpleNamespace(global_cache=SimpleNamespace(origin_global_variable_mapping={}))
+    return shard
+
+
+def test_pending_changes_survive_a_failed_sync(client):
+    async def main():
+        writer, reader = make_shard("1"), make_shard("2")
+        writer.publish_variable(["global", "token"], "a")
+        writer.publish_skip("case:c1")
+        client.failures = 1
+        with pytest.raises(ConnectionError):
+            await writer.sync_once()
+        # 失败期间产生的新值覆盖旧值，没有写出的终止范围保留
+        writer.publish_variable(["global", "token"], "b")
+        writer.publish_variable(["global", "user"], "u")
+        await writer.sync_once()
+        assert writer.pending_variables == {} and writer.pending_skips == set()
+
+        await reader.sync_once()
+        assert reader.global_option.global_cache.origin_global_variable_mapping == {"token": "b", "user": "u"}
+        assert reader.applied_skips == {"case:c1"}
+
+    asyncio.run(main())
+
+
+def test_sync_loop_retries_until_redis_is_back(client, monkeypatch):
+    monkeypatch.setenv("TASK_SHARD_SYNC_INTERVAL", "0.01")
+
+    async def main():
+        writer, reader = make_shard("1"), make_shard("2")
+        writer.publish_skip("task")
+        client.failures = 3
+        await writer.start(writer.global_option)
+        await asyncio.sleep(0.1)
+        await writer.close()
+        await reader.sync_once()
+        assert reader.applied_skips == {"task"}
+
+    asyncio.run(main())
+
+
+def sharding_options(task_strategy, case_strategies, child_case_counts, history=None):
+    """case_strategies/child_case_counts 按用例给出，子用例的全局序号按用例顺序连续编号"""
+    child_cases = []
+    for case_id, count in child_case_counts.items():
+        for index in range(count):
+            child_cases.append(SimpleNamespace(case_id=case_id, index=index, index_in_global_list=len(child_cases)))
+    return SimpleNamespace(
+        task_info=SimpleNamespace(loop_strategy=task_strategy),
+        case_list=SimpleNamespace(data=[SimpleNamespace(id=case_id, loop_strategy=strategy)
+                                        for case_id, strategy in case_strategies.items()]),
+        child_case_list=SimpleNamespace(list=child_cases),
+        history=history)
+
+
+def shard_cases(partitions):
+    return [sorted({item.case_id for item in partition}) for partition in partitions]
+
+
+@pytest.mark.parametrize("history", [None, DurationHistory(1, {"seq:0": 5, "seq:1": 5, "seq:2": 5, "con:0": 1})])
+def test_sequential_case_stays_in_one_shard(history):
+    options = sharding_options(RunningModeEnum.CONCURRENTLY.value,
+                               {"seq": RunningModeEnum.SEQUENTIALLY.value, "con": RunningModeEnum.CONCURRENTLY.value},
+                               {"seq": 3, "con": 4}, history)
+    partitions = ShardedTaskExecutor(3)._partitions(options)
+    holders = [partition for partition in partitions if any(item.case_id == "seq" for item in partition)]
+    assert len(holders) == 1
+    # 顺序用例的子用例在分片内保持原有顺序
+    assert [item.index for item in holders[0] if item.case_id == "seq"] == [0, 1, 2]
+    # 并发用例的子用例仍然分散，每个子用例只分给一个分片
+    assert sum(1 for partition in partitions if any(item.case_id == "con" for item in partition)) > 1
+    assert sorted(item.index_in_global_list for partition in partitions for item in partition) == list(range(7))
+
+
+def test_shard_count_respects_loop_strategy(monkeypatch):
+    monkeypatch.setenv("TASK_SHARDS", "4")
+    sequential, concurrent = RunningModeEnum.SEQUENTIALLY.value, RunningModeEnum.CONCURRENTLY.value
+    # 顺序执行的任务不分片
+    assert shard_count(sharding_options(sequential, {"a": concurrent}, {"a": 8})) == 1
+    # 两个顺序用例最多只能分给两个分片
+    assert shard_count(sharding_options(concurrent, {"a": sequential, "b": sequential}, {"a": 5, "b": 5})) == 2
+    assert shard_count(sharding_options(concurrent, {"a": concurrent}, {"a": 8})) == 4
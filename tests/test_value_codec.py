@@ -0,0 +1,61 @@
+import asyncio
+import base64
+import json
+import os
+
+import fakeredis
+import pytest
+
+from core.record import redis_client, value_codec
+from core.record.redis_client import AsyncRedisClient
+from core.record.value_codec import COMPRESSED_PREFIX, compress_value, decompress_value
+
+LARGE = json.dumps([{"desc": "接口请求成功", "index": index} for index in range(400)], ensure_ascii=False)
+
+
+@pytest.fixture
+def threshold(monkeypatch):
+    monkeypatch.setattr(value_codec, "COMPRESS_THRESHOLD", 1024)
+
+
+def test_large_values_round_trip(threshold):
+    packed = compress_value(LARGE)
+    assert packed.startswith(COMPRESSED_PREFIX) and len(packed) < len(LARGE)
+    assert decompress_value(packed) == LARGE
+
+
+def test_small_and_non_string_values_are_kept(threshold):
+    small = json.dumps({"a": 1})
+    assert compress_value(small) is small
+    assert compress_value(b"x" * 5000) == b"x" * 5000
+    assert compress_value(None) is None
+    assert decompress_value(small) is small
+    assert decompress_value(None) is None
+
+
+def test_incompressible_values_are_kept(threshold):
+    noise = base64.b64encode(os.urandom(3000)).decode('ascii')
+    assert compress_value(noise) == noise
+
+
+def test_threshold_zero_disables_compression(monkeypatch):
+    monkeypatch.setattr(value_codec, "COMPRESS_THRESHOLD", 0)
+    assert compress_value(LARGE) == LARGE
+
+
+def test_redis_client_stores_compressed_and_reads_plain(threshold, monkeypatch):
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(redis_client, "get_async_client", lambda: (client, None))
+    monkeypatch.setenv("REDIS_TASK_RECORD_TIMEOUT", "60")
+
+    async def main():
+        record = AsyncRedisClient()
+        await record.set_value("detail", LARGE)
+        await record.set_value("script", LARGE, compress=False)
+        await record.append_to_list("events", [LARGE, "{}"])
+        assert (await client.get("detail")).startswith(COMPRESSED_PREFIX)
+        assert await client.get("script") == LARGE
+        assert await record.get_value("detail") == LARGE
+        assert await record.get_list_slice("events") == [LARGE, "{}"]
+
+    asyncio.run(main())